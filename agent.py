@@ -1,78 +1,269 @@
+import argparse
 import numpy as np
 import pickle
 import random
+import re
 from settings import *
+from qtable import QTable
+from model_store import MappedQTable, MAPPED_EXT, QuantizedQTable, QUANTIZED_EXT
+
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+
+def _symmetry_permutations():
+    """
+    Permutações das 8 simetrias do tabuleiro, na mesma ordem usada desde
+    a primeira versão: (rotação 0, sem flip), (rotação 0, flip), (rotação 1, ...).
+    Vale: tabuleiro_transformado.flat[i] = tabuleiro.flat[perm[t, i]].
+    """
+    b = np.arange(NUM_CELLS).reshape(BOARD_SIZE, BOARD_SIZE)
+    perms = []
+    for r in range(4):
+        perms.append(b.flatten())
+        perms.append(np.fliplr(b).flatten())
+        b = np.rot90(b)
+    return np.array(perms)
+
+SYM_PERMS = _symmetry_permutations()          # (8, casas): casa canônica -> casa real
+ACTION_MAP = np.argsort(SYM_PERMS, axis=1)    # (8, casas): casa real -> casa canônica
+
+# Código base 3 (0: vazio, 1: eu, 2: inimigo), casa 0 como dígito mais significativo.
+# Assim o menor código é exatamente a menor tupla da versão antiga.
+# O código precisa caber num int64: vale até 6x6 (3^36 < 2^63). Em tabuleiros maiores só
+# funcionam os agentes sem chave (nn_agent.NNAgent); o QAgent recusa o tabuleiro.
+TABLE_KEYS = 3 ** NUM_CELLS < 2 ** 63
+POW3 = 3 ** np.arange(NUM_CELLS - 1, -1, -1, dtype=np.int64)
+SYM_WEIGHTS = np.empty((len(SYM_PERMS), NUM_CELLS), dtype=np.int64)
+for _t, _perm in enumerate(SYM_PERMS):
+    SYM_WEIGHTS[_t, _perm] = POW3
+
+# Memória compartilhada: código bruto -> (código canônico, transformação)
+_CANONICAL_CACHE = {}
+CANONICAL_CACHE_LIMIT = 1 << 20
+
+def canonicalize(board):
+    """Retorna (código canônico, índice da transformação) do tabuleiro."""
+    folded = np.minimum(np.asarray(board).ravel(), 2)  # Jogadores 3, 4, ... viram inimigo (2)
+    raw_code = int(folded @ POW3)
+    info = _CANONICAL_CACHE.get(raw_code)
+    if info is None:
+        codes = SYM_WEIGHTS @ folded
+        transform = int(codes.argmin())
+        info = (int(codes[transform]), transform)
+        if len(_CANONICAL_CACHE) >= CANONICAL_CACHE_LIMIT:
+            _CANONICAL_CACHE.clear()
+        _CANONICAL_CACHE[raw_code] = info
+    return info
+
+# Modos de aprendizado: 'q' (um passo), 'nstep' (retorno de n passos) e 'lambda' (Q(λ) de Watkins).
+# Os dois últimos guardam a trajetória do episódio, já em chaves e ações canônicas.
+LEARNING_MODES = ('q', 'nstep', 'lambda')
+N_STEPS = 2          # recompensas somadas no retorno do modo 'nstep'
+TRACE_LAMBDA = 0.3   # decaimento dos traços de elegibilidade do modo 'lambda'
+
+def _legacy_key_to_code(key):
+    """Converte a chave antiga (tupla em string) para o código inteiro."""
+    cells = re.findall(r'-?\d+', re.sub(r'np\.\w+\(', '', key))
+    return int(np.array(cells, dtype=np.int64) @ POW3)
 
 class QAgent:
-    def __init__(self):
-        self.q_table = {} 
+    def __init__(self, mode='q', n_steps=N_STEPS, lam=TRACE_LAMBDA):
+        """
+        mode: 'q' (Q-Learning de um passo), 'nstep' (retorno de 'n_steps' recompensas) ou
+        'lambda' (Q(λ) de Watkins, traços decaindo por gamma * lam). Nos modos com trajetória
+        a recompensa final chega a todas as jogadas da partida, não só à última.
+        """
+        if not TABLE_KEYS:
+            raise ValueError(f"Tabuleiro {BOARD_SIZE}x{BOARD_SIZE} grande demais para a chave int64 "
+                             f"da Tabela Q (máximo 6x6); use nn_agent.NNAgent")
+        if mode not in LEARNING_MODES:
+            raise ValueError(f"Modo de aprendizado desconhecido: {mode!r} (use {', '.join(LEARNING_MODES)})")
+        if n_steps < 1:
+            raise ValueError(f"n_steps precisa ser pelo menos 1 (recebido {n_steps})")
+        if not 0.0 <= lam <= 1.0:
+            raise ValueError(f"lam precisa estar entre 0 e 1 (recebido {lam})")
+        self.q_table = QTable()
         self.epsilon = EPSILON_START
         self.alpha = ALPHA_START # <--- Agora usa o valor inicial definido
         self.gamma = DISCOUNT_FACTOR
+        self.mode = mode
+        self.n_steps = n_steps
+        self.lam = lam
+        self.trajectory = []   # transições pendentes do episódio (modos 'nstep' e 'lambda')
+        self.explored = False  # a última jogada escolhida foi aleatória (Watkins corta os traços)
 
     def get_symmetry_info(self, board):
-        """Retorna a chave canônica e as transformações necessárias."""
-        sim_board = board.copy()
-        sim_board[sim_board == 3] = 2
-        sim_board[sim_board == 4] = 2
-        
-        symmetries = []
-        b = sim_board
-        for r in range(4): 
-            symmetries.append((tuple(b.flatten()), r, False))
-            b_flip = np.fliplr(b)
-            symmetries.append((tuple(b_flip.flatten()), r, True))
-            b = np.rot90(b)
-            
-        best_sym = min(symmetries, key=lambda x: x[0])
-        return str(best_sym[0]), best_sym[1], best_sym[2]
-
-    def map_action_to_canonical(self, action, rotation, flip):
+        """Retorna a chave canônica (inteiro base 3) e a transformação usada."""
+        return canonicalize(board)
+
+    def map_action_to_canonical(self, action, transform):
         """Mapeia ação do mundo real para o canônico."""
-        row, col = divmod(action, BOARD_SIZE)
-        for _ in range(rotation):
-            row, col = BOARD_SIZE - 1 - col, row
-        if flip:
-            col = BOARD_SIZE - 1 - col
-        return row * BOARD_SIZE + col
+        return int(ACTION_MAP[transform, action])
 
     def choose_action(self, board, valid_moves):
-        state_key, rot, flip = self.get_symmetry_info(board)
+        if random.random() < self.epsilon:
+            self.explored = True
+            return random.choice(valid_moves)
+
+        self.explored = False
+        state_key, transform = self.get_symmetry_info(board)
+        return self._greedy_action(state_key, transform, valid_moves)
 
+    def choose_action_from_key(self, state_key, transform, valid_moves):
+        """Igual a choose_action, com a chave canônica já pronta (ex.: env.canonical_key)."""
         if random.random() < self.epsilon:
+            self.explored = True
             return random.choice(valid_moves)
+        self.explored = False
+        return self._greedy_action(state_key, transform, valid_moves)
+
+    def _greedy_action(self, state_key, transform, valid_moves):
+        moves = np.asarray(valid_moves)
+        q_row = self.q_table.get(state_key)
+        if q_row is None:
+            # Estado nunca visto: todas as jogadas valem 0 (e a tabela não é alterada)
+            return int(random.choice(moves))
 
-        if state_key not in self.q_table:
-            self.q_table[state_key] = np.zeros(BOARD_SIZE * BOARD_SIZE)
+        # Valores das jogadas válidas, mapeadas para o canônico numa só indexação
+        q_values = q_row[ACTION_MAP[transform, moves]]
 
-        canonical_q_values = self.q_table[state_key]
-        real_q_values = np.full(BOARD_SIZE * BOARD_SIZE, -np.inf)
-        
-        for move in valid_moves:
-            canon_move = self.map_action_to_canonical(move, rot, flip)
-            real_q_values[move] = canonical_q_values[canon_move]
-        
         # OTIMIZAÇÃO: Quebra de empate aleatória
         # Se houver múltiplas melhores jogadas com o mesmo valor, escolhe uma ao acaso
-        max_value = np.max(real_q_values)
-        best_moves = [i for i, v in enumerate(real_q_values) if v == max_value]
-        return random.choice(best_moves)
+        best_moves = moves[q_values == q_values.max()]
+        return int(random.choice(best_moves))
 
-    def learn(self, state, action, reward, next_state):
-        state_key, rot, flip = self.get_symmetry_info(state)
-        canon_action = self.map_action_to_canonical(action, rot, flip)
-        next_state_key, _, _ = self.get_symmetry_info(next_state)
+    def learn(self, state, action, reward, next_state, done=False):
+        state_key, transform = self.get_symmetry_info(state)
+        canon_action = self.map_action_to_canonical(action, transform)
+        next_state_key, _ = self.get_symmetry_info(next_state)
+        self.observe(state_key, canon_action, reward, next_state_key, done)
 
-        if state_key not in self.q_table:
-            self.q_table[state_key] = np.zeros(BOARD_SIZE * BOARD_SIZE)
-        if next_state_key not in self.q_table:
-            self.q_table[next_state_key] = np.zeros(BOARD_SIZE * BOARD_SIZE)
+    def learn_from_keys(self, state_key, transform, action, reward, next_state_key, done=False):
+        """Igual a learn, com as chaves canônicas já prontas (ex.: env.canonical_key)."""
+        self.observe(state_key, int(ACTION_MAP[transform, action]), reward, next_state_key, done)
 
-        old_value = self.q_table[state_key][canon_action]
-        next_max = np.max(self.q_table[next_state_key])
+    def observe(self, state_key, canon_action, reward, next_state_key, done=False):
+        """
+        Uma transição no espaço canônico, aprendida conforme self.mode.
+        Nos modos 'nstep' e 'lambda' o done=True do fim da partida é obrigatório:
+        é ele que fecha a trajetória do episódio.
+        """
+        if self.mode == 'q':
+            self.update(state_key, canon_action, reward, next_state_key, done)
+        elif self.mode == 'nstep':
+            self._observe_nstep(state_key, canon_action, reward, next_state_key, done)
+        else:
+            self._observe_lambda(state_key, canon_action, reward, next_state_key, done)
 
-        new_value = old_value + self.alpha * (reward + self.gamma * next_max - old_value)
-        self.q_table[state_key][canon_action] = new_value
+    def end_episode(self):
+        """Descarta a trajetória de uma partida interrompida sem done=True."""
+        self.trajectory.clear()
+
+    def update(self, state_key, canon_action, reward, next_state_key, done=False):
+        """
+        Atualização do Q-Learning já no espaço canônico (chaves e ação canônicas).
+        done=True: estado final, sem valor futuro (e sem criar linha para ele).
+        """
+        row = self.q_table.row_index(state_key)
+        if done:
+            q = self.q_table.data
+            next_max = 0.0
+        else:
+            next_row = self.q_table.row_index(next_state_key)
+            q = self.q_table.data  # Lido depois das inserções (a matriz pode ter crescido)
+            next_max = q[next_row].max()
+
+        old_value = q[row, canon_action]
+
+        q[row, canon_action] = old_value + self.alpha * (reward + self.gamma * next_max - old_value)
+        self.q_table.dirty[row] = 1
+        self.q_table.visits[row] += 1
+
+    def _observe_nstep(self, state_key, canon_action, reward, next_state_key, done):
+        """
+        Retorno de n passos: a jogada de n transições atrás recebe a soma descontada das
+        n recompensas mais o melhor valor do estado atual. No fim da partida as pendentes
+        recebem o retorno truncado (sem valor futuro).
+        """
+        trajectory = self.trajectory
+        if self.explored:
+            # Jogada exploratória: o retorno das pendentes para aqui, com o melhor valor deste estado
+            while trajectory:
+                self._nstep_update(state_key)
+                trajectory.pop(0)
+        trajectory.append((state_key, canon_action, reward))
+        if done:
+            while trajectory:
+                self._nstep_update(None)
+                trajectory.pop(0)
+        elif len(trajectory) >= self.n_steps:
+            self._nstep_update(next_state_key)
+            trajectory.pop(0)
+
+    def _nstep_update(self, bootstrap_key):
+        table = self.q_table
+        state_key, canon_action, _ = self.trajectory[0]
+        row = table.row_index(state_key)
+        target = 0.0
+        for _, _, reward in reversed(self.trajectory):
+            target = reward + self.gamma * target
+        if bootstrap_key is not None:
+            next_row = table.row_index(bootstrap_key)
+            target += self.gamma ** len(self.trajectory) * table.data[next_row].max()
+        q = table.data  # Lido depois das inserções (a matriz pode ter crescido)
+        q[row, canon_action] += self.alpha * (target - q[row, canon_action])
+        table.dirty[row] = 1
+        table.visits[row] += 1
+
+    def _observe_lambda(self, state_key, canon_action, reward, next_state_key, done):
+        """
+        Q(λ) de Watkins com traços substitutivos: o erro do passo atual corrige todas as
+        jogadas da trajetória, a de k passos atrás com peso (gamma * lam)^k. Uma jogada
+        exploratória corta os traços (as anteriores não levaram à política gulosa).
+        """
+        table = self.q_table
+        trace = self.trajectory
+        if self.explored:
+            trace.clear()
+        row = table.row_index(state_key)
+        if done:
+            q = table.data
+            next_max = 0.0
+        else:
+            next_row = table.row_index(next_state_key)
+            q = table.data  # Lido depois das inserções (a matriz pode ter crescido)
+            next_max = q[next_row].max()
+
+        step = self.alpha * (reward + self.gamma * next_max - q[row, canon_action])
+        trace.append((row, canon_action))
+        decay = self.gamma * self.lam
+        for r, a in reversed(trace):
+            q[r, a] += step
+            table.dirty[r] = 1
+            step *= decay
+        table.visits[row] += 1
+        if done:
+            trace.clear()
+
+    def learn_batch(self, state_keys, canon_actions, rewards, next_state_keys, dones):
+        """
+        Atualização em lote (modo replay): lê todos os alvos com uma indexação só
+        e grava com uma dispersão só. Pares (estado, ação) repetidos no lote dão um
+        único passo na direção do alvo médio (somar os passos estouraria o alpha).
+        """
+        rows = self.q_table.row_indices(state_keys)
+        next_rows = self.q_table.row_indices(next_state_keys[~dones])
+        q = self.q_table.data  # Lido depois das inserções (a matriz pode ter crescido)
+
+        next_max = np.zeros(len(rows), dtype=q.dtype)
+        next_max[~dones] = q[next_rows].max(axis=1)
+        targets = rewards + self.gamma * next_max
+
+        cells, first, inverse = np.unique(rows * q.shape[1] + canon_actions, return_index=True, return_inverse=True)
+        mean_targets = np.bincount(inverse, weights=targets) / np.bincount(inverse)
+        flat = q.reshape(-1)
+        flat[cells] += self.alpha * (mean_targets - flat[cells])
+        self.q_table.mark_dirty(rows[first])
+        self.q_table.count_visits(rows)
 
     def decay_alpha(self):
         """Reduz a taxa de aprendizado gradualmente."""
@@ -85,9 +276,51 @@ class QAgent:
         print(f"💾 Modelo salvo em {filename} ({len(self.q_table)} estados canônicos).")
 
     def load_model(self, filename="brain.pkl"):
+        if filename.endswith(QUANTIZED_EXT):
+            # Modelo podado e quantizado (implantação): somente leitura
+            self.q_table = QuantizedQTable(filename)
+            print(f"🗜️ Modelo quantizado ({self.q_table.bits} bits)! {len(self.q_table)} estados canônicos.")
+            return
+        if filename.endswith(MAPPED_EXT):
+            # Modelo mapeado em memória: pronto na hora, somente leitura (inferência)
+            self.q_table = MappedQTable(filename)
+            print(f"🗺️ Modelo mapeado! {len(self.q_table)} estados canônicos.")
+            return
         try:
             with open(filename, "rb") as f:
                 self.q_table = pickle.load(f)
+            if isinstance(self.q_table, dict):
+                # Modelos antigos usavam a tupla do tabuleiro em string como chave
+                if any(isinstance(key, str) for key in self.q_table):
+                    self.q_table = {_legacy_key_to_code(k): v for k, v in self.q_table.items()}
+                self.q_table = QTable.from_dict(self.q_table)
             print(f"📂 Modelo carregado! Alpha: {self.alpha:.4f}")
         except FileNotFoundError:
-            print("⚠️ Arquivo não encontrado.")
\ No newline at end of file
+            print("⚠️ Arquivo não encontrado.")
+
+def _n_steps_arg(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"inteiro inválido: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"precisa ser pelo menos 1 (recebido {value})")
+    return value
+
+def _lam_arg(text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"número inválido: {text!r}")
+    if not 0.0 <= value <= 1.0:
+        raise argparse.ArgumentTypeError(f"precisa estar entre 0 e 1 (recebido {value})")
+    return value
+
+def add_learning_args(parser):
+    """Argumentos de linha de comando do modo de aprendizado, comuns aos scripts de treino."""
+    parser.add_argument("--learning", choices=LEARNING_MODES, default='q',
+                        help="'q' (um passo), 'nstep' (retorno de n passos) ou 'lambda' (Q(λ) de Watkins).")
+    parser.add_argument("--n-steps", type=_n_steps_arg, default=N_STEPS,
+                        help=f"Recompensas somadas no modo nstep (padrão: {N_STEPS}).")
+    parser.add_argument("--lam", type=_lam_arg, default=TRACE_LAMBDA,
+                        help=f"Decaimento dos traços no modo lambda (padrão: {TRACE_LAMBDA}).")
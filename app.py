@@ -2,9 +2,13 @@ import streamlit as st
 import numpy as np
 import time
 import random
+import pickle
+import os
 from settings import *
 from environment import TicTacToeEnv
-from agent import QAgent
+from search_agent import SearchAgent
+from model_registry import default_registry, available_models
+from move_server import MoveClient, SERVER_ENV
 
 # --- 1. CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -64,8 +68,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- MAPA DE SÍMBOLOS (ATUALIZADO) ---
-# 0: Vazio, 1: IA, 2: Humano, 3: Bot Monstro, 4: Bot Alien
-SYMBOLS_MAP = {0: " ", 1: "🤖", 2: "😎", 3: "👾", 4: "👽"}
+# 0: Vazio, 1: IA, 2: Humano, 3: Bot Monstro, 4: Bot Alien, 5...: mais bots
+SYMBOLS_MAP = {0: " ", 1: "🤖", 2: "😎", 3: "👾", 4: "👽", 5: "👻", 6: "🐙", 7: "🦖", 8: "🎃"}
+HUMAN_ID = 2
+BOT_IDS = [p for p in OPPONENTS if p != HUMAN_ID]  # Com 4 jogadores: [3, 4]
 
 # --- LÓGICA DO JOGO ---
 
@@ -90,12 +96,63 @@ if 'env' not in st.session_state:
     st.session_state.status_text = "IA a calcular abertura..."
     st.session_state.turn_counter = 0
     
-    st.session_state.agent = QAgent()
+    # Com VELHA_MOVE_SERVER definido, as jogadas da IA vêm do move_server.py;
+    # senão, do registro de modelos do processo (uma cópia de cada modelo para todas as sessões)
+    st.session_state.server_mode = bool(os.environ.get(SERVER_ENV))
+    st.session_state.move_client = None
+    st.session_state.agent = None
+    st.session_state.model_error = None
+    if st.session_state.server_mode:
+        try:
+            st.session_state.move_client = MoveClient.from_env()
+        except OSError as e:
+            st.session_state.model_error = f"Servidor de jogadas indisponível ({e})."
+
+def server_models():
+    """Modelos carregados no servidor de jogadas ([] se ele não responder)."""
+    client = st.session_state.move_client
+    if client is None:
+        return []
+    try:
+        return client.stats()['models']
+    except (OSError, RuntimeError, ValueError) as e:
+        st.session_state.move_client = None
+        st.session_state.model_error = f"Servidor de jogadas indisponível ({e})."
+        return []
+
+def select_model(name):
+    """Troca o modelo da IA; em caso de erro a IA joga aleatório e o motivo aparece na tela."""
+    st.session_state.model_name = name
+    st.session_state.agent = None
+    if st.session_state.server_mode:
+        return  # O servidor já tem os modelos; um erro dele aparece em ai_move
+    st.session_state.model_error = None
     try:
-        st.session_state.agent.load_model("brain.pkl")
-        st.session_state.agent.epsilon = 0.0 
-    except:
-        pass
+        st.session_state.agent = default_registry().get(name)
+    except FileNotFoundError:
+        st.session_state.model_error = f"{name} não encontrado. Rode o train.py primeiro!"
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+        st.session_state.model_error = f"Não foi possível carregar {name}: {e}"
+
+def ai_move(board, valid_moves):
+    """Jogada da IA (assento 1): pelo servidor de jogadas, se houver, ou pelo modelo do registro."""
+    client = st.session_state.move_client
+    if client:
+        try:
+            return client.move(st.session_state.model_name, board, AGENT_ID)
+        except RuntimeError as e:
+            # Pedido recusado pelo servidor (a conexão segue boa): esta jogada sai aleatória
+            st.session_state.model_error = f"Servidor de jogadas recusou o pedido ({e})."
+            return random.choice(valid_moves)
+        except (OSError, ValueError) as e:
+            # Servidor caiu: a partida segue com a IA aleatória
+            st.session_state.move_client = None
+            st.session_state.model_error = f"Servidor de jogadas indisponível ({e})."
+            return random.choice(valid_moves)
+    agent = st.session_state.agent
+    if agent is None:
+        return random.choice(valid_moves)
+    return agent.act(board, AGENT_ID)
 
 # --- BARRA LATERAL ---
 with st.sidebar:
@@ -104,10 +161,33 @@ with st.sidebar:
     # Legenda atualizada com os novos emojis
     st.write("🤖 **Agente IA** (Começa)")
     st.write("😎 **Você** (Humano)")
-    st.write("👾 **Bot 3** (Monstro)")
-    st.write("👽 **Bot 4** (Alien)")
+    for bot in BOT_IDS:
+        st.write(f"{SYMBOLS_MAP[bot]} **Bot {bot}**")
     
     st.markdown("---")
+
+    # No modo servidor só dá para escolher os modelos que o servidor carregou
+    if st.session_state.server_mode:
+        models = server_models() or ["brain.pkl"]
+    else:
+        models = available_models() or ["brain.pkl"]
+    model_name = st.selectbox("Modelo da IA", models,
+                              index=models.index("brain.pkl") if "brain.pkl" in models else 0)
+    if st.session_state.get('model_name') != model_name:
+        select_model(model_name)
+    if st.session_state.model_error:
+        st.warning(st.session_state.model_error + " A IA vai jogar aleatório.")
+
+    st.markdown("---")
+
+    # Bots (3, 4, ...): aleatórios ou jogando por busca (não precisam de treino)
+    bot_level = st.radio("Nível dos Bots", ["Aleatório", "Busca (paranoid)", "Busca (max-n)"])
+    mode = {"Busca (paranoid)": "paranoid", "Busca (max-n)": "maxn"}.get(bot_level)
+    if st.session_state.get('bot_level') != bot_level:
+        st.session_state.bot_level = bot_level
+        st.session_state.bot_brain = SearchAgent(mode=mode, time_budget=0.5) if mode else None
+
+    st.markdown("---")
     
     if st.button("🔄 Reiniciar Partida", type="primary"):
         st.session_state.env.reset()
@@ -119,12 +199,11 @@ with st.sidebar:
 # --- ABERTURA DA IA ---
 if st.session_state.turn_counter == 0 and not st.session_state.game_over:
     env = st.session_state.env
-    agent = st.session_state.agent
     
     empty = [i for i in range(BOARD_SIZE**2) if env.is_valid_move(i)]
     
     # IA Joga Primeiro
-    action = agent.choose_action(env.board, empty)
+    action = ai_move(env.board, empty)
     manual_step(action, 1) # Jogador 1 (IA)
     
     st.session_state.turn_counter += 1
@@ -160,14 +239,14 @@ def run_turn_sequence(placeholder, human_action):
     st.session_state.turn_counter += 1
     
     # 1. JOGADA HUMANA
-    done, info = manual_step(human_action, 2)
+    done, info = manual_step(human_action, HUMAN_ID)
     st.session_state.status_text = "Você jogou... Aguarde."
     render_board(placeholder, interaction_enabled=False) 
     
     if check_end(done, info, "VOCÊ VENCEU!", "human"): return
 
-    # 2. BOTs e IA (Sequência: Bot 3 -> Bot 4 -> IA)
-    opponents = [3, 4, 1] 
+    # 2. BOTs e IA (Sequência: Bot 3 -> Bot 4 -> ... -> IA)
+    opponents = BOT_IDS + [AGENT_ID]
     
     for player in opponents:
         time.sleep(1.5)
@@ -182,11 +261,12 @@ def run_turn_sequence(placeholder, human_action):
             return
 
         if player == 1:
-            action = st.session_state.agent.choose_action(env.board, empty)
+            action = ai_move(env.board, empty)
             win_msg = "A IA DOMINOU O JOGO!"
             winner_type = "ai"
         else:
-            action = random.choice(empty)
+            bot_brain = st.session_state.bot_brain
+            action = bot_brain.act(env.board, player) if bot_brain else random.choice(empty)
             win_msg = f"BOT {name} GANHOU!"
             winner_type = "bot"
             
@@ -0,0 +1,374 @@
+# benchmark.py
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from environment import TicTacToeEnv, BitboardTicTacToeEnv, make_env
+from vec_environment import VecTicTacToeEnv
+from agent import QAgent, LEARNING_MODES, N_STEPS, TRACE_LAMBDA
+from replay import ReplayBuffer
+from settings import *
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.15  # 15% mais lento que a base = regressão
+MIN_TIME = 3.0            # segundos de medição por benchmark (a base guarda o valor usado)
+REPEATS = 31              # rodadas cronometradas por benchmark; vale a mediana
+REFERENCE = "reference"   # carga fixa medida junto, para descontar a velocidade da máquina
+
+# Convergência: episódios (e segundos de treino) até a política gulosa atingir a taxa de vitória alvo
+CONVERGENCE_TARGET = 0.6
+CONVERGENCE_EPISODES = 60_000   # limite por modo; o epsilon decai ao longo dele
+CONVERGENCE_EVAL_EVERY = 2000   # episódios entre avaliações
+CONVERGENCE_EVAL_GAMES = 2000   # partidas gulosas por avaliação
+
+# Registro: nome -> (grupo, função de preparo). O preparo devolve (função, unidades por chamada).
+BENCHMARKS = {}
+
+def benchmark(name, group):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return register
+
+def mid_game_board(seed=0, stones=8):
+    """Tabuleiro de meio de jogo (estado típico do caminho quente)."""
+    rng = random.Random(seed)
+    board = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+    cells = rng.sample(range(BOARD_SIZE * BOARD_SIZE), stones)
+    for i, cell in enumerate(cells):
+        board.flat[cell] = ([AGENT_ID] + OPPONENTS)[i % NUM_PLAYERS]
+    return board
+
+_TRAINED = {}
+
+def trained_agent(episodes=3000):
+    """Agente treinado rapidamente (semente fixa) para os testes com cérebro."""
+    if episodes not in _TRAINED:
+        random.seed(12345)
+        env, agent = make_env(), QAgent()
+        for _ in range(episodes):
+            env.reset()
+            state, done = env.board, False
+            while not done:
+                action = agent.choose_action(state, env.valid_moves())
+                _, reward, done, _ = env.step(action)
+                next_state = env.board
+                agent.learn(state, action, reward, next_state)
+                state = next_state
+            agent.epsilon = max(EPSILON_MIN, agent.epsilon * 0.999)
+        agent.epsilon = 0.0
+        _TRAINED[episodes] = agent
+    return _TRAINED[episodes]
+
+# --- Micro-benchmarks ---
+
+@benchmark("check_winner[numpy]", "micro")
+def _check_winner_numpy():
+    env = TicTacToeEnv()
+    env.board = mid_game_board()
+    return (lambda: env.check_winner(AGENT_ID)), 1
+
+@benchmark("check_winner[bitboard]", "micro")
+def _check_winner_bitboard():
+    env = BitboardTicTacToeEnv()
+    for cell, player in enumerate(mid_game_board().flatten()):
+        if player: env.place(cell, player)
+    return (lambda: env.check_winner(AGENT_ID)), 1
+
+@benchmark("is_draw[numpy]", "micro")
+def _is_draw():
+    env = TicTacToeEnv()
+    env.board = mid_game_board()
+    return env.is_draw, 1
+
+@benchmark("get_opponent_view[numpy]", "micro")
+def _opponent_view():
+    env = TicTacToeEnv()
+    env.board = mid_game_board()
+    return (lambda: env.get_opponent_view(3)), 1
+
+@benchmark("get_symmetry_info", "micro")
+def _symmetry_info():
+    agent, board = QAgent(), mid_game_board()
+    return (lambda: agent.get_symmetry_info(board)), 1
+
+@benchmark("choose_action", "micro")
+def _choose_action():
+    agent, board = trained_agent(), mid_game_board()
+    valid_moves = [i for i in range(BOARD_SIZE * BOARD_SIZE) if board.flat[i] == EMPTY]
+    return (lambda: agent.choose_action(board, valid_moves)), 1
+
+@benchmark("learn", "micro")
+def _learn():
+    agent, board = QAgent(), mid_game_board()
+    next_board = board.copy()
+    empty = np.flatnonzero(board.ravel() == EMPTY)
+    next_board.flat[empty[:NUM_PLAYERS]] = [AGENT_ID] + OPPONENTS
+    action = int(empty[0])
+    return (lambda: agent.learn(board, action, REWARDS['STEP'], next_board)), 1
+
+@benchmark("learn_batch[64]", "micro")
+def _learn_batch():
+    """Atualização em lote do modo replay; a medida é por transição."""
+    agent = trained_agent()
+    buffer = ReplayBuffer(capacity=4096, seed=0)
+    keys = np.fromiter(agent.q_table.keys(), dtype=np.int64, count=len(agent.q_table))
+    rng = np.random.default_rng(0)
+    for _ in range(buffer.capacity):
+        key, next_key = rng.choice(keys, size=2)
+        buffer.add(key, rng.integers(BOARD_SIZE * BOARD_SIZE), REWARDS['STEP'], next_key, rng.random() < 0.2)
+    return (lambda: agent.learn_batch(*buffer.sample(64))), 64
+
+# --- Macro-benchmarks ---
+
+def _random_steps(env, steps=2000):
+    def run():
+        env.reset()
+        for _ in range(steps):
+            _, _, done, _ = env.step(random.choice(env.valid_moves()))
+            if done: env.reset()
+    return run, steps
+
+@benchmark("env_steps[numpy]", "macro")
+def _env_steps_numpy():
+    return _random_steps(TicTacToeEnv())
+
+@benchmark("env_steps[bitboard]", "macro")
+def _env_steps_bitboard():
+    return _random_steps(BitboardTicTacToeEnv())
+
+@benchmark("env_steps[vec x4096]", "macro")
+def _env_steps_vec():
+    env = VecTicTacToeEnv(4096, seed=0)
+    rows = np.arange(env.num_envs)
+    def run():
+        for _ in range(10):
+            env.step(env.random_actions(rows))
+    return run, 10 * env.num_envs
+
+def _train_episodes(opponent_brains, episodes=200):
+    env = make_env(opponent_brains=opponent_brains)
+    agent = QAgent()
+    agent.epsilon = 0.1
+    def run():
+        for _ in range(episodes):
+            env.reset()
+            (key, transform), done = env.canonical_key(), False
+            while not done:
+                action = agent.choose_action_from_key(key, transform, env.valid_moves())
+                _, reward, done, _ = env.step(action)
+                next_key, next_transform = env.canonical_key()
+                agent.learn_from_keys(key, transform, action, reward, next_key)
+                key, transform = next_key, next_transform
+    return run, episodes
+
+@benchmark("train_episodes[random]", "macro")
+def _train_random():
+    return _train_episodes(None)
+
+@benchmark("train_episodes[brains]", "macro")
+def _train_brains():
+    brain = trained_agent()
+    return _train_episodes({opp_id: brain for opp_id in OPPONENTS})
+
+# --- Convergência (episódios até a taxa de vitória alvo) ---
+
+def greedy_win_rate(agent, env, games, seed=0):
+    """Taxa de vitória da política gulosa contra os oponentes do ambiente (sem aprender)."""
+    state = random.getstate()
+    random.seed(seed)
+    old_eps, agent.epsilon = agent.epsilon, 0.0
+    wins = 0
+    for _ in range(games):
+        env.reset()
+        done, info = False, {}
+        while not done:
+            key, transform = env.canonical_key()
+            _, _, done, info = env.step(agent.choose_action_from_key(key, transform, env.valid_moves()))
+        wins += info.get('result') == 'Win'
+    agent.epsilon = old_eps
+    random.setstate(state)
+    return wins / games
+
+def convergence(mode, target=CONVERGENCE_TARGET, max_episodes=CONVERGENCE_EPISODES,
+                eval_every=CONVERGENCE_EVAL_EVERY, eval_games=CONVERGENCE_EVAL_GAMES,
+                n_steps=N_STEPS, lam=TRACE_LAMBDA, seed=0):
+    """
+    Treina como o train.py (oponentes aleatórios, mesmo decaimento de alpha; o epsilon
+    decai ao longo de 'max_episodes') até a política gulosa vencer 'target' das partidas.
+    Retorna {'episodes', 'seconds' (só treino), 'win_rate', 'states', 'reached'}.
+    """
+    random.seed(seed)
+    env, eval_env = make_env(), make_env()
+    agent = QAgent(mode, n_steps, lam)
+    epsilon_decay = EPSILON_DECAY ** (EPISODES / max_episodes)
+    seconds, win_rate = 0.0, 0.0
+    for start in range(0, max_episodes, eval_every):
+        began = time.perf_counter()
+        for _ in range(eval_every):
+            env.reset()
+            (key, transform), done = env.canonical_key(), False
+            while not done:
+                action = agent.choose_action_from_key(key, transform, env.valid_moves())
+                _, reward, done, _ = env.step(action)
+                next_key, next_transform = env.canonical_key()
+                agent.learn_from_keys(key, transform, action, reward, next_key, done)
+                key, transform = next_key, next_transform
+            if agent.epsilon > EPSILON_MIN:
+                agent.epsilon *= epsilon_decay
+            agent.decay_alpha()
+        seconds += time.perf_counter() - began
+        win_rate = greedy_win_rate(agent, eval_env, eval_games, seed=seed + start)
+        if win_rate >= target:
+            break
+    episodes = start + eval_every
+    return {'episodes': episodes, 'seconds': seconds, 'win_rate': win_rate,
+            'states': len(agent.q_table), 'reached': win_rate >= target}
+
+def run_convergence(modes=LEARNING_MODES, **kwargs):
+    results = {}
+    for mode in modes:
+        results[mode] = r = convergence(mode, **kwargs)
+        status = "✅" if r['reached'] else "❌ não atingiu"
+        print(f"conv  | {mode:8s} | {r['episodes']:>8,} episódios | {r['seconds']:7.1f} s | "
+              f"vitórias {r['win_rate'] * 100:5.1f}% | {r['states']:>7,} estados {status}")
+    base = results.get('q')
+    if base and base['reached']:
+        for mode, r in results.items():
+            if mode != 'q' and r['reached']:
+                print(f"   {mode}: {r['episodes'] / base['episodes']:.0%} dos episódios e "
+                      f"{r['seconds'] / base['seconds']:.0%} do tempo do modo 'q'")
+    return results
+
+def reference_work():
+    """
+    Carga fixa que não depende do código do jogo (laço Python + NumPy pequeno, como os
+    caminhos quentes). Medida junto dos benchmarks, dá a velocidade da máquina no momento:
+    o --compare a desconta, para uma máquina mais lenta ou mais rápida não virar regressão.
+    """
+    total = 0
+    for i in range(200):
+        total += i * i % 7
+    a = np.arange(NUM_PLAYERS * BOARD_SIZE * BOARD_SIZE)
+    for _ in range(10):
+        a = (a * 3 + 1) % 1024
+    return total + int(a.sum())
+
+def calibrate(func, min_time=MIN_TIME, repeats=REPEATS):
+    """Chamadas por rodada para que 'repeats' rodadas somem pelo menos 'min_time' segundos."""
+    func()  # aquecimento
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops): func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats or loops >= 1 << 20: break
+        loops *= 2
+    return loops
+
+def run_benchmarks(groups=("micro", "macro"), names=None, min_time=MIN_TIME, repeats=REPEATS):
+    """
+    Taxa mediana (unidades/s) de cada benchmark, mais a da carga de referência (REFERENCE).
+    As rodadas são intercaladas entre os benchmarks: um trecho lento da máquina atinge
+    todos um pouco, em vez de um só por inteiro, e a mediana descarta as rodadas fora da curva.
+    """
+    selected = {REFERENCE: (reference_work, 1, calibrate(reference_work, min_time, repeats))}
+    for name, (group, setup) in BENCHMARKS.items():
+        if group not in groups or (names and name not in names):
+            continue
+        func, units = setup()
+        random.seed(0)
+        selected[name] = (func, units, calibrate(func, min_time, repeats))
+
+    rates = {name: [] for name in selected}
+    for _ in range(repeats):
+        for name, (func, units, loops) in selected.items():
+            start = time.perf_counter()
+            for _ in range(loops): func()
+            rates[name].append(loops * units / (time.perf_counter() - start))
+
+    results = {name: float(np.median(rates[name])) for name in selected}
+    for name in selected:
+        group = BENCHMARKS[name][0] if name in BENCHMARKS else "ref"
+        print(f"{group:5s} | {name:28s} | {results[name]:>14,.0f} op/s")
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compara com a base; retorna a lista de regressões (nome, base, atual, variação).
+    A variação desconta a diferença de velocidade da máquina medida pela carga de referência.
+    """
+    regressions = []
+    speed = 1.0
+    if REFERENCE in results and REFERENCE in baseline:
+        speed = results[REFERENCE] / baseline[REFERENCE]
+    print("-" * 72)
+    print(f"Velocidade da máquina em relação à base: {speed - 1:+.1%} (descontada)")
+    for name, current in results.items():
+        if name == REFERENCE:
+            continue
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:28s} | {'(novo)':>12s} | {current:>14,.0f} op/s")
+            continue
+        change = current / (base * speed) - 1
+        flag = "❌ REGRESSÃO" if change < -threshold else ("🚀" if change > threshold else "")
+        print(f"{name:28s} | {change:+11.1%} | {current:>14,.0f} op/s {flag}")
+        if change < -threshold:
+            regressions.append((name, base, current, change))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes do jogo e do agente.")
+    parser.add_argument("--group", choices=["micro", "macro", "all"], default="all")
+    parser.add_argument("--only", nargs="*", help="Roda apenas estes benchmarks (pelo nome).")
+    parser.add_argument("--min-time", type=float, default=None,
+                        help=f"Tempo mínimo de medição por benchmark (s); padrão: o da base no --compare, "
+                             f"senão {MIN_TIME}.")
+    parser.add_argument("--save", nargs="?", const=BASELINE_FILE, help="Grava os resultados como base.")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_FILE, help="Compara com uma base gravada.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Queda relativa que conta como regressão (0.15 = 15%%).")
+    parser.add_argument("--convergence", nargs="*", choices=LEARNING_MODES, metavar="MODO",
+                        help="Mede episódios e segundos até a taxa de vitória alvo em cada modo de aprendizado "
+                             f"(padrão: {' '.join(LEARNING_MODES)}).")
+    parser.add_argument("--target", type=float, default=CONVERGENCE_TARGET,
+                        help=f"Taxa de vitória gulosa alvo (padrão: {CONVERGENCE_TARGET}).")
+    parser.add_argument("--max-episodes", type=int, default=CONVERGENCE_EPISODES)
+    parser.add_argument("--eval-every", type=int, default=CONVERGENCE_EVAL_EVERY)
+    parser.add_argument("--eval-games", type=int, default=CONVERGENCE_EVAL_GAMES)
+    parser.add_argument("--seed", type=int, default=0, help="Semente do treino de convergência.")
+    args = parser.parse_args()
+
+    if args.convergence is not None:
+        run_convergence(args.convergence or LEARNING_MODES, target=args.target, max_episodes=args.max_episodes,
+                        eval_every=args.eval_every, eval_games=args.eval_games, seed=args.seed)
+        sys.exit(0)
+
+    # Compara nas mesmas condições em que a base foi gravada
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    min_time = args.min_time or (baseline or {}).get('min_time', MIN_TIME)
+    repeats = (baseline or {}).get('repeats', REPEATS)
+
+    groups = ("micro", "macro") if args.group == "all" else (args.group,)
+    results = run_benchmarks(groups, args.only, min_time, repeats)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'min_time': min_time, 'repeats': repeats,
+                       'results': results}, f, indent=2)
+        print(f"💾 Base salva em {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}.")
+            sys.exit(1)
+        print("✅ Nenhuma regressão.")
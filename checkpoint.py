@@ -0,0 +1,233 @@
+# checkpoint.py
+import os
+import pickle
+import random
+import numpy as np
+from qtable import QTable
+from model_store import export_mapped, MappedQTable
+
+CHECKPOINT_EVERY = 10_000  # episódios entre checkpoints
+COMPACT_EVERY = 10         # checkpoints incrementais antes de compactar
+
+class Checkpointer:
+    """
+    Checkpoints incrementais e à prova de queda para os treinos longos.
+
+    Arquivos no diretório (geração G):
+      base-G.qmap  -> snapshot completo da Tabela Q (formato do model_store)
+      base-G.visits.npy -> contagem de visitas de cada linha do snapshot
+      delta-G.log  -> log só de acréscimo com as linhas alteradas (valores e visitas) desde cada checkpoint
+      state.pkl    -> episódio, epsilon, alpha, estado dos RNGs e o tamanho válido do log
+    O state.pkl é trocado atomicamente (os.replace) e é ele que define o que vale:
+    um registro escrito pela metade no fim do log é simplesmente ignorado.
+    """
+
+    def __init__(self, directory, compact_every=COMPACT_EVERY, fresh=False):
+        """
+        fresh=True substitui um checkpoint anterior do diretório (treino novo, sem --resume).
+        O antigo só é apagado depois do primeiro checkpoint do treino novo: uma queda
+        antes disso não perde nada.
+        """
+        self.directory = directory
+        self.compact_every = compact_every
+        os.makedirs(directory, exist_ok=True)
+        self.fresh = fresh
+        self.state = self._read_state()
+
+    # --- Caminhos ---
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _base_path(self, generation):
+        return self._path(f"base-{generation}.qmap")
+
+    def _visits_path(self, generation):
+        return self._path(f"base-{generation}.visits.npy")
+
+    def _log_path(self, generation):
+        return self._path(f"delta-{generation}.log")
+
+    def _read_state(self):
+        try:
+            with open(self._path("state.pkl"), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_state(self, state):
+        tmp = self._path("state.pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path("state.pkl"))
+        self._fsync_directory()  # A troca do state.pkl também precisa chegar ao disco
+        self.state = state
+
+    def _fsync(self, path):
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    def _fsync_directory(self):
+        """Grava no disco as entradas do diretório (arquivos criados, renomeados, apagados)."""
+        if os.name == "nt":
+            return  # No Windows não dá para abrir um diretório; o NTFS já registra os nomes
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def exists(self):
+        return self.state is not None
+
+    # --- Gravação ---
+    def save(self, agent, episode, extra=None):
+        """
+        Grava um checkpoint. Só as linhas tocadas desde o último vão para o log;
+        a cada 'compact_every' checkpoints (ou no primeiro) o log vira uma nova base.
+        """
+        table = agent.q_table
+        rows = table.take_dirty()
+        state = {
+            'episode': episode,
+            'epsilon': agent.epsilon,
+            'alpha': agent.alpha,
+            'random_state': random.getstate(),
+            'np_random_state': np.random.get_state(),
+            'extra': extra,
+        }
+
+        # Checkpoint de antes da contagem de visitas: o log tem outro formato, recomeça por uma base
+        if self.fresh or self.state is None or self.state['deltas'] >= self.compact_every or not self.state.get('visits'):
+            self._compact(table, state)
+            return
+
+        generation = self.state['generation']
+        keys, values = table.export_rows(rows)
+        with open(self._log_path(generation), "ab") as f:
+            f.truncate(self.state['log_size'])  # Descarta sobra de uma gravação interrompida
+            f.seek(self.state['log_size'])
+            f.write(np.array([len(keys)], dtype="<u8").tobytes())
+            f.write(keys.astype("<i8").tobytes())
+            f.write(np.ascontiguousarray(values).tobytes())
+            f.write(table.export_visits(rows).astype("<u4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            log_size = f.tell()
+
+        state.update(generation=generation, log_size=log_size, deltas=self.state['deltas'] + 1,
+                     n_actions=table.n_actions, dtype=table.dtype.str, visits=True)
+        self._write_state(state)
+
+    def _compact(self, table, state):
+        """
+        Escreve a tabela inteira numa nova geração e apaga a anterior (ou tudo do treino antigo).
+        Ordem à prova de queda: nova geração sincronizada -> state.pkl trocado -> antiga apagada.
+        """
+        old = self.state['generation'] if self.state else None
+        generation = 0 if old is None else old + 1
+        export_mapped(table, self._base_path(generation))
+        # Mesma ordem das chaves do .qmap (ordenadas)
+        keys, _ = table.export()
+        np.save(self._visits_path(generation), table.export_visits()[np.argsort(keys, kind="stable")])
+        open(self._log_path(generation), "wb").close()
+        # A nova geração inteira no disco antes de o state.pkl apontar para ela
+        # (e antes de a anterior ser apagada)
+        for path in (self._base_path(generation), self._visits_path(generation), self._log_path(generation)):
+            self._fsync(path)
+        self._fsync_directory()
+
+        state.update(generation=generation, log_size=0, deltas=0,
+                     n_actions=table.n_actions, dtype=table.dtype.str, visits=True)
+        self._write_state(state)
+
+        if self.fresh:
+            # Primeiro checkpoint do treino novo já vale: sobras do anterior podem sair
+            keep = {os.path.basename(p) for p in (self._base_path(generation), self._visits_path(generation),
+                                                   self._log_path(generation))}
+            for name in os.listdir(self.directory):
+                if name.startswith(("base-", "delta-")) and name not in keep:
+                    os.remove(self._path(name))
+            self.fresh = False
+        elif old is not None:
+            for path in (self._base_path(old), self._visits_path(old), self._log_path(old)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # --- Leitura ---
+    def load(self, agent):
+        """
+        Restaura Tabela Q, epsilon, alpha e RNGs no agente.
+        Retorna o dicionário de estado (com 'episode' e 'extra') ou None se não houver checkpoint.
+        """
+        state = self.state
+        if state is None:
+            return None
+
+        generation = state['generation']
+        keys, values = MappedQTable(self._base_path(generation)).export()
+        # Checkpoints de antes da contagem de visitas não têm o arquivo nem as visitas no log
+        has_visits = state.get('visits', False)
+        visits = np.load(self._visits_path(generation)) if has_visits else None
+        table = QTable.from_arrays(keys, values, visits=visits)
+
+        dtype = np.dtype(state['dtype'])
+        n_actions = state['n_actions']
+        with open(self._log_path(generation), "rb") as f:
+            log = f.read(state['log_size'])
+        offset = 0
+        while offset < len(log):
+            n = int(np.frombuffer(log, dtype="<u8", count=1, offset=offset)[0])
+            offset += 8
+            delta_keys = np.frombuffer(log, dtype="<i8", count=n, offset=offset)
+            offset += 8 * n
+            delta_values = np.frombuffer(log, dtype=dtype, count=n * n_actions, offset=offset)
+            offset += n * n_actions * dtype.itemsize
+            delta_visits = np.zeros(n, dtype="<u4")
+            if has_visits:
+                delta_visits = np.frombuffer(log, dtype="<u4", count=n, offset=offset)
+                offset += 4 * n
+            for key, row, visits in zip(delta_keys.tolist(), delta_values.reshape(n, n_actions), delta_visits):
+                idx = table.row_index(key)  # Pode crescer a matriz: só depois indexa 'data'
+                table.data[idx] = row
+                table.visits[idx] = visits
+
+        table.take_dirty()  # Tudo o que foi lido já está salvo
+        agent.q_table = table
+        agent.epsilon = state['epsilon']
+        agent.alpha = state['alpha']
+        random.setstate(state['random_state'])
+        np.random.set_state(state['np_random_state'])
+        return state
+
+def add_checkpoint_args(parser, default_dir):
+    """Argumentos de linha de comando comuns aos três scripts de treino."""
+    parser.add_argument("--resume", action="store_true",
+                        help="Continua do último checkpoint em --checkpoint-dir.")
+    parser.add_argument("--checkpoint-dir", default=default_dir,
+                        help=f"Diretório dos checkpoints (padrão: {default_dir}).")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="Episódios entre checkpoints (0 desliga).")
+
+def resume_or_start(checkpointer, agent, resume, metrics, recorder=None):
+    """
+    Com --resume, restaura o agente e as janelas de 'metrics' e devolve o episódio
+    inicial; sem checkpoint (ou sem --resume), começa do episódio 1. Com um
+    GameRecorder, o log volta ao tamanho que tinha no checkpoint ('game_log' no extra).
+    """
+    if resume:
+        state = checkpointer.load(agent)
+        if state:
+            print(f"♻️ Retomando do episódio {state['episode'] + 1} "
+                  f"({len(agent.q_table)} estados, epsilon {agent.epsilon:.3f}, alpha {agent.alpha:.3f}).")
+            extra = state['extra'] or {}
+            metrics.restore(extra)
+            if recorder and 'game_log' in extra:
+                dropped = recorder.games - extra['game_log']
+                recorder.truncate(extra['game_log'])
+                if dropped > 0:
+                    print(f"✂️ {dropped} partidas do log posteriores ao checkpoint descartadas.")
+            return state['episode'] + 1
+        print(f"⚠️ Nenhum checkpoint em {checkpointer.directory}; começando do zero.")
+    return 1
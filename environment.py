@@ -1,23 +1,155 @@
 # environment.py
 import numpy as np
 import random
+import sys
+from array import array
 from settings import *
+from agent import SYM_WEIGHTS, TABLE_KEYS
+
+def generate_win_lines(size=BOARD_SIZE, length=WIN_LENGTH):
+    """Lista todas as linhas vencedoras (tuplas de índices de casas) do tabuleiro."""
+    lines = []
+    for r in range(size):
+        for c in range(size):
+            # Direções: horizontal, vertical, diagonal e anti-diagonal
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_r, end_c = r + dr * (length - 1), c + dc * (length - 1)
+                if 0 <= end_r < size and 0 <= end_c < size:
+                    lines.append(tuple((r + dr * k) * size + (c + dc * k) for k in range(length)))
+    return lines
+
+# Tabelas pré-calculadas a partir de settings (24 linhas no 4x4 com 3 em linha)
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+WIN_LINES = generate_win_lines()
+WIN_LINES_ARRAY = np.array(WIN_LINES)  # (n_linhas, WIN_LENGTH), usado pelo motor NumPy
+WIN_MASKS = [sum(1 << i for i in line) for line in WIN_LINES]
+# Para cada casa, só as máscaras que passam por ela (as únicas que uma jogada pode completar)
+CELL_WIN_MASKS = [[m for m in WIN_MASKS if m >> cell & 1] for cell in range(NUM_CELLS)]
+FULL_MASK = (1 << NUM_CELLS) - 1
+# Para cada casa, os índices das linhas que passam por ela; e a soma dos índices de cada linha
+CELL_LINES = [[i for i, line in enumerate(WIN_LINES) if cell in line] for cell in range(NUM_CELLS)]
+LINE_SUMS = [sum(line) for line in WIN_LINES]
+MIXED = -1  # dono de uma linha com peças de mais de um jogador (morta para todos)
+
+# Peso de cada casa nas 8 simetrias (SYM_WEIGHTS do agente), empacotados num só inteiro:
+# o campo de 64 bits t guarda o peso na simetria t, então somar um inteiro soma nas 8 de uma vez
+SYM_FIELD_BITS = 64
+SYM_CELL_WEIGHTS = [sum(int(w) << (SYM_FIELD_BITS * t) for t, w in enumerate(SYM_WEIGHTS[:, cell]))
+                    for cell in range(NUM_CELLS)]
+SYM_BYTES = len(SYM_WEIGHTS) * SYM_FIELD_BITS // 8
+
+class SymmetryKeys:
+    """
+    Chaves canônicas (as mesmas do QAgent) de todos os assentos, mantidas a cada jogada.
+    Na visão do assento s a casa vale 1 (peça dele), 2 (peça de outro) ou 0, então o
+    código da simetria t é 2 * total[t] - own[s][t], onde total soma os pesos de todas
+    as peças e own[s] só os das peças de s. Jogar soma o peso da casa nos dois
+    (estilo Zobrist, só que aditivo); a chave de um assento é o mínimo de 8 inteiros.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.own = [0] * (NUM_PLAYERS + 1)
+
+    def place(self, cell, player_id):
+        weights = SYM_CELL_WEIGHTS[cell]
+        self.total += weights
+        self.own[player_id] += weights
+
+    def key(self, seat):
+        """(código canônico, transformação) na visão de 'seat', igual a canonicalize(visão)."""
+        # Nenhum campo fica negativo (own <= total), então a conta empacotada não "empresta" bits
+        packed = 2 * self.total - self.own[seat]
+        codes = array('q', packed.to_bytes(SYM_BYTES, sys.byteorder))
+        code = min(codes)
+        return code, codes.index(code)
+
+class NoSymmetryKeys:
+    """Tabuleiros grandes demais para a chave int64: não mantém nada (só agentes sem chave jogam)."""
+
+    def place(self, cell, player_id):
+        pass
+
+    def key(self, seat):
+        raise ValueError(f"Tabuleiro {BOARD_SIZE}x{BOARD_SIZE} não tem chave canônica int64 (máximo 6x6)")
+
+def symmetry_keys():
+    return SymmetryKeys() if TABLE_KEYS else NoSymmetryKeys()
+
+class LineTracker:
+    """
+    Contadores por linha, atualizados só nas linhas que passam pela casa jogada.
+    Uma linha viva tem peças de um único jogador ('owner'), então o par
+    (owner, filled) já é a contagem por jogador: vitória e ameaça viram
+    comparações de contador. Ameaça = linha viva a uma peça de completar.
+    """
+
+    def __init__(self):
+        n = len(WIN_LINES)
+        self.owner = [EMPTY] * n     # EMPTY, id do único jogador na linha ou MIXED
+        self.filled = [0] * n        # peças na linha
+        self.cell_sum = [0] * n      # soma das casas ocupadas (acha a casa que falta em O(1))
+        self.threats = [set() for _ in range(NUM_PLAYERS + 1)]  # linhas-ameaça de cada jogador
+        self.created = 0   # ameaças criadas pela última jogada
+        self.blocked = 0   # ameaças adversárias bloqueadas pela última jogada
+
+    def place(self, cell, player_id):
+        """Atualiza as linhas da casa; retorna True se a jogada completou uma linha."""
+        won = False
+        created = blocked = 0
+        owner, filled, cell_sum = self.owner, self.filled, self.cell_sum
+        for line in CELL_LINES[cell]:
+            before = owner[line]
+            if before > EMPTY and filled[line] == WIN_LENGTH - 1:
+                self.threats[before].discard(line)  # Completada ou bloqueada: deixa de ser ameaça
+                if before != player_id:
+                    blocked += 1
+            if before == EMPTY:
+                owner[line] = player_id
+            elif before != player_id:
+                owner[line] = MIXED
+            filled[line] += 1
+            cell_sum[line] += cell
+            if owner[line] == player_id:
+                if filled[line] == WIN_LENGTH:
+                    won = True
+                elif filled[line] == WIN_LENGTH - 1:
+                    self.threats[player_id].add(line)
+                    created += 1
+        self.created, self.blocked = created, blocked
+        return won
+
+    def threat_cells(self, player_id):
+        """Casas que completariam uma linha de 'player_id' na próxima jogada."""
+        return {LINE_SUMS[line] - self.cell_sum[line] for line in self.threats[player_id]}
+
+    def threatened(self, player_ids=OPPONENTS):
+        """Algum dos jogadores tem uma linha a uma peça de completar?"""
+        return any(self.threats[p] for p in player_ids)
 
 class TicTacToeEnv:
-    def __init__(self, opponent_brains=None):
+    def __init__(self, opponent_brains=None, shaped_rewards=False, recorder=None):
         """
         opponent_brains: Dicionário {player_id: brain_instance}.
         Exemplo: {2: elite_brain, 3: basic_brain, 4: None}
         Se a chave não existir ou for None, joga Aleatório.
+        shaped_rewards: soma THREAT, BLOCK e IGNORE_DEFENSE à recompensa do agente.
+        recorder: game_log.GameRecorder que recebe cada peça colocada (grava todas as partidas).
         """
         # ATUALIZAÇÃO: Aceita um dicionário, não apenas um único cérebro
         self.opponent_brains = opponent_brains if opponent_brains else {}
+        self.shaped_rewards = shaped_rewards
+        self.recorder = recorder
         self.reset()
 
     def reset(self):
         self.board = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+        self.lines = LineTracker()
+        self.keys = symmetry_keys()
         self.done = False
         self.winner = None
+        if self.recorder is not None:
+            self.recorder.start()
         return self.board.flatten()
 
     def is_valid_move(self, action):
@@ -26,31 +158,45 @@ class TicTacToeEnv:
             return self.board[row, col] == EMPTY
         return False
 
+    def valid_moves(self):
+        return [i for i in range(NUM_CELLS) if self.board.flat[i] == EMPTY]
+
     def check_winner(self, player_id):
-        b = self.board
-        n = BOARD_SIZE
-        target = WIN_LENGTH
-
-        # 1. Checar Linhas e Colunas
-        for i in range(n):
-            row = b[i, :]
-            col = b[:, i]
-            for j in range(n - target + 1):
-                if np.all(row[j : j + target] == player_id): return True
-                if np.all(col[j : j + target] == player_id): return True
-
-        # 2. Checar Diagonais
-        for r in range(n - target + 1):
-            for c in range(n - target + 1):
-                sub_grid = b[r : r + target, c : c + target]
-                if np.all(sub_grid.diagonal() == player_id): return True
-                if np.all(np.fliplr(sub_grid).diagonal() == player_id): return True
-                    
-        return False
+        """Alguma linha vencedora toda de 'player_id'? (uma indexação na tabela de linhas)"""
+        return bool((self.board.flat[WIN_LINES_ARRAY] == player_id).all(axis=1).any())
 
     def is_draw(self):
         return not np.any(self.board == EMPTY)
 
+    def place(self, action, player_id):
+        """Coloca a peça e retorna True se a jogada venceu o jogo (só olha as linhas da casa)."""
+        self.board.flat[action] = player_id
+        self.keys.place(action, player_id)
+        won = self.lines.place(action, player_id)
+        if self.recorder is not None:
+            self.recorder.move(action, player_id, won)
+        return won
+
+    def canonical_key(self, seat=AGENT_ID):
+        """Chave canônica e transformação do tabuleiro na visão de 'seat' (sem cópias)."""
+        return self.keys.key(seat)
+
+    def threats(self, player_id):
+        """Casas que dariam a vitória a 'player_id' na próxima jogada."""
+        return self.lines.threat_cells(player_id)
+
+    def shaping_reward(self, threatened):
+        """
+        Recompensa extra da jogada do agente que acabou de ser feita:
+        ameaças criadas, ameaças inimigas bloqueadas e defesa ignorada
+        ('threatened': algum oponente estava a uma peça de vencer antes da jogada).
+        """
+        lines = self.lines
+        reward = lines.created * REWARDS['THREAT'] + lines.blocked * REWARDS['BLOCK']
+        if threatened and not lines.blocked:
+            reward += REWARDS['IGNORE_DEFENSE']
+        return reward
+
     def get_opponent_view(self, player_id):
         """
         Gera a ilusão de ótica: O oponente 'player_id' vê o tabuleiro 
@@ -68,7 +214,42 @@ class TicTacToeEnv:
         # 3. Transformar o jogador atual em '1' (Para bater com a Q-Table)
         view[my_pos] = 1
         
-        return view # Retorna matriz 4x4
+        return view # Retorna matriz BOARD_SIZE x BOARD_SIZE
+
+    def brain_action(self, brain, opp_id, valid_moves):
+        """Pede a jogada a um cérebro, do ponto de vista do oponente 'opp_id'."""
+        if hasattr(brain, 'choose_action_from_key'):
+            # Chave já mantida pelo ambiente: sem cópia da visão nem canonicalização
+            state_key, transform = self.canonical_key(opp_id)
+            old_eps = brain.epsilon
+            brain.epsilon = 0.0
+            action = brain.choose_action_from_key(state_key, transform, valid_moves)
+            brain.epsilon = old_eps
+            return action
+
+        if hasattr(brain, 'act'):
+            # Política compilada: lê o tabuleiro bruto direto, sem cópia da visão
+            return brain.act(self.board, opp_id)
+
+        opp_view = self.get_opponent_view(opp_id)
+
+        # Garante que ele jogue sério (sem errar de propósito)
+        old_eps = brain.epsilon
+        brain.epsilon = 0.0
+        action = brain.choose_action(opp_view, valid_moves)
+        brain.epsilon = old_eps # Restaura configuração original
+        return action
+
+    def opponent_action(self, opp_id, valid_moves):
+        # --- LÓGICA DO BATTLE ROYALE ---
+        # Verifica se existe um cérebro específico para este ID na mesa
+        brain = self.opponent_brains.get(opp_id)
+
+        if brain:
+            # Se tem cérebro, usa a visão inteligente
+            return self.brain_action(brain, opp_id, valid_moves)
+        # Se for None (ou não estiver no dict), joga o CAOS (Aleatório)
+        return random.choice(valid_moves)
 
     def play_opponents(self):
         if self.done: return
@@ -79,33 +260,14 @@ class TicTacToeEnv:
                 self.done = True
                 return
 
-            valid_moves = [i for i in range(BOARD_SIZE**2) if self.board.flatten()[i] == 0]
+            valid_moves = self.valid_moves()
             if not valid_moves: 
                 self.done = True
                 return
 
-            # --- LÓGICA DO BATTLE ROYALE ---
-            # Verifica se existe um cérebro específico para este ID na mesa
-            brain = self.opponent_brains.get(opp_id)
-            
-            if brain:
-                # Se tem cérebro, usa a visão inteligente
-                opp_view = self.get_opponent_view(opp_id)
-                
-                # Garante que ele jogue sério (sem errar de propósito)
-                old_eps = brain.epsilon
-                brain.epsilon = 0.0
-                action = brain.choose_action(opp_view, valid_moves)
-                brain.epsilon = old_eps # Restaura configuração original
-            else:
-                # Se for None (ou não estiver no dict), joga o CAOS (Aleatório)
-                action = random.choice(valid_moves)
-            # -------------------------------
-
-            row, col = divmod(action, BOARD_SIZE)
-            self.board[row, col] = opp_id
-
-            if self.check_winner(opp_id):
+            action = self.opponent_action(opp_id, valid_moves)
+
+            if self.place(action, opp_id):
                 self.winner = opp_id
                 self.done = True
                 return
@@ -122,24 +284,155 @@ class TicTacToeEnv:
             return self.board.flatten(), REWARDS['INVALID'], self.done, {}
 
         # 2. Executa Jogada do Agente Principal
-        row, col = divmod(action, BOARD_SIZE)
-        self.board[row, col] = AGENT_ID
-        
-        if self.check_winner(AGENT_ID):
+        threatened = self.shaped_rewards and self.lines.threatened()
+        if self.place(action, AGENT_ID):
             self.done = True
             return self.board.flatten(), REWARDS['WIN'], True, {'result': 'Win'}
-            
-        reward = REWARDS['STEP']
+
+        # Recompensas de formação (ameaça/bloqueio/defesa), se ligadas
+        shaping = self.shaping_reward(threatened) if self.shaped_rewards else 0
         if self.is_draw():
             self.done = True
-            return self.board.flatten(), REWARDS['DRAW'], True, {'result': 'Draw'}
+            return self.board.flatten(), REWARDS['DRAW'] + shaping, True, {'result': 'Draw'}
 
         # 3. Oponentes jogam (Usando lógica mista definida no init)
         self.play_opponents()
 
         if self.done:
             if self.winner in OPPONENTS:
-                return self.board.flatten(), REWARDS['LOSS'], True, {'result': 'Loss'}
-            return self.board.flatten(), REWARDS['DRAW'], True, {'result': 'Draw'}
+                return self.board.flatten(), REWARDS['LOSS'] + shaping, True, {'result': 'Loss'}
+            return self.board.flatten(), REWARDS['DRAW'] + shaping, True, {'result': 'Draw'}
+
+        return self.board.flatten(), REWARDS['STEP'] + shaping, False, {}
+
+class BitboardTicTacToeEnv(TicTacToeEnv):
+    """
+    Motor alternativo com a mesma API (reset/step) do TicTacToeEnv.
+    Cada jogador guarda suas peças num inteiro (bitmask) e a vitória é
+    checada com um AND contra as máscaras pré-calculadas que passam pela
+    casa jogada, sem nenhuma chamada NumPy no caminho quente.
+    """
+
+    def reset(self):
+        self.bits = [0] * (NUM_PLAYERS + 1)  # bitmask de cada jogador (índice = id)
+        self.occupied = 0                     # bitmask de todas as casas ocupadas
+        self.cells = [EMPTY] * NUM_CELLS      # cópia plana para montar observações
+        # Contadores de linha só quando as recompensas de formação estão ligadas (a vitória usa as máscaras)
+        self.lines = LineTracker() if self.shaped_rewards else None
+        self.keys = symmetry_keys()
+        self.done = False
+        self.winner = None
+        if self.recorder is not None:
+            self.recorder.start()
+        return self.observation()
+
+    @property
+    def board(self):
+        """Matriz 4x4 montada sob demanda (compatível com o motor NumPy)."""
+        return np.array(self.cells).reshape(BOARD_SIZE, BOARD_SIZE)
+
+    def observation(self):
+        return np.array(self.cells)
+
+    def is_valid_move(self, action):
+        return 0 <= action < NUM_CELLS and not (self.occupied >> action) & 1
+
+    def valid_moves(self):
+        return [i for i, v in enumerate(self.cells) if v == EMPTY]
+
+    def place(self, action, player_id):
+        """Coloca a peça e retorna True se a jogada venceu o jogo."""
+        bit = 1 << action
+        bits = self.bits[player_id] | bit
+        self.bits[player_id] = bits
+        self.occupied |= bit
+        self.cells[action] = player_id
+        self.keys.place(action, player_id)
+        if self.lines is not None:
+            self.lines.place(action, player_id)
+        won = False
+        for mask in CELL_WIN_MASKS[action]:
+            if bits & mask == mask:
+                won = True
+                break
+        if self.recorder is not None:
+            self.recorder.move(action, player_id, won)
+        return won
+
+    def check_winner(self, player_id):
+        bits = self.bits[player_id]
+        for mask in WIN_MASKS:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def is_draw(self):
+        return self.occupied == FULL_MASK
+
+    def threats(self, player_id):
+        """Casas que dariam a vitória a 'player_id' (direto das máscaras se não houver contadores)."""
+        if self.lines is not None:
+            return self.lines.threat_cells(player_id)
+        own, occupied = self.bits[player_id], self.occupied
+        return {(mask ^ (own & mask)).bit_length() - 1 for mask in WIN_MASKS
+                if occupied & mask == own & mask and (own & mask).bit_count() == WIN_LENGTH - 1}
+
+    def get_opponent_view(self, player_id):
+        view = [EMPTY if v == EMPTY else (1 if v == player_id else 2) for v in self.cells]
+        return np.array(view).reshape(BOARD_SIZE, BOARD_SIZE)
+
+    def play_opponents(self):
+        if self.done: return
+
+        for opp_id in OPPONENTS:
+            if self.occupied == FULL_MASK:
+                self.done = True
+                return
+
+            action = self.opponent_action(opp_id, self.valid_moves())
+
+            if self.place(action, opp_id):
+                self.winner = opp_id
+                self.done = True
+                return
+
+            if self.occupied == FULL_MASK:
+                self.done = True
+                return
+
+    def step(self, action):
+        if self.done: return self.observation(), 0, True, {}
+
+        if not self.is_valid_move(action):
+            return self.observation(), REWARDS['INVALID'], self.done, {}
+
+        threatened = self.shaped_rewards and self.lines.threatened()
+        if self.place(action, AGENT_ID):
+            self.done = True
+            return self.observation(), REWARDS['WIN'], True, {'result': 'Win'}
+
+        shaping = self.shaping_reward(threatened) if self.shaped_rewards else 0
+        if self.occupied == FULL_MASK:
+            self.done = True
+            return self.observation(), REWARDS['DRAW'] + shaping, True, {'result': 'Draw'}
+
+        self.play_opponents()
+
+        if self.done:
+            if self.winner in OPPONENTS:
+                return self.observation(), REWARDS['LOSS'] + shaping, True, {'result': 'Loss'}
+            return self.observation(), REWARDS['DRAW'] + shaping, True, {'result': 'Draw'}
+
+        return self.observation(), REWARDS['STEP'] + shaping, False, {}
+
+
+ENGINES = {
+    'numpy': TicTacToeEnv,
+    'bitboard': BitboardTicTacToeEnv,
+}
 
-        return self.board.flatten(), reward, False, {}
\ No newline at end of file
+def make_env(opponent_brains=None, engine=ENGINE, shaped_rewards=False, recorder=None):
+    """Cria o ambiente com o motor escolhido ('numpy' ou 'bitboard')."""
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconhecido: {engine!r}. Opções: {sorted(ENGINES)}")
+    return ENGINES[engine](opponent_brains=opponent_brains, shaped_rewards=shaped_rewards, recorder=recorder)
@@ -0,0 +1,255 @@
+# game_log.py
+import argparse
+import os
+import sys
+from array import array
+import numpy as np
+from settings import *
+
+# Formato ".glog": cabeçalho fixo + registros de tamanho fixo, um por partida.
+# Registro = [jogadas, vencedor (0 = empate), lance_1, ..., lance_NUM_CELLS] no mesmo tipo inteiro;
+# cada lance é assento * NUM_CELLS + casa (assento >= 1, então 0 sobra para o preenchimento).
+# No 4x4 a 4 jogadores são 18 bytes por partida: 100M partidas cabem em ~1.8 GB.
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+GAME_LOG_EXT = ".glog"
+MAGIC = b"GLOG0001"
+HEADER_SIZE = 16
+RECORD_LEN = NUM_CELLS + 2
+MOVE_DTYPE = np.dtype("<u1") if (NUM_PLAYERS + 1) * NUM_CELLS <= 256 else np.dtype("<u2")
+MOVE_TYPECODE = "B" if MOVE_DTYPE.itemsize == 1 else "H"
+PADDING = (0,) * NUM_CELLS
+WRITE_BUFFER = 8192     # partidas acumuladas antes de cada escrita
+READ_CHUNK = 200_000    # partidas por bloco na leitura (memória limitada a um bloco)
+OPENING_DEPTH = 4       # lances na árvore de aberturas
+
+def _header():
+    fields = np.array([BOARD_SIZE, WIN_LENGTH, NUM_PLAYERS, MOVE_DTYPE.itemsize], dtype="<u2")
+    return MAGIC + fields.tobytes()
+
+def _check_header(header, filename):
+    if header[:8] != MAGIC:
+        raise ValueError(f"{filename} não é um log de partidas {GAME_LOG_EXT}")
+    if header != _header():
+        size, length, players, _ = np.frombuffer(header[8:16], dtype="<u2").tolist()
+        raise ValueError(f"{filename} foi gravado para outro jogo ({size}x{size}, {length} em linha, "
+                         f"{players} jogadores)")
+
+class GameRecorder:
+    """
+    Grava cada partida como um registro binário de tamanho fixo num arquivo só de
+    acréscimo. O ambiente chama move() a cada peça colocada; a partida é fechada
+    sozinha na vitória ou no tabuleiro cheio e vai para um buffer, escrito em lote.
+    """
+
+    def __init__(self, filename, buffer_games=WRITE_BUFFER):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.filename = filename
+        self.file = open(filename, "ab")
+        self.games = 0  # partidas no arquivo (com as do buffer)
+        if self.file.tell() == 0:
+            self.file.write(_header())
+        else:
+            with open(filename, "rb") as f:
+                _check_header(f.read(HEADER_SIZE), filename)
+            self.games = count_games(filename)
+        self.flush_size = buffer_games * RECORD_LEN
+        self.pending = array(MOVE_TYPECODE)
+        self.moves = []
+
+    def start(self):
+        """Nova partida (descarta uma partida interrompida antes do fim)."""
+        self.moves = []
+
+    def move(self, cell, seat, won=False):
+        moves = self.moves
+        moves.append(seat * NUM_CELLS + cell)
+        if won:
+            self.finish(seat)
+        elif len(moves) == NUM_CELLS:
+            self.finish(EMPTY)
+
+    def finish(self, winner):
+        n = len(self.moves)
+        pending = self.pending
+        pending.append(n)
+        pending.append(winner)
+        pending.extend(self.moves)
+        pending.extend(PADDING[n:])
+        self.moves = []
+        self.games += 1
+        if len(pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            if MOVE_DTYPE.itemsize > 1 and sys.byteorder == "big":
+                self.pending.byteswap()  # O arquivo é sempre little-endian
+            self.pending.tofile(self.file)
+            self.pending = array(MOVE_TYPECODE)
+        self.file.flush()
+
+    def truncate(self, games):
+        """
+        Corta o arquivo nas primeiras 'games' partidas (e um registro pela metade no fim).
+        No --resume, descarta as partidas jogadas depois do checkpoint, que serão jogadas de novo.
+        """
+        self.flush()
+        self.games = min(games, self.games)
+        self.file.truncate(HEADER_SIZE + self.games * RECORD_LEN * MOVE_DTYPE.itemsize)
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Leitura ---
+def iter_chunks(filename, chunk_games=READ_CHUNK):
+    """Blocos (n, RECORD_LEN) de registros, lidos em sequência sem carregar o arquivo inteiro."""
+    with open(filename, "rb") as f:
+        _check_header(f.read(HEADER_SIZE), filename)
+        while True:
+            chunk = np.fromfile(f, dtype=MOVE_DTYPE, count=chunk_games * RECORD_LEN)
+            n = len(chunk) // RECORD_LEN  # Um registro cortado no fim (gravação em curso) fica de fora
+            if n == 0:
+                return
+            yield chunk[:n * RECORD_LEN].reshape(n, RECORD_LEN)
+
+def decode(records):
+    """(jogadas, vencedores, assentos, casas) de um bloco; assentos/casas valem 0 após o fim."""
+    records = records.astype(np.int32)
+    seats, cells = np.divmod(records[:, 2:], NUM_CELLS)
+    return records[:, 0], records[:, 1], seats, cells
+
+def read_games(filename, chunk_games=READ_CHUNK):
+    """Gerador de partidas: (vencedor ou None, [(assento, casa), ...]) na ordem das jogadas."""
+    for chunk in iter_chunks(filename, chunk_games):
+        for record in chunk.tolist():
+            n, winner = record[0], record[1]
+            moves = [divmod(code, NUM_CELLS) for code in record[2:2 + n]]
+            yield (winner or None), moves
+
+def count_games(filename):
+    return (os.path.getsize(filename) - HEADER_SIZE) // (RECORD_LEN * MOVE_DTYPE.itemsize)
+
+# --- Estatísticas ---
+class OpeningStats:
+    """
+    Agregador de aberturas e casas, bloco a bloco (memória fixa, qualquer número de partidas):
+      - árvore de aberturas: resultados por sequência dos primeiros 'depth' lances;
+      - por assento e casa: vezes jogada e vezes em que quem jogou ali venceu;
+      - distribuição das durações, vencedores e casas dos lances vencedores.
+    Os contadores de resultado são indexados pelo vencedor (0 = empate, 1..NUM_PLAYERS).
+    """
+
+    def __init__(self, depth=OPENING_DEPTH):
+        self.depth = depth
+        self.base = (NUM_PLAYERS + 1) * NUM_CELLS  # lances possíveis (códigos do registro)
+        if self.base ** depth * (NUM_PLAYERS + 1) >= 2 ** 63:
+            raise ValueError(f"Profundidade {depth} grande demais para este tabuleiro")
+        self.games = 0
+        self.winners = np.zeros(NUM_PLAYERS + 1, dtype=np.int64)
+        self.lengths = np.zeros(NUM_CELLS + 1, dtype=np.int64)
+        self.played = np.zeros((NUM_PLAYERS + 1, NUM_CELLS), dtype=np.int64)
+        self.won = np.zeros((NUM_PLAYERS + 1, NUM_CELLS), dtype=np.int64)
+        self.winning_cells = np.zeros(NUM_CELLS, dtype=np.int64)
+        self.tree = {}  # código da sequência de lances -> contadores por vencedor
+
+    def add(self, records):
+        lengths, winners, seats, cells = decode(records)
+        n = len(records)
+        self.games += n
+        self.winners += np.bincount(winners, minlength=NUM_PLAYERS + 1)
+        self.lengths += np.bincount(lengths, minlength=NUM_CELLS + 1)
+
+        # Casa x assento (só os lances realmente jogados; o preenchimento tem assento 0)
+        played = seats > 0
+        flat = seats * NUM_CELLS + cells
+        self.played += np.bincount(flat[played], minlength=self.played.size).reshape(self.played.shape)
+        by_winner = played & (seats == winners[:, None])
+        self.won += np.bincount(flat[by_winner], minlength=self.won.size).reshape(self.won.shape)
+        decided = winners > 0
+        last = cells[np.arange(n), np.maximum(lengths - 1, 0)]
+        self.winning_cells += np.bincount(last[decided], minlength=NUM_CELLS)
+
+        # Árvore: cada prefixo vira um número em base 'base' (prefixos de tamanhos diferentes
+        # não colidem: o primeiro dígito nunca é 0)
+        codes = records[:, 2:2 + self.depth].astype(np.int64)
+        prefix = np.zeros(n, dtype=np.int64)
+        outcomes = NUM_PLAYERS + 1
+        for d in range(self.depth):
+            prefix = prefix * self.base + codes[:, d]
+            deep = lengths > d
+            keys, counts = np.unique(prefix[deep] * outcomes + winners[deep], return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                node, winner = divmod(key, outcomes)
+                if node not in self.tree:
+                    self.tree[node] = [0] * outcomes
+                self.tree[node][winner] += count
+
+    def add_file(self, filename, chunk_games=READ_CHUNK):
+        for chunk in iter_chunks(filename, chunk_games):
+            self.add(chunk)
+        return self
+
+    def _moves(self, node):
+        moves = []
+        while node:
+            node, code = divmod(node, self.base)
+            moves.append(divmod(code, NUM_CELLS))
+        return moves[::-1]
+
+    def openings(self, depth=1, top=None):
+        """[(lances [(assento, casa)], partidas, contadores por vencedor)] da profundidade, mais jogados primeiro."""
+        low, high = self.base ** (depth - 1), self.base ** depth
+        rows = [(self._moves(node), sum(counts), counts)
+                for node, counts in self.tree.items() if low <= node < high]
+        rows.sort(key=lambda row: -row[1])
+        return rows[:top] if top else rows
+
+    def cell_win_rate(self, seat=AGENT_ID):
+        """Matriz BOARD_SIZE x BOARD_SIZE: fração das partidas vencidas por 'seat' quando jogou na casa."""
+        played = self.played[seat]
+        rate = np.divide(self.won[seat], played, out=np.zeros(NUM_CELLS), where=played > 0)
+        return rate.reshape(BOARD_SIZE, BOARD_SIZE)
+
+    def report(self, depth=2, top=10):
+        total = max(self.games, 1)
+        print(f"🎲 {self.games:,} partidas | duração média: "
+              f"{(self.lengths * np.arange(NUM_CELLS + 1)).sum() / total:.2f} lances")
+        print("Vencedores: " + " | ".join(
+            f"{'Empate' if w == EMPTY else SYMBOLS[w]}: {self.winners[w] / total * 100:.1f}%"
+            for w in range(NUM_PLAYERS + 1)))
+        for seat in range(1, NUM_PLAYERS + 1):
+            print(f"\n{SYMBOLS[seat]} — vitórias de quem jogou em cada casa:")
+            for row in self.cell_win_rate(seat):
+                print("  " + " ".join(f"{v * 100:5.1f}" for v in row))
+        for d in range(1, min(depth, self.depth) + 1):
+            print(f"\n📖 Aberturas mais jogadas ({d} lance{'s' if d > 1 else ''}):")
+            for moves, n, counts in self.openings(d, top):
+                line = " ".join(f"{SYMBOLS[s]}{c}" for s, c in moves)
+                rates = " ".join(f"{SYMBOLS[w] if w else '='}:{counts[w] / n * 100:4.1f}%"
+                                 for w in range(NUM_PLAYERS + 1))
+                print(f"  {line:24s} {n:>10,} | {rates}")
+
+def add_game_log_args(parser):
+    """Argumento de linha de comando do log de partidas, comum aos scripts de treino."""
+    parser.add_argument("--game-log", default=None,
+                        help=f"Grava todas as partidas num log binário ({GAME_LOG_EXT}) para análise.")
+
+if __name__ == "__main__":
+    # Uso: python game_log.py logs/train.glog [--depth 3] [--top 10]
+    parser = argparse.ArgumentParser(description="Estatísticas de aberturas e casas de um log de partidas.")
+    parser.add_argument("path")
+    parser.add_argument("--depth", type=int, default=2, help="Profundidade das aberturas mostradas.")
+    parser.add_argument("--top", type=int, default=10, help="Aberturas mostradas por profundidade.")
+    args = parser.parse_args()
+
+    stats = OpeningStats(max(args.depth, 1)).add_file(args.path)
+    stats.report(args.depth, args.top)
@@ -0,0 +1,310 @@
+# league.py
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import random
+import shutil
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from environment import make_env
+from agent import QAgent, NUM_CELLS
+from policy import CompiledPolicy
+from metrics import open_sink
+from settings import *
+
+LEAGUE_DIR = "league"            # Onde cada membro é salvo no fim
+LEAGUE_MEMBERS = 4
+LEAGUE_ROUNDS = 25
+ROUND_EPISODES = 2000            # episódios de cada membro por rodada
+RANDOM_OPPONENT = -1             # "Membro" aleatório da liga (o fator Caos do train_final)
+WINRATE_DECAY = 0.7              # peso das rodadas antigas no placar do matchmaking
+PFSP_POWER = 2                   # quanto o matchmaking insiste nos adversários difíceis
+PFSP_FLOOR = 0.05                # chance mínima de qualquer adversário
+SEEDED_EPSILON = 0.2             # membro que começa de um modelo salvo explora menos (como no train_final)
+SHM_PREFIX = "velha_league"
+OUTCOMES = ('win', 'draw', 'loss')
+
+# --- Snapshots em memória compartilhada ---
+def snapshot_size(n_states):
+    # chaves (int64) + jogadas ordenadas (int8 x NUM_CELLS) + empates no topo (int8)
+    return max(1, n_states * (8 + NUM_CELLS + 1))
+
+def publish_snapshot(agent, name):
+    """Compila a política gulosa do agente num segmento novo de memória compartilhada."""
+    policy = CompiledPolicy.compile(agent)
+    n = len(policy)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=snapshot_size(n))
+    keys, ranked, n_best = _views(shm.buf, n)
+    keys[:], ranked[:], n_best[:] = policy.keys, policy.ranked, policy.n_best
+    del keys, ranked, n_best  # Sem views abertas o segmento pode ser fechado
+    shm.close()
+    return name, n
+
+def _views(buf, n):
+    keys = np.ndarray(n, dtype=np.int64, buffer=buf, offset=0)
+    ranked = np.ndarray((n, NUM_CELLS), dtype=np.int8, buffer=buf, offset=8 * n)
+    n_best = np.ndarray(n, dtype=np.int8, buffer=buf, offset=(8 + NUM_CELLS) * n)
+    return keys, ranked, n_best
+
+def unlink_snapshot(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+class SharedPolicy(CompiledPolicy):
+    """
+    CompiledPolicy lida no lugar de um segmento de memória compartilhada: as
+    buscas são binárias sobre as chaves ordenadas e nada é copiado para o
+    processo (nem o dicionário de índices), então a memória não cresce com
+    o número de workers.
+    """
+
+    def __init__(self, name, n_states):
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.keys, self.ranked, self.n_best = _views(self.shm.buf, n_states)
+
+    def _find(self, key):
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def _pick(self, row):
+        n = int(self.n_best[row])
+        # Quebra de empate aleatória, igual ao choose_action
+        return int(self.ranked[row, random.randrange(n) if n > 1 else 0])
+
+    def close(self):
+        self.keys = self.ranked = self.n_best = None
+        self.shm.close()
+
+# --- Worker: treina os membros que são dele ---
+def play_episode(agent, env):
+    """Um episódio de treino do membro no assento AGENT_ID; retorna o resultado ('Win', 'Loss', 'Draw')."""
+    env.reset()
+    state_key, transform = env.canonical_key()
+    done, info = False, {}
+    while not done:
+        valid_moves = env.valid_moves()
+        if not valid_moves: break
+        action = agent.choose_action_from_key(state_key, transform, valid_moves)
+        _, reward, done, info = env.step(action)
+        next_key, next_transform = env.canonical_key()
+        agent.learn_from_keys(state_key, transform, action, reward, next_key, done)
+        state_key, transform = next_key, next_transform
+    return info.get('result')
+
+def train_member(agent, env, opponents, weights, episodes, policies):
+    """
+    'episodes' partidas do membro; a cada uma os assentos adversários são sorteados
+    entre 'opponents' (ids de membros ou RANDOM_OPPONENT) com os pesos do matchmaking.
+    Retorna (counts, total): counts[i] = [vitórias, empates, derrotas] do membro com
+    opponents[i] na mesa e total = os mesmos números somando todas as partidas.
+    """
+    counts = np.zeros((len(opponents), len(OUTCOMES)), dtype=np.int64)
+    total = np.zeros(len(OUTCOMES), dtype=np.int64)
+    index = {o: i for i, o in enumerate(opponents)}
+    for _ in range(episodes):
+        table = random.choices(opponents, weights, k=len(OPPONENTS))
+        env.opponent_brains = {seat: policies.get(o) for seat, o in zip(OPPONENTS, table)}
+        result = play_episode(agent, env)
+        outcome = 0 if result == 'Win' else 1 if result == 'Draw' else 2
+        total[outcome] += 1
+        for o in set(table):
+            counts[index[o], outcome] += 1
+
+        if agent.epsilon > EPSILON_MIN:
+            agent.epsilon *= EPSILON_DECAY
+        agent.decay_alpha()
+    return counts, total
+
+def league_worker(worker_id, members, token, tasks, results, seed, shaped_rewards):
+    """
+    Processo da liga. 'members' = {id: (modelo inicial ou None, arquivo final)}.
+    A cada rodada lê os snapshots de todos os membros direto da memória compartilhada,
+    treina os seus e publica os snapshots novos deles.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    env = make_env(shaped_rewards=shaped_rewards)
+    agents = {}
+    for m, (initial, _) in members.items():
+        agent = QAgent()
+        if initial:
+            agent.load_model(initial)
+            agent.epsilon = SEEDED_EPSILON
+        agents[m] = agent
+    results.put(('snapshots', worker_id, None,
+                 {m: publish_snapshot(agent, f"{SHM_PREFIX}_{token}_{m}_0") for m, agent in agents.items()}))
+
+    attached = {}  # nome do segmento -> SharedPolicy
+    while (task := tasks.get()) is not None:
+        round_no, registry, plans = task
+        # Solta os snapshots da rodada anterior e anexa os novos (nenhuma cópia)
+        names = {name for name, _ in registry.values()}
+        for name in [name for name in attached if name not in names]:
+            attached.pop(name).close()
+        for name, n in registry.values():
+            if name not in attached:
+                attached[name] = SharedPolicy(name, n)
+        policies = {m: attached[name] for m, (name, _) in registry.items()}
+
+        report = {}
+        for m, (opponents, weights, episodes) in plans.items():
+            counts, total = train_member(agents[m], env, opponents, weights, episodes, policies)
+            report[m] = {'counts': counts, 'total': total, 'states': len(agents[m].q_table),
+                         'epsilon': agents[m].epsilon}
+        snapshots = {m: publish_snapshot(agent, f"{SHM_PREFIX}_{token}_{m}_{round_no}")
+                     for m, agent in agents.items()}
+        results.put(('round', worker_id, report, snapshots))
+
+    for policy in attached.values():
+        policy.close()
+    for m, agent in agents.items():
+        agent.save_model(members[m][1])
+    results.put(('done', worker_id, None, None))
+
+# --- Coordenador ---
+def matchmaking(wins, games, m):
+    """
+    Pesos dos adversários do membro m (todos os membros, inclusive ele, e o aleatório):
+    quanto menor a taxa de vitória de m contra o adversário, maior a chance de enfrentá-lo.
+    """
+    win_rate = (wins[m] + 1) / (games[m] + 2)
+    return ((1 - win_rate) ** PFSP_POWER + PFSP_FLOOR).tolist()
+
+def wait_for(results, workers, kind, expected):
+    """Junta 'expected' mensagens do tipo 'kind' dos workers (falha se algum morrer)."""
+    replies = []
+    while len(replies) < expected:
+        try:
+            message = results.get(timeout=1.0)
+        except queue.Empty:
+            if any(w.exitcode not in (None, 0) for w in workers):
+                raise RuntimeError("Um worker da liga terminou com erro; treino abortado.")
+            continue
+        if message[0] != kind:
+            raise RuntimeError(f"Mensagem inesperada da liga: {message[0]!r} (esperava {kind!r})")
+        replies.append(message)
+    return replies
+
+def run_league(members=LEAGUE_MEMBERS, workers=None, rounds=LEAGUE_ROUNDS, episodes=ROUND_EPISODES,
+               seed_models=(), out="brain_league.pkl", directory=LEAGUE_DIR, metrics_path=None,
+               shaped_rewards=False, seed=None):
+    """
+    Liga de 'members' QAgents treinando ao mesmo tempo em 'workers' processos.
+    seed_models: modelos iniciais distribuídos em ciclo pelos membros (os demais começam do zero).
+    No fim salva cada membro em 'directory' e copia o melhor da última rodada para 'out'.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, members))
+    rng = random.Random(seed)
+    token = f"{os.getpid()}_{rng.randrange(1 << 30)}"  # Nomes únicos dos segmentos desta liga
+    os.makedirs(directory, exist_ok=True)
+    owners = [list(range(w, members, workers)) for w in range(workers)]
+    files = [os.path.join(directory, f"member_{m}.pkl") for m in range(members)]
+    initial = [seed_models[m % len(seed_models)] if seed_models else None for m in range(members)]
+
+    print(f"🏟️ LIGA: {members} membros | {workers} processos | {rounds} rodadas x {episodes} episódios")
+    for m in range(members):
+        print(f"   Membro {m}: {'começa de ' + initial[m] if initial[m] else 'começa do zero'}")
+    print("-" * 50)
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    task_queues = [ctx.Queue() for _ in range(workers)]
+    procs = [ctx.Process(target=league_worker,
+                         args=(w, {m: (initial[m], files[m]) for m in owners[w]}, token, task_queues[w],
+                               results, rng.randrange(2**31), shaped_rewards), daemon=True)
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+
+    registry = {}
+    for _, _, _, snapshots in wait_for(results, procs, 'snapshots', workers):
+        registry.update(snapshots)
+
+    # Placar do matchmaking: wins/games[m][o] com o = outro membro ou aleatório (última coluna)
+    opponents = list(range(members)) + [RANDOM_OPPONENT]
+    wins = np.zeros((members, members + 1))
+    games = np.zeros((members, members + 1))
+    sink = open_sink(metrics_path)
+    start_time = time.time()
+    round_rates = np.zeros(members)
+    try:
+        for round_no in range(1, rounds + 1):
+            for w in range(workers):
+                plans = {m: (opponents, matchmaking(wins, games, m), episodes) for m in owners[w]}
+                task_queues[w].put((round_no, registry, plans))
+
+            old = {name for name, _ in registry.values()}
+            states = {}
+            wins *= WINRATE_DECAY
+            games *= WINRATE_DECAY
+            for _, _, report, snapshots in wait_for(results, procs, 'round', workers):
+                registry.update(snapshots)
+                for m, r in report.items():
+                    counts = r['counts']
+                    wins[m] += counts[:, 0]
+                    games[m] += counts.sum(axis=1)
+                    round_rates[m] = r['total'][0] / max(r['total'].sum(), 1)
+                    states[m] = r['states']
+                    if sink:
+                        sink.write({'run': f"league/member_{m}", 'episode': round_no * episodes,
+                                    'time': time.time(), 'round': round_no,
+                                    'win_rate': float(round_rates[m]), 'states': r['states'],
+                                    'epsilon': r['epsilon']})
+            # Ninguém mais lê os snapshots da rodada anterior (cada worker já anexou os novos)
+            for name in old:
+                unlink_snapshot(name)
+
+            shm_bytes = sum(snapshot_size(n) for _, n in registry.values())
+            elapsed = time.time() - start_time
+            print(f"Rodada {round_no:3d} | " +
+                  " | ".join(f"M{m}: {round_rates[m] * 100:4.1f}% ({states[m]} est.)" for m in range(members)) +
+                  f" | 📦 {shm_bytes / 1e6:.1f} MB compartilhados | "
+                  f"{round_no * episodes * members / elapsed:,.0f} ep/s")
+        # Fim normal: cada worker salva os seus membros
+        for q in task_queues:
+            q.put(None)
+        wait_for(results, procs, 'done', workers)
+        for p in procs:
+            p.join()
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()  # Só sobra alguém vivo se a liga foi interrompida
+        for name, _ in registry.values():
+            unlink_snapshot(name)
+        if sink:
+            sink.close()
+
+    champion = int(np.argmax(round_rates))
+    shutil.copy(files[champion], out)
+    print("-" * 50)
+    print(f"🏆 Campeão da liga: membro {champion} ({round_rates[champion] * 100:.1f}% de vitórias "
+          f"na última rodada) -> '{out}'")
+    return round_rates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Liga de agentes treinando juntos em vários processos.")
+    parser.add_argument("--members", type=int, default=LEAGUE_MEMBERS)
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: nº de CPUs, até um por membro).")
+    parser.add_argument("--rounds", type=int, default=LEAGUE_ROUNDS)
+    parser.add_argument("--episodes", type=int, default=ROUND_EPISODES, help="Episódios por membro em cada rodada.")
+    parser.add_argument("--seed-models", nargs="*", default=[],
+                        help="Modelos iniciais (ex.: brain.pkl brain_v2_elite.pkl), distribuídos entre os membros.")
+    parser.add_argument("--out", default="brain_league.pkl", help="Arquivo do campeão.")
+    parser.add_argument("--dir", default=LEAGUE_DIR, help="Diretório com o modelo de cada membro.")
+    parser.add_argument("--metrics", default=None, help="Grava as métricas por rodada (JSONL ou SQLite).")
+    parser.add_argument("--shaped-rewards", action="store_true",
+                        help="Soma as recompensas THREAT, BLOCK e IGNORE_DEFENSE de settings.REWARDS.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    run_league(args.members, args.workers, args.rounds, args.episodes, args.seed_models, args.out,
+               args.dir, args.metrics, args.shaped_rewards, args.seed)
@@ -0,0 +1,281 @@
+# metrics.py
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from time import perf_counter
+import numpy as np
+
+METRICS_WINDOW = 1000  # episódios nas médias móveis
+RESULTS = ('Win', 'Loss', 'Draw')
+SQLITE_EXTS = (".db", ".sqlite", ".sqlite3")
+
+class RingBuffer:
+    """Buffer circular de tamanho fixo com soma corrente: append e média em O(1)."""
+
+    def __init__(self, size):
+        self.values = [0] * size  # Lista pré-alocada: mais barata que NumPy elemento a elemento
+        self.pos = 0    # próxima posição a escrever
+        self.count = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        pos = self.pos
+        if self.count == len(self.values):
+            self.total -= self.values[pos]
+        else:
+            self.count += 1
+        self.values[pos] = value
+        self.total += value
+        self.pos = pos + 1 if pos + 1 < len(self.values) else 0
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def first(self):
+        """Valor mais antigo ainda no buffer."""
+        return self.values[(self.pos - self.count) % len(self.values)]
+
+    def last(self):
+        return self.values[self.pos - 1]
+
+    def to_list(self):
+        """Valores em ordem de chegada (do mais antigo ao mais novo)."""
+        start = (self.pos - self.count) % len(self.values)
+        return (self.values[start:] + self.values[:start])[:self.count] if self.count == len(self.values) \
+            else self.values[start:start + self.count]
+
+class TrainingMetrics:
+    """
+    Estatísticas do treino em buffers circulares: taxas móveis de vitória, derrota
+    e empate, duração média dos episódios e episódios por segundo na janela.
+    O registro por episódio só mexe nos buffers; report() monta o resumo e o
+    entrega ao sink (que grava numa thread separada).
+    """
+
+    def __init__(self, run=None, sink=None, window=METRICS_WINDOW):
+        self.run = run or time.strftime("run-%Y%m%d-%H%M%S")
+        self.sink = sink
+        self.results = {result: RingBuffer(window) for result in RESULTS}
+        self.lengths = RingBuffer(window)
+        self.times = RingBuffer(window)
+        self.episodes = 0
+
+    def record(self, result, length):
+        """Um episódio: result 'Win'/'Loss'/'Draw' (info['result']) e número de jogadas do agente."""
+        for name, buffer in self.results.items():
+            buffer.append(name == result)
+        self.lengths.append(length)
+        self.times.append(perf_counter())
+        self.episodes += 1
+
+    def rate(self, result='Win'):
+        return self.results[result].mean()
+
+    def episodes_per_second(self):
+        elapsed = self.times.last() - self.times.first()
+        return (len(self.times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self, episode, **extra):
+        """Resumo atual (dicionário pronto para JSON); 'extra' entra junto (epsilon, estados, ...)."""
+        record = {
+            'run': self.run,
+            'episode': episode,
+            'time': time.time(),
+            'win_rate': self.rate('Win'),
+            'loss_rate': self.rate('Loss'),
+            'draw_rate': self.rate('Draw'),
+            'episode_length': self.lengths.mean(),
+            'episodes_per_second': self.episodes_per_second(),
+        }
+        record.update(extra)
+        return record
+
+    def report(self, episode, **extra):
+        """Snapshot enviado ao sink (se houver); a escrita acontece fora do laço de treino."""
+        record = self.snapshot(episode, **extra)
+        if self.sink:
+            self.sink.write(record)
+        return record
+
+    def close(self):
+        if self.sink:
+            self.sink.close()
+
+    # --- Checkpoints ---
+    def state(self):
+        columns = zip(*(self.results[name].to_list() for name in RESULTS))
+        results = [next((name for name, flag in zip(RESULTS, flags) if flag), None) for flags in columns]
+        return {'run': self.run, 'results': results, 'lengths': self.lengths.to_list()}
+
+    def restore(self, extra):
+        """
+        Recarrega as janelas salvas num checkpoint (aceita o 'recent_wins' dos checkpoints antigos).
+        Só os buffers de resultados e durações: os tempos ficam vazios (episódios por segundo
+        recomeçam a contar na retomada) e os episódios restaurados não contam como novos.
+        """
+        if 'metrics' in extra:
+            state = extra['metrics']
+            self.run = state['run']
+            pairs = zip(state['results'], state['lengths'])
+        else:
+            # Formato antigo: 1 = vitória, 0 = derrota ou empate (não dá para separar)
+            pairs = (('Win' if won else 'Loss', 0) for won in extra.get('recent_wins', []))
+        for result, length in pairs:
+            for name, buffer in self.results.items():
+                buffer.append(name == result)
+            self.lengths.append(length)
+
+# --- Sinks (gravação em segundo plano) ---
+_CLOSE = object()
+
+class MetricsSink:
+    """
+    Base dos sinks: write() só enfileira; uma thread daemon esvazia a fila e grava
+    em lote. O laço de treino nunca espera por disco.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=f"metrics:{path}", daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        self.queue.put(record)
+
+    def close(self):
+        """Grava o que falta e encerra a thread."""
+        self.queue.put(_CLOSE)
+        self.thread.join()
+
+    def _run(self):
+        self._open()
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while True:  # Junta tudo o que já chegou numa só escrita
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                closing = batch[-1] is _CLOSE
+                self._write_batch([record for record in batch if record is not _CLOSE])
+                if closing:
+                    break
+        finally:
+            self._close()
+
+class JsonlSink(MetricsSink):
+    """Um objeto JSON por linha (arquivo só de acréscimo)."""
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def _write_batch(self, records):
+        for record in records:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+
+class SqliteSink(MetricsSink):
+    """Tabela 'metrics' (run, episode, time, record em JSON); a conexão vive na thread do sink."""
+
+    def _open(self):
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS metrics "
+                        "(run TEXT, episode INTEGER, time REAL, record TEXT)")
+
+    def _write_batch(self, records):
+        if records:
+            self.db.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)",
+                                [(r['run'], r['episode'], r['time'], json.dumps(r)) for r in records])
+            self.db.commit()
+
+    def _close(self):
+        self.db.close()
+
+def open_sink(path):
+    """Escolhe o sink pela extensão: .db/.sqlite -> SQLite, qualquer outra -> JSONL."""
+    if path is None:
+        return None
+    return SqliteSink(path) if path.endswith(SQLITE_EXTS) else JsonlSink(path)
+
+def make_metrics(path=None, run=None, window=METRICS_WINDOW):
+    return TrainingMetrics(run, open_sink(path), window)
+
+# --- Leitura (gráficos e comparação de execuções) ---
+def read_metrics(path, run=None):
+    """Registros de um arquivo de métricas (JSONL ou SQLite), opcionalmente de uma só execução."""
+    if path.endswith(SQLITE_EXTS):
+        db = sqlite3.connect(path)
+        try:
+            if run is None:
+                rows = db.execute("SELECT record FROM metrics ORDER BY rowid")
+            else:
+                rows = db.execute("SELECT record FROM metrics WHERE run = ? ORDER BY rowid", (run,))
+            records = [json.loads(record) for record, in rows]
+        finally:
+            db.close()
+    else:
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    return [r for r in records if run is None or r['run'] == run]
+
+def load_runs(path):
+    """{execução: {campo: np.array}} em colunas, prontas para plotar (ex.: episode x win_rate)."""
+    runs = {}
+    for record in read_metrics(path):
+        columns = runs.setdefault(record['run'], {})
+        for field, value in record.items():
+            if isinstance(value, (int, float)):
+                columns.setdefault(field, []).append(value)
+    return {run: {field: np.array(values) for field, values in columns.items()}
+            for run, columns in runs.items()}
+
+def compare_runs(paths, field='win_rate'):
+    """Resumo por execução: episódios, valor final, melhor valor e média do campo."""
+    summary = {}
+    for path in paths:
+        for run, columns in load_runs(path).items():
+            values = columns.get(field)
+            if values is None or not len(values):
+                continue
+            summary[run] = {
+                'episodes': int(columns['episode'][-1]),
+                'final': float(values[-1]),
+                'best': float(values.max()),
+                'mean': float(values.mean()),
+            }
+    return summary
+
+def add_metrics_args(parser):
+    """Argumentos de linha de comando das métricas, comuns aos scripts de treino."""
+    parser.add_argument("--metrics", default=None,
+                        help="Grava as métricas em JSONL (ou SQLite, se terminar em .db/.sqlite).")
+    parser.add_argument("--run-name", default=None, help="Nome da execução nas métricas (padrão: data e hora).")
+
+if __name__ == "__main__":
+    # Uso: python metrics.py metrics/train.jsonl [outro.db ...] [--field win_rate]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compara execuções gravadas pelos scripts de treino.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--field", default="win_rate")
+    args = parser.parse_args()
+
+    summary = compare_runs(args.paths, args.field)
+    print(f"{'execução':30s} | {'episódios':>9s} | {'final':>8s} | {'melhor':>8s} | {'média':>8s}")
+    print("-" * 76)
+    for run, s in sorted(summary.items(), key=lambda kv: -kv[1]['final']):
+        print(f"{run:30s} | {s['episodes']:9d} | {s['final']:8.3f} | {s['best']:8.3f} | {s['mean']:8.3f}")
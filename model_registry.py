@@ -0,0 +1,235 @@
+# model_registry.py
+import glob
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+from agent import QAgent
+from nn_agent import NNAgent
+from policy import CompiledPolicy
+from model_store import resolve_model_path, MAPPED_EXT, QUANTIZED_EXT
+from settings import *
+
+MODEL_EXTS = (".pkl", MAPPED_EXT, QUANTIZED_EXT, ".npz")
+MODEL_BUDGET = 512 * 2 ** 20  # bytes de modelos carregados antes de descartar os menos usados
+POLL_INTERVAL = 2.0           # segundos entre verificações das datas de modificação
+
+def available_models(directory="."):
+    """Modelos do diretório (brain.qmap some quando o brain.pkl existe: resolve_model_path escolhe)."""
+    names = []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        stem, ext = os.path.splitext(path)
+        if ext not in MODEL_EXTS or (ext == MAPPED_EXT and os.path.exists(stem + ".pkl")):
+            continue
+        names.append(os.path.relpath(path, directory) if directory != "." else os.path.basename(path))
+    return names
+
+def _freeze(model):
+    """Marca os arrays do modelo como somente leitura (um escritor por engano vira erro)."""
+    for value in vars(model).values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, np.ndarray):
+                    item.flags.writeable = False
+
+def model_size(model):
+    """Estimativa (bytes) da memória do modelo: arrays NumPy, listas e dicionários de apoio."""
+    total = 0
+    for value in vars(model).values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+        elif isinstance(value, (list, dict)):
+            total += sys.getsizeof(value)
+            if isinstance(value, dict):
+                total += 2 * 32 * len(value)  # objetos int das chaves e valores
+            total += sum(v.nbytes for v in value if isinstance(v, np.ndarray))
+    return total
+
+def load_frozen(path):
+    """
+    Carrega um modelo para inferência: tabelas (.pkl/.qmap/.qz) viram CompiledPolicy,
+    redes (.npz) viram NNAgent sem replay; epsilon 0 e arrays somente leitura.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if path.endswith(".npz"):
+        model = NNAgent(replay_capacity=1)
+        model.load_model(path)
+        model.epsilon = 0.0
+        model.target = model.adam_m = model.adam_v = []  # Só servem para o treino
+    else:
+        agent = QAgent()
+        agent.load_model(path)
+        model = CompiledPolicy.compile(agent)
+    _freeze(model)
+    return model
+
+class _Entry:
+    __slots__ = ("name", "path", "mtime", "model", "size", "version")
+
+class ModelHandle:
+    """
+    Acesso somente leitura a um modelo do registro, pelo nome. Não prende o modelo:
+    cada jogada pega a versão atual (recarregada se o arquivo mudou, ou de volta
+    do disco se foi descartada pelo orçamento de memória).
+    """
+
+    PLAY_METHODS = ('act', 'act_batch', 'choose_action', 'choose_action_from_key')
+    epsilon = 0.0
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self.name = name
+
+    @property
+    def model(self):
+        return self._registry.model(self.name)
+
+    @property
+    def version(self):
+        """Quantas vezes o arquivo foi (re)carregado: muda a cada recarga a quente."""
+        return self._registry.version(self.name)
+
+    def __getattr__(self, attr):
+        # Só a interface de jogo; hasattr(handle, 'choose_action_from_key') segue o modelo real
+        if attr not in self.PLAY_METHODS:
+            raise AttributeError(attr)
+        return getattr(self.model, attr)
+
+    def __setattr__(self, attr, value):
+        if attr not in ('_registry', 'name', 'epsilon'):  # epsilon: env.brain_action salva/restaura
+            raise AttributeError(f"Modelo {self.name!r} é somente leitura")
+        object.__setattr__(self, attr, value)
+
+    def __repr__(self):
+        return f"ModelHandle({self.name!r})"
+
+class ModelRegistry:
+    """
+    Registro de modelos do processo: cada arquivo é carregado uma vez e servido
+    a todas as sessões por ModelHandle. Uma thread em segundo plano observa as
+    datas de modificação e troca o modelo quando o treino grava uma versão nova;
+    acima do orçamento de memória os menos usados recentemente são descartados.
+    """
+
+    def __init__(self, budget=MODEL_BUDGET, poll_interval=POLL_INTERVAL):
+        self.budget = budget
+        self.poll_interval = poll_interval
+        self.entries = OrderedDict()  # nome -> _Entry, do menos para o mais usado
+        self.versions = {}            # sobrevive ao descarte: a versão não volta para trás
+        self.lock = threading.RLock()
+        self.watcher = None
+        self.stop_event = threading.Event()
+
+    # --- Acesso ---
+    def get(self, name):
+        """Handle somente leitura de 'name' (carrega já, para erros aparecerem aqui)."""
+        self.model(name)
+        self._start_watcher()
+        return ModelHandle(self, name)
+
+    def model(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+                self._install(entry)
+            else:
+                self.entries.move_to_end(name)
+            return entry.model
+
+    def version(self, name):
+        with self.lock:
+            return self.versions.get(name, 0)
+
+    def loaded(self):
+        """[(nome, bytes, versão)] em memória, do menos para o mais usado."""
+        with self.lock:
+            return [(e.name, e.size, e.version) for e in self.entries.values()]
+
+    def memory(self):
+        with self.lock:
+            return sum(e.size for e in self.entries.values())
+
+    def _load(self, name):
+        path = resolve_model_path(name)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        model = load_frozen(path)
+        entry = _Entry()
+        entry.name, entry.path, entry.mtime, entry.model = name, path, mtime, model
+        entry.size = model_size(model)
+        return entry
+
+    def _install(self, entry):
+        """Põe a entrada no registro como a versão mais nova do modelo (chamar com a trava)."""
+        entry.version = self.versions[entry.name] = self.versions.get(entry.name, 0) + 1
+        self.entries[entry.name] = entry
+        self.entries.move_to_end(entry.name)
+        self._evict(keep=entry.name)
+
+    def _evict(self, keep):
+        while len(self.entries) > 1 and sum(e.size for e in self.entries.values()) > self.budget:
+            name = next(iter(self.entries))
+            if name == keep:
+                break
+            evicted = self.entries.pop(name)
+            print(f"🧹 Modelo {name} descartado da memória ({evicted.size / 2**20:.1f} MB).")
+
+    # --- Recarga a quente ---
+    def refresh(self):
+        """Recarrega os modelos cujo arquivo mudou desde a carga; retorna os nomes recarregados."""
+        with self.lock:
+            current = [(e.name, e.path, e.mtime) for e in self.entries.values()]
+        reloaded = []
+        for name, path, mtime in current:
+            new_path = resolve_model_path(name)
+            try:
+                new_mtime = os.path.getmtime(new_path)
+            except OSError:
+                continue  # Arquivo sumindo no meio de uma troca: fica a versão atual
+            if (new_path, new_mtime) == (path, mtime):
+                continue
+            try:
+                entry = self._load(name)  # Fora da trava: as sessões seguem jogando na versão antiga
+            except Exception as e:
+                # Arquivo ainda sendo gravado: tenta de novo na próxima verificação
+                print(f"⚠️ Recarga de {name} falhou ({e}); mantendo a versão anterior.")
+                continue
+            with self.lock:
+                if name not in self.entries:
+                    continue  # Descartado enquanto carregava
+                self._install(entry)
+                reloaded.append(name)
+            print(f"🔁 Modelo {name} recarregado (versão {entry.version}).")
+        return reloaded
+
+    def _start_watcher(self):
+        if self.poll_interval and self.watcher is None:
+            self.watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self.watcher.start()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.poll_interval):
+            self.refresh()
+
+    def close(self):
+        self.stop_event.set()
+        if self.watcher is not None:
+            self.watcher.join()
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+def default_registry():
+    """O registro compartilhado do processo (todas as sessões do Streamlit usam o mesmo)."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = ModelRegistry()
+        return _REGISTRY
+
+def get_model(name):
+    return default_registry().get(name)
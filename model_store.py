@@ -0,0 +1,290 @@
+# model_store.py
+import os
+import numpy as np
+from settings import *
+
+# Formato ".qmap": cabeçalho fixo + chaves canônicas ordenadas (int64) + matriz densa de valores.
+# Pode ser aberto com np.memmap sem desserializar nada; vários processos (e sessões do
+# Streamlit) compartilham a mesma cópia do arquivo no cache de páginas do sistema.
+MAPPED_EXT = ".qmap"
+MAGIC = b"QMAP0001"
+HEADER_SIZE = 64
+
+def mapped_path(filename):
+    """brain.pkl -> brain.qmap"""
+    return os.path.splitext(filename)[0] + MAPPED_EXT
+
+def resolve_model_path(filename):
+    """Prefere a versão mapeada do modelo quando ela existe e não está desatualizada."""
+    qmap = mapped_path(filename)
+    if os.path.exists(qmap) and (not os.path.exists(filename)
+                                 or os.path.getmtime(qmap) >= os.path.getmtime(filename)):
+        return qmap
+    return filename
+
+def export_mapped(q_table, filename):
+    """Grava a tabela (QTable ou compatível) no formato mapeável."""
+    keys, values = q_table.export()
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], np.ascontiguousarray(values[order])
+
+    dtype = values.dtype.str.encode().ljust(8, b"\0")
+    header = MAGIC + np.array([len(keys), values.shape[1]], dtype="<u8").tobytes() + dtype
+    with open(filename, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(keys.astype("<i8").tobytes())
+        f.write(values.tobytes())
+    return filename
+
+class MappedQTable:
+    """
+    Tabela Q somente leitura sobre um arquivo ".qmap" (np.memmap).
+    Oferece a mesma leitura de um dicionário; as buscas são binárias
+    sobre as chaves ordenadas.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:8] != MAGIC:
+            raise ValueError(f"{filename} não é um modelo {MAPPED_EXT}")
+        n_states, n_actions = np.frombuffer(header[8:24], dtype="<u8")
+        dtype = np.dtype(header[24:32].rstrip(b"\0").decode())
+        if int(n_actions) != BOARD_SIZE * BOARD_SIZE:
+            raise ValueError(f"{filename} foi exportado para outro tamanho de tabuleiro "
+                             f"({int(n_actions)} casas, esperado {BOARD_SIZE * BOARD_SIZE})")
+
+        self.filename = filename
+        self.n_actions = int(n_actions)
+        self.dtype = dtype
+        n = int(n_states)
+        if n == 0:
+            self._keys = np.empty(0, dtype="<i8")
+            self.data = np.empty((0, self.n_actions), dtype=dtype)
+            return
+        self._keys = np.memmap(filename, dtype="<i8", mode="r", offset=HEADER_SIZE, shape=(n,))
+        self.data = np.memmap(filename, dtype=dtype, mode="r",
+                              offset=HEADER_SIZE + 8 * n, shape=(n, self.n_actions))
+
+    def find(self, key):
+        """Linha da chave, ou -1 se o estado não existe no modelo."""
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return self.find(key) >= 0
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.data[i]
+
+    def get(self, key, default=None):
+        i = self.find(key)
+        return default if i < 0 else self.data[i]
+
+    def __iter__(self):
+        return (int(key) for key in self._keys)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        return ((int(key), row) for key, row in zip(self._keys, self.data))
+
+    def export(self):
+        return np.array(self._keys), np.array(self.data)
+
+# Formato ".qz" (implantação): só estados atualizados, só as jogadas livres de cada estado
+# e valores inteiros (int8/int16) com escala e deslocamento por estado, num .npz comprimido.
+QUANTIZED_EXT = ".qz"
+QUANT_DTYPES = {8: np.int8, 16: np.int16}
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+_POW3 = 3 ** np.arange(NUM_CELLS - 1, -1, -1, dtype=np.int64)
+
+def quantized_path(filename):
+    """brain.pkl -> brain.qz"""
+    return os.path.splitext(filename)[0] + QUANTIZED_EXT
+
+def free_cells(keys):
+    """Máscara (N, NUM_CELLS) das casas livres de cada chave canônica (dígitos base 3 == 0)."""
+    return (np.asarray(keys, dtype=np.int64)[:, None] // _POW3) % 3 == EMPTY
+
+def export_quantized(q_table, filename, bits=8, min_visits=1):
+    """
+    Poda e quantiza a tabela. Saem os estados nunca atualizados (linha toda em 0) e,
+    se a tabela tem contagem de visitas, os com menos de 'min_visits' atualizações.
+    Cada estado guarda lo + escala: o maior valor vira o maior inteiro e as jogadas
+    que não eram as melhores nunca sobem até ele, então a escolha gulosa não muda.
+    Retorna o número de estados mantidos.
+    """
+    if bits not in QUANT_DTYPES:
+        raise ValueError(f"Quantização de {bits} bits não suportada (use {', '.join(map(str, QUANT_DTYPES))})")
+    keys, values = q_table.export()
+    visits = q_table.export_visits() if hasattr(q_table, "export_visits") else np.zeros(len(keys), np.uint32)
+    legal = free_cells(keys)
+
+    keep = values.any(axis=1) & legal.any(axis=1)
+    if visits.any():
+        keep &= visits >= min_visits
+    order = np.flatnonzero(keep)[np.argsort(keys[keep], kind="stable")]
+    keys, values, legal, visits = keys[order], values[order].astype(np.float64), legal[order], visits[order]
+
+    q_min, levels = -2 ** (bits - 1), 2 ** bits - 1
+    lo = np.where(legal, values, np.inf).min(axis=1)
+    hi = np.where(legal, values, -np.inf).max(axis=1)
+    scale = (hi - lo) / levels
+    scale[scale == 0] = 1.0  # Estado com todas as jogadas iguais
+    q = np.rint((values - lo[:, None]) / scale[:, None]) + q_min
+    # Jogadas quase empatadas com a melhor desceriam ao mesmo inteiro: ficam um degrau abaixo
+    q[(q == q_min + levels) & (values < hi[:, None])] -= 1
+
+    np.savez_compressed(filename if filename.endswith(".npz") else filename + ".npz",
+                        keys=keys, lo=lo.astype(np.float32), scale=scale.astype(np.float32),
+                        values=q[legal].astype(QUANT_DTYPES[bits]), visits=visits,
+                        bits=np.array(bits), board=np.array([BOARD_SIZE, NUM_CELLS]))
+    if not filename.endswith(".npz"):
+        os.replace(filename + ".npz", filename)  # np.savez sempre acrescenta .npz
+    return len(keys)
+
+class QuantizedQTable:
+    """
+    Tabela Q somente leitura sobre um arquivo ".qz". Os valores ficam quantizados
+    na memória; cada consulta reconstrói a linha (casas ocupadas valem 0, como
+    nunca são escolhidas por choose_action o valor delas não importa).
+    """
+
+    def __init__(self, filename):
+        with np.load(filename) as f:
+            if int(f["board"][1]) != NUM_CELLS:
+                raise ValueError(f"{filename} foi exportado para outro tamanho de tabuleiro")
+            self._keys = f["keys"]
+            self.lo, self.scale = f["lo"], f["scale"]
+            self.values = f["values"]
+            self.visits = f["visits"]
+            self.bits = int(f["bits"])
+        self.filename = filename
+        self.n_actions = NUM_CELLS
+        self.dtype = np.dtype(np.float32)
+        self.q_min = -2 ** (self.bits - 1)
+        # Início de cada estado no vetor de valores (as livres de cada chave, em ordem)
+        counts = NUM_CELLS - np.count_nonzero(np.asarray(self._keys)[:, None] // _POW3 % 3, axis=1)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def find(self, key):
+        """Linha da chave, ou -1 se o estado não existe no modelo."""
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def row(self, i):
+        row = np.zeros(NUM_CELLS, dtype=np.float32)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        row[free_cells(self._keys[i:i + 1])[0]] = (self.values[start:end].astype(np.float32) - self.q_min) * self.scale[i] + self.lo[i]
+        return row
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return self.find(key) >= 0
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.row(i)
+
+    def get(self, key, default=None):
+        i = self.find(key)
+        return default if i < 0 else self.row(i)
+
+    def __iter__(self):
+        return (int(key) for key in self._keys)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        return ((int(key), self.row(i)) for i, key in enumerate(self._keys))
+
+    def export(self):
+        """(chaves, matriz densa float32) de uma vez, para CompiledPolicy / comparações."""
+        data = np.zeros((len(self._keys), NUM_CELLS), dtype=np.float32)
+        deq = (self.values.astype(np.float32) - self.q_min) * np.repeat(self.scale, np.diff(self.offsets)) \
+            + np.repeat(self.lo, np.diff(self.offsets))
+        data[free_cells(self._keys)] = deq
+        return np.array(self._keys), data
+
+    def export_visits(self):
+        return np.array(self.visits)
+
+def agreement_report(full_table, quantized_table):
+    """
+    Compara as escolhas gulosas das duas tabelas em todos os estados da original.
+    'exact': mesmo conjunto de melhores jogadas; 'agreement': chance de a jogada
+    sorteada pela quantizada ser uma das melhores da original (estado podado = jogada
+    aleatória). 'weighted' pondera cada estado pelas visitas (se houver).
+    """
+    keys, values = full_table.export()
+    visits = full_table.export_visits() if hasattr(full_table, "export_visits") else np.zeros(len(keys))
+    legal = free_cells(keys)
+    live = legal.any(axis=1)
+    keys, values, legal, visits = keys[live], values[live].astype(np.float64), legal[live], visits[live]
+
+    q_keys, q_values = quantized_table.export()
+    pos = np.minimum(np.searchsorted(q_keys, keys), max(len(q_keys) - 1, 0))
+    kept = (q_keys[pos] == keys) if len(q_keys) else np.zeros(len(keys), dtype=bool)
+
+    def best_sets(v):
+        v = np.where(legal, v, -np.inf)
+        return v == v.max(axis=1, keepdims=True)
+
+    full_best = best_sets(values)
+    quant_best = best_sets(np.where(kept[:, None], q_values[pos], 0.0))  # podado: tudo empata
+    exact = (full_best == quant_best).all(axis=1)
+    agreement = (full_best & quant_best).sum(axis=1) / quant_best.sum(axis=1)
+    weights = visits.astype(np.float64) if visits.any() else np.ones(len(keys))
+    return {
+        'states': len(keys),
+        'kept': int(kept.sum()),
+        'exact': float(exact.mean()) if len(keys) else 1.0,
+        'exact_kept': float(exact[kept].mean()) if kept.any() else 1.0,
+        'agreement': float(agreement.mean()) if len(keys) else 1.0,
+        'weighted': float(np.average(agreement, weights=weights)) if len(keys) else 1.0,
+    }
+
+if __name__ == "__main__":
+    # Uso: python model_store.py brain.pkl [brain_v2_elite.pkl ...] [--quantize 8 --min-visits 2]
+    import argparse
+    from agent import QAgent
+
+    parser = argparse.ArgumentParser(description="Exporta modelos para .qmap (mapeado) ou .qz (podado e quantizado).")
+    parser.add_argument("models", nargs="*", default=["brain.pkl"])
+    parser.add_argument("--quantize", type=int, choices=sorted(QUANT_DTYPES), help="Exporta .qz com inteiros de N bits.")
+    parser.add_argument("--min-visits", type=int, default=1, help="Atualizações mínimas para manter um estado (.qz).")
+    args = parser.parse_args()
+
+    for filename in args.models:
+        agent = QAgent()
+        agent.load_model(filename)
+        if not args.quantize:
+            out = export_mapped(agent.q_table, mapped_path(filename))
+            print(f"🗺️ {filename} -> {out} ({len(agent.q_table)} estados, {os.path.getsize(out)} bytes)")
+            continue
+
+        out = quantized_path(filename)
+        kept = export_quantized(agent.q_table, out, args.quantize, args.min_visits)
+        report = agreement_report(agent.q_table, QuantizedQTable(out))
+        ratio = os.path.getsize(filename) / os.path.getsize(out)
+        print(f"🗜️ {filename} -> {out} ({kept}/{len(agent.q_table)} estados, "
+              f"{os.path.getsize(out)} bytes, {ratio:.1f}x menor)")
+        print(f"   Concordância gulosa: {report['agreement']:.2%} | ponderada por visitas: {report['weighted']:.2%} | "
+              f"idêntica nos mantidos: {report['exact_kept']:.2%}")
@@ -0,0 +1,216 @@
+# move_server.py
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+import numpy as np
+from agent import QAgent
+from policy import CompiledPolicy
+from model_store import resolve_model_path
+from settings import *
+
+DEFAULT_ADDRESS = "unix:/tmp/velha_moves.sock"
+SERVER_ENV = "VELHA_MOVE_SERVER"  # Endereço usado por app.py / play.py quando definido
+BATCH_WINDOW = 0.002   # segundos esperando mais pedidos antes de responder o lote
+MAX_BATCH = 4096
+BACKLOG = 1024  # conexões pendentes aceitas (muitas partidas abrindo ao mesmo tempo)
+LATENCY_SAMPLES = 10_000  # latências recentes usadas nos percentis
+
+def parse_address(address):
+    """'unix:/caminho.sock' ou 'host:porta' -> ('unix', caminho) / ('tcp', (host, porta))."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+class MoveServer:
+    """
+    Servidor local de jogadas: carrega cada modelo uma vez (como CompiledPolicy)
+    e responde pedidos (modelo, tabuleiro, assento) em JSON, um por linha.
+    Pedidos que chegam dentro da janela 'window' viram um lote: cada grupo
+    (modelo, assento) é resolvido numa só chamada vetorizada de act_batch.
+    """
+
+    def __init__(self, models, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        """models: nomes de arquivo carregados na partida (só eles podem ser pedidos)."""
+        self.window = window
+        self.max_batch = max_batch
+        self.policies = {}
+        for name in models:
+            agent = QAgent()
+            agent.load_model(resolve_model_path(name))
+            self.policies[name] = CompiledPolicy.compile(agent)
+        self.queue = None
+        self.rng = np.random.default_rng()
+        # Contadores
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    # --- Lotes ---
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.answer(batch)
+
+    def answer(self, batch):
+        """Uma passada de act_batch por (modelo, assento); resolve os futures do lote."""
+        groups = {}
+        for item in batch:
+            groups.setdefault((item[0], item[2]), []).append(item)
+        for (model, seat), items in groups.items():
+            boards = np.array([board for _, board, _, _, _ in items], dtype=np.int8)
+            try:
+                actions = self.policies[model].act_batch(boards, seat, rng=self.rng).tolist()
+            except Exception as e:  # Um grupo com erro não derruba o lote nem o servidor
+                for _, _, _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            for (_, _, _, future, start), action in zip(items, actions):
+                if not future.done():
+                    future.set_result(action)
+                self.latencies.append(now - start)
+        self.requests += len(batch)
+        self.batches += 1
+
+    async def move(self, model, board, seat):
+        if model not in self.policies:
+            raise ValueError(f"Modelo não carregado: {model!r}")
+        board = [int(v) for v in board]
+        if len(board) != BOARD_SIZE * BOARD_SIZE or EMPTY not in board:
+            raise ValueError("Tabuleiro inválido (tamanho errado ou sem casas livres)")
+        if not 1 <= seat <= NUM_PLAYERS:
+            raise ValueError(f"Assento inválido: {seat}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((model, board, seat, future, time.perf_counter()))
+        return await future
+
+    # --- Contadores ---
+    def stats(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch': self.requests / self.batches if self.batches else 0.0,
+            'requests_per_second': self.requests / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                'mean': float(latencies.mean()) if len(latencies) else 0.0,
+                'p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p99': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            },
+            'models': sorted(self.policies),
+        }
+
+    # --- Conexões ---
+    async def handle(self, reader, writer):
+        """Uma linha JSON por pedido: {"model", "board", "seat"} ou {"op": "stats"}."""
+        try:
+            while line := await reader.readline():
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "stats":
+                        reply = self.stats()
+                    else:
+                        action = await self.move(request["model"], request["board"],
+                                                 int(request.get("seat", AGENT_ID)))
+                        reply = {'action': action}
+                except Exception as e:
+                    self.errors += 1
+                    reply = {'error': str(e)}
+                if "id" in request:
+                    reply['id'] = request["id"]
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        self.queue = asyncio.Queue()
+        kind, where = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(where):
+                os.remove(where)  # Socket velho de uma execução anterior
+            server = await asyncio.start_unix_server(self.handle, path=where, backlog=BACKLOG)
+        else:
+            server = await asyncio.start_server(self.handle, *where, backlog=BACKLOG)
+        print(f"🛰️ Servidor de jogadas em {address} | modelos: {', '.join(self.policies)}")
+        batcher = asyncio.create_task(self.batcher())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+class MoveClient:
+    """Cliente síncrono (app.py / play.py): uma conexão persistente, um pedido por vez."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0):
+        kind, where = parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(where)
+        self.file = self.sock.makefile("rwb")
+
+    @classmethod
+    def from_env(cls):
+        """Conecta no endereço de VELHA_MOVE_SERVER (None se a variável não estiver definida)."""
+        address = os.environ.get(SERVER_ENV)
+        return cls(address) if address else None
+
+    def _request(self, payload):
+        self.file.write(json.dumps(payload).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Servidor de jogadas fechou a conexão")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def move(self, model, board, seat=AGENT_ID):
+        """Jogada (casa real) do 'model' para 'seat' no tabuleiro bruto."""
+        board = np.asarray(board).ravel().tolist()
+        return self._request({'model': model, 'board': board, 'seat': seat})['action']
+
+    def stats(self):
+        return self._request({'op': "stats"})
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de jogadas com micro-lotes.")
+    parser.add_argument("models", nargs="*", default=["brain.pkl"], help="Modelos carregados (padrão: brain.pkl).")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="'unix:/caminho.sock' ou 'host:porta'.")
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW, help="Janela de agrupamento (s).")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    args = parser.parse_args()
+    try:
+        asyncio.run(MoveServer(args.models, args.window, args.max_batch).serve(args.address))
+    except KeyboardInterrupt:
+        pass
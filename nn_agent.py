@@ -0,0 +1,263 @@
+# nn_agent.py
+import argparse
+import time
+import numpy as np
+import random
+from agent import SYM_PERMS, ACTION_MAP, NUM_CELLS
+from settings import *
+
+NN_HIDDEN = 128           # neurônios da camada oculta (0 = Q linear)
+NN_LR = 1e-3              # taxa de aprendizado do Adam
+NN_BATCH = 64             # transições por passo de gradiente
+NN_REPLAY = 50_000        # transições guardadas (memória fixa, independe dos estados vistos)
+NN_TARGET_SYNC = 500      # passos de gradiente entre cópias para a rede alvo
+NN_TRAIN_EVERY = 1        # jogadas do agente entre passos de gradiente
+# As recompensas vão de -1000 a 500: a rede aprende na escala ~[-1, 1] (a ordem das jogadas não muda)
+REWARD_SCALE = 1.0 / max(abs(v) for v in REWARDS.values())
+ADAM_BETAS = (0.9, 0.999)
+ADAM_EPS = 1e-8
+
+def board_planes(boards, seat=AGENT_ID):
+    """
+    Entrada da rede: (N, 2 * NUM_CELLS) com o plano das peças de 'seat' e o plano
+    das peças dos outros. Aceita o tabuleiro bruto (ids 0..NUM_PLAYERS) ou a visão
+    dobrada (1 = eu, 2 = outros) que o ambiente passa aos cérebros.
+    """
+    b = np.asarray(boards).reshape(-1, NUM_CELLS)
+    return np.concatenate([b == seat, (b != EMPTY) & (b != seat)], axis=1).astype(np.float32)
+
+class NNAgent:
+    """
+    Agente Q com aproximação de função (MLP de uma camada oculta, ou linear) em NumPy puro.
+    Mesma interface do QAgent (choose_action/learn/save_model/load_model), mais act/act_batch
+    para jogar como oponente. A memória é fixa: pesos + uma memória de experiências circular.
+    O treino sorteia lotes da memória, aplica uma simetria aleatória do tabuleiro a cada
+    transição (aumento de dados) e usa uma rede alvo congelada para os valores futuros.
+    """
+
+    def __init__(self, hidden=NN_HIDDEN, lr=NN_LR, batch_size=NN_BATCH, replay_capacity=NN_REPLAY,
+                 target_sync=NN_TARGET_SYNC, train_every=NN_TRAIN_EVERY, augment=True, seed=None):
+        self.hidden = hidden
+        self.alpha = lr  # Mesmo nome do QAgent: quem imprime/ajusta 'alpha' continua funcionando
+        self.gamma = DISCOUNT_FACTOR
+        self.epsilon = EPSILON_START
+        self.batch_size = batch_size
+        self.target_sync = target_sync
+        self.train_every = train_every
+        self.augment = augment
+        self.rng = np.random.default_rng(seed)
+        self.params = self._init_params()
+        self.target = [p.copy() for p in self.params]
+        self.adam_m = [np.zeros_like(p) for p in self.params]
+        self.adam_v = [np.zeros_like(p) for p in self.params]
+        self.updates = 0  # passos de gradiente
+        self.steps = 0    # transições recebidas
+
+        # Memória de experiências: tabuleiros na visão do agente (0 vazio, 1 eu, 2 outros)
+        self.capacity = replay_capacity
+        self.states = np.zeros((replay_capacity, NUM_CELLS), dtype=np.int8)
+        self.next_states = np.zeros((replay_capacity, NUM_CELLS), dtype=np.int8)
+        self.actions = np.zeros(replay_capacity, dtype=np.int64)
+        self.rewards = np.zeros(replay_capacity, dtype=np.float32)
+        self.dones = np.zeros(replay_capacity, dtype=bool)
+        self.pos = 0
+        self.size = 0
+
+    def _init_params(self):
+        n_in = 2 * NUM_CELLS
+        if self.hidden == 0:
+            return [np.zeros((n_in, NUM_CELLS), dtype=np.float32), np.zeros(NUM_CELLS, dtype=np.float32)]
+        # Inicialização de He (ReLU)
+        w1 = self.rng.normal(0, np.sqrt(2 / n_in), (n_in, self.hidden)).astype(np.float32)
+        w2 = self.rng.normal(0, np.sqrt(2 / self.hidden), (self.hidden, NUM_CELLS)).astype(np.float32) * 0.1
+        return [w1, np.zeros(self.hidden, dtype=np.float32), w2, np.zeros(NUM_CELLS, dtype=np.float32)]
+
+    # --- Rede ---
+    def _forward(self, params, x):
+        """Valores Q (N, NUM_CELLS) e a camada oculta (para o backward)."""
+        if self.hidden == 0:
+            w, b = params
+            return x @ w + b, None
+        w1, b1, w2, b2 = params
+        h = np.maximum(x @ w1 + b1, 0)
+        return h @ w2 + b2, h
+
+    def q_values(self, boards, seat=AGENT_ID):
+        """Valores Q de vários tabuleiros de uma vez: uma multiplicação de matriz por camada."""
+        q, _ = self._forward(self.params, board_planes(boards, seat))
+        return q
+
+    def _backward(self, x, h, grad_q):
+        if self.hidden == 0:
+            return [x.T @ grad_q, grad_q.sum(axis=0)]
+        w2 = self.params[2]
+        grad_h = grad_q @ w2.T
+        grad_h[h <= 0] = 0
+        return [x.T @ grad_h, grad_h.sum(axis=0), h.T @ grad_q, grad_q.sum(axis=0)]
+
+    def _adam(self, grads):
+        self.updates += 1
+        b1, b2 = ADAM_BETAS
+        correction = np.sqrt(1 - b2 ** self.updates) / (1 - b1 ** self.updates)
+        for p, g, m, v in zip(self.params, grads, self.adam_m, self.adam_v):
+            m *= b1
+            m += (1 - b1) * g
+            v *= b2
+            v += (1 - b2) * g * g
+            p -= self.alpha * correction * m / (np.sqrt(v) + ADAM_EPS)
+
+    # --- Interface de jogador ---
+    def _greedy(self, q, free):
+        """Melhor casa livre (empates sorteados)."""
+        q = np.where(free, q, -np.inf)
+        return int(random.choice(np.flatnonzero(q == q.max())))
+
+    def choose_action(self, board, valid_moves):
+        """'board' na visão do agente (ele = 1), como no QAgent."""
+        if random.random() < self.epsilon:
+            return random.choice(valid_moves)
+        b = np.asarray(board).ravel()
+        return self._greedy(self.q_values(b)[0], b == EMPTY)
+
+    def act(self, board, seat=AGENT_ID):
+        """Jogada gulosa (casa real) para 'seat' no tabuleiro bruto."""
+        b = np.asarray(board).ravel()
+        return self._greedy(self.q_values(b, seat)[0], b == EMPTY)
+
+    def act_batch(self, boards, seat=AGENT_ID, rng=None):
+        """Jogadas gulosas para vários tabuleiros (N, NUM_CELLS) com um só forward."""
+        rng = rng if rng is not None else np.random.default_rng()
+        boards = np.asarray(boards).reshape(len(boards), NUM_CELLS)
+        q = self.q_values(boards, seat)
+        q[boards != EMPTY] = -np.inf
+        # Desempate aleatório: ruído menor que qualquer diferença real entre valores
+        q += rng.random(q.shape) * 1e-6
+        return q.argmax(axis=1)
+
+    # --- Aprendizado ---
+    def learn(self, state, action, reward, next_state, done=False):
+        """Guarda a transição e, a cada 'train_every' jogadas, dá um passo de gradiente num lote da memória."""
+        i = self.pos
+        self.states[i] = np.minimum(np.asarray(state).ravel(), 2)
+        self.next_states[i] = np.minimum(np.asarray(next_state).ravel(), 2)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.steps += 1
+        if self.size >= self.batch_size and self.steps % self.train_every == 0:
+            idx = self.rng.integers(0, self.size, size=self.batch_size)
+            self.learn_batch(self.states[idx], self.actions[idx], self.rewards[idx],
+                             self.next_states[idx], self.dones[idx])
+
+    def learn_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Um passo de gradiente (erro quadrático no valor da jogada feita) num lote de transições
+        em tabuleiros (N, NUM_CELLS) na visão do agente. Retorna a perda média.
+        """
+        states = np.asarray(states).reshape(-1, NUM_CELLS)
+        next_states = np.asarray(next_states).reshape(-1, NUM_CELLS)
+        actions = np.asarray(actions)
+        n = len(states)
+        if self.augment:
+            # Mesma simetria aleatória no estado, na ação e no próximo estado
+            t = self.rng.integers(0, len(SYM_PERMS), size=n)
+            perms = SYM_PERMS[t]
+            rows = np.arange(n)[:, None]
+            states, next_states = states[rows, perms], next_states[rows, perms]
+            actions = ACTION_MAP[t, actions]
+
+        # Alvo pela rede congelada: max só entre as casas livres do próximo estado
+        q_next, _ = self._forward(self.target, board_planes(next_states))
+        free = next_states == EMPTY
+        q_next = np.where(free, q_next, -np.inf).max(axis=1)
+        q_next[~free.any(axis=1) | np.asarray(dones)] = 0.0
+        targets = np.asarray(rewards, dtype=np.float32) * REWARD_SCALE + self.gamma * q_next
+
+        x = board_planes(states)
+        q, h = self._forward(self.params, x)
+        error = q[np.arange(n), actions] - targets
+        grad_q = np.zeros_like(q)
+        grad_q[np.arange(n), actions] = error / n
+        self._adam(self._backward(x, h, grad_q))
+
+        if self.updates % self.target_sync == 0:
+            self.target = [p.copy() for p in self.params]
+        return float(0.5 * np.mean(error * error))
+
+    def decay_alpha(self):
+        """Compatível com QAgent: o Adam já ajusta o passo de cada peso, a taxa fica fixa."""
+
+    # --- Persistência ---
+    def save_model(self, filename="brain_nn.npz"):
+        np.savez(filename, hidden=self.hidden, board=np.array([BOARD_SIZE, NUM_CELLS]),
+                 **{f"p{i}": p for i, p in enumerate(self.params)})
+        n = sum(p.size for p in self.params)
+        print(f"💾 Rede salva em {filename} ({n} pesos, camada oculta {self.hidden}).")
+
+    def load_model(self, filename="brain_nn.npz"):
+        """Carrega uma rede salva; arquivo ausente levanta FileNotFoundError (não joga com pesos aleatórios)."""
+        with np.load(filename) as data:
+            if int(data["board"][1]) != NUM_CELLS:
+                raise ValueError(f"{filename} foi treinada para outro tamanho de tabuleiro")
+            self.hidden = int(data["hidden"])
+            self.params = [data[f"p{i}"] for i in range(2 if self.hidden == 0 else 4)]
+        self.target = [p.copy() for p in self.params]
+        self.adam_m = [np.zeros_like(p) for p in self.params]
+        self.adam_v = [np.zeros_like(p) for p in self.params]
+        print(f"📂 Rede carregada! Camada oculta: {self.hidden}")
+
+def train_nn(episodes=EPISODES, hidden=NN_HIDDEN, out="brain_nn.npz", metrics_path=None, run_name=None):
+    """Treino contra oponentes aleatórios, como o train.py, com a rede no lugar da Tabela Q."""
+    from environment import make_env
+    from metrics import make_metrics
+
+    env = make_env()
+    agent = NNAgent(hidden)
+    metrics = make_metrics(metrics_path, run_name)
+    print(f"🧠 Treinando rede ({'linear' if hidden == 0 else f'MLP {hidden}'}): {episodes} episódios.")
+    print(f"Campo: {BOARD_SIZE}x{BOARD_SIZE} | Vitória: {WIN_LENGTH} em linha")
+    print("-" * 50)
+    start_time = time.time()
+    for episode in range(1, episodes + 1):
+        if episode > episodes * 0.95:
+            agent.epsilon = 0.0  # Validação pura no fim, como no train.py
+
+        env.reset()
+        state = env.board.copy()
+        done, info, steps = False, {}, 0
+        while not done:
+            valid_moves = env.valid_moves()
+            if not valid_moves: break
+            steps += 1
+            action = agent.choose_action(state, valid_moves)
+            _, reward, done, info = env.step(action)
+            next_state = env.board.copy()
+            agent.learn(state, action, reward, next_state, done)
+            state = next_state
+        metrics.record(info.get('result'), steps)
+
+        if episode <= episodes * 0.95 and agent.epsilon > EPSILON_MIN:
+            # Decai por episódio como o QAgent, mas a rede precisa de bem menos episódios
+            agent.epsilon = max(EPSILON_MIN, agent.epsilon * EPSILON_DECAY ** (EPISODES / episodes))
+
+        if episode % 1000 == 0:
+            stats = metrics.report(episode, epsilon=agent.epsilon, updates=agent.updates)
+            print(f"Episódio {episode:6d} | Vitórias: {stats['win_rate'] * 100:4.1f}% | "
+                  f"Epsilon: {agent.epsilon:.3f} | {stats['episodes_per_second']:,.0f} ep/s")
+    metrics.close()
+    print("-" * 50)
+    print(f"✅ Treinamento concluído em {time.time() - start_time:.1f} segundos!")
+    agent.save_model(out)
+    return agent
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treino do agente com rede neural (NumPy) contra oponentes aleatórios.")
+    parser.add_argument("--episodes", type=int, default=50_000)
+    parser.add_argument("--hidden", type=int, default=NN_HIDDEN, help="Neurônios da camada oculta (0 = linear).")
+    parser.add_argument("--out", default="brain_nn.npz")
+    parser.add_argument("--metrics", default=None, help="Grava as métricas em JSONL (ou SQLite).")
+    parser.add_argument("--run-name", default=None)
+    args = parser.parse_args()
+    train_nn(args.episodes, args.hidden, args.out, args.metrics, args.run_name)
@@ -0,0 +1,173 @@
+# parallel_train.py
+import multiprocessing as mp
+import queue
+import random
+import time
+import numpy as np
+from environment import make_env
+from agent import QAgent, ACTION_MAP
+from qtable import QTable
+from metrics import make_metrics, RESULTS
+from settings import *
+
+# Quantos episódios cada ator junta antes de mandar um lote ao aprendiz
+EPISODES_PER_BATCH = 50
+# A cada quantos episódios processados o aprendiz publica uma nova política
+SYNC_EVERY = 2000
+
+def apply_snapshot(agent, snapshot):
+    keys, values, epsilon = snapshot
+    agent.q_table = QTable.from_arrays(keys, values)
+    agent.epsilon = epsilon
+
+def actor(worker_id, episodes, snapshot_queue, batch_queue, seed):
+    """
+    Processo ator: joga episódios com a última política publicada e envia
+    lotes compactos de transições canônicas para o aprendiz.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    env = make_env()
+    agent = QAgent()
+    apply_snapshot(agent, snapshot_queue.get())  # Espera a primeira política
+
+    states, actions, rewards, next_states, dones, results, lengths = [], [], [], [], [], [], []
+    for episode in range(1, episodes + 1):
+        # Pega a política mais recente, se o aprendiz publicou alguma
+        snapshot = None
+        while True:
+            try:
+                snapshot = snapshot_queue.get_nowait()
+            except queue.Empty:
+                break
+        if snapshot is not None:
+            apply_snapshot(agent, snapshot)
+
+        env.reset()
+        state_key, transform = env.canonical_key()
+        done = False
+        info = {}
+        steps = 0
+        while not done:
+            valid_moves = env.valid_moves()
+            if not valid_moves: break
+            steps += 1
+
+            action = agent.choose_action_from_key(state_key, transform, valid_moves)
+            _, reward, done, info = env.step(action)
+            next_key, next_transform = env.canonical_key()
+
+            states.append(state_key)
+            actions.append(ACTION_MAP[transform, action])
+            rewards.append(reward)
+            next_states.append(next_key)
+            dones.append(done)
+            state_key, transform = next_key, next_transform
+
+        # Resultado como índice em RESULTS (-1 = partida interrompida sem resultado)
+        results.append(RESULTS.index(info['result']) if info.get('result') in RESULTS else -1)
+        lengths.append(steps)
+
+        if episode % EPISODES_PER_BATCH == 0 or episode == episodes:
+            batch_queue.put((
+                worker_id,
+                np.array(states, dtype=np.int64),
+                np.array(actions, dtype=np.int8),
+                np.array(rewards, dtype=np.float32),
+                np.array(next_states, dtype=np.int64),
+                np.array(dones, dtype=bool),
+                np.array(results, dtype=np.int8),
+                np.array(lengths, dtype=np.int16),
+            ))
+            states, actions, rewards, next_states, dones, results, lengths = [], [], [], [], [], [], []
+
+    batch_queue.put((worker_id, None, None, None, None, None, None, None))  # Fim deste ator
+
+def train_parallel(num_workers, episodes=EPISODES, filename="brain.pkl", metrics_path=None, run_name=None):
+    """
+    Aprendiz: aplica os lotes dos atores com QAgent.update e publica
+    periodicamente um novo snapshot da política. Salva no mesmo formato do train.py.
+    """
+    agent = QAgent()
+    ctx = mp.get_context("spawn")
+    batch_queue = ctx.Queue(maxsize=4 * num_workers)
+    snapshot_queues = [ctx.Queue() for _ in range(num_workers)]
+
+    print(f"🚀 Iniciando Treinamento Paralelo: {episodes} episódios | {num_workers} atores.")
+    print(f"Campo: {BOARD_SIZE}x{BOARD_SIZE} | Vitória: {WIN_LENGTH} em linha")
+    print("-" * 50)
+
+    def publish():
+        keys, values = agent.q_table.export()
+        for q in snapshot_queues:
+            q.put((keys, values, agent.epsilon))
+
+    per_worker = [episodes // num_workers + (1 if i < episodes % num_workers else 0)
+                  for i in range(num_workers)]
+    workers = [ctx.Process(target=actor, args=(i, per_worker[i], snapshot_queues[i], batch_queue,
+                                              random.randrange(2**31)), daemon=True)
+               for i in range(num_workers)]
+    for w in workers:
+        w.start()
+    publish()
+
+    start_time = time.time()
+    metrics = make_metrics(metrics_path, run_name)
+    processed = 0
+    last_sync = 0
+    active = num_workers
+
+    while active:
+        try:
+            worker_id, states, actions, rewards, next_states, dones, results, lengths = batch_queue.get(timeout=1.0)
+        except queue.Empty:
+            if any(w.exitcode not in (None, 0) for w in workers):
+                raise RuntimeError("Um processo ator terminou com erro; treino abortado.")
+            continue
+        if states is None:
+            active -= 1
+            continue
+
+        for s, a, r, ns, d in zip(states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist(),
+                                  dones.tolist()):
+            agent.update(s, a, r, ns, d)
+
+        for result, length in zip(results.tolist(), lengths.tolist()):
+            processed += 1
+            metrics.record(RESULTS[result] if result >= 0 else None, length)
+
+            # MODO DE TESTE FINAL: Desliga aleatoriedade nos últimos 5% dos jogos
+            if processed > episodes * 0.95:
+                agent.epsilon = 0.0
+            elif agent.epsilon > EPSILON_MIN:
+                agent.epsilon *= EPSILON_DECAY
+            agent.decay_alpha()
+
+            if processed % 1000 == 0:
+                stats = metrics.report(processed, epsilon=agent.epsilon, alpha=agent.alpha,
+                                       states=len(agent.q_table), workers=num_workers)
+                mode = "TESTE" if agent.epsilon == 0.0 else "TREINO"
+                print(f"Episódio {processed:6d} [{mode}] | "
+                      f"Epsilon: {agent.epsilon:.3f} | "
+                      f"Alpha: {agent.alpha:.3f} | "
+                      f"Vitórias: {stats['win_rate'] * 100:4.1f}% | "
+                      f"Estados: {stats['states']} | "
+                      f"{stats['episodes_per_second']:,.0f} ep/s")
+
+        if processed - last_sync >= SYNC_EVERY:
+            publish()
+            last_sync = processed
+
+    for w in workers:
+        w.join()
+    for q in snapshot_queues:
+        # Snapshots que nenhum ator chegou a ler não devem travar a saída do processo
+        q.cancel_join_thread()
+        q.close()
+
+    metrics.close()
+    total_time = time.time() - start_time
+    print("-" * 50)
+    print(f"✅ Treinamento concluído em {total_time:.1f} segundos!")
+    agent.save_model(filename)
+    return agent
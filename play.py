@@ -1,8 +1,10 @@
+import argparse
 import numpy as np
 import time
 import os
 from environment import TicTacToeEnv
-from agent import QAgent
+from model_registry import get_model
+from move_server import MoveClient, SERVER_ENV
 from settings import *
 
 def print_board(board):
@@ -13,8 +15,8 @@ def print_board(board):
     # Limpa a tela (funciona em Linux/Mac/Windows)
     os.system('cls' if os.name == 'nt' else 'clear')
     
-    print(f"--- Jokenpo 4 Players AI ---")
-    print(f"Agente: {SYMBOLS[AGENT_ID]} | Oponentes: {SYMBOLS[2]}, {SYMBOLS[3]}, {SYMBOLS[4]}")
+    print(f"--- Jokenpo {NUM_PLAYERS} Players AI ---")
+    print(f"Agente: {SYMBOLS[AGENT_ID]} | Oponentes: {', '.join(SYMBOLS[p] for p in OPPONENTS)}")
     print("-" * 25)
 
     for i in range(BOARD_SIZE):
@@ -24,20 +26,22 @@ def print_board(board):
             print("-" * (BOARD_SIZE * 4 - 1))
     print("-" * 25)
 
-def play_demonstration():
-    # 1. Carrega o Ambiente e o Agente
+def play_demonstration(server=None, model="brain.pkl"):
+    # 1. Carrega o Ambiente
     env = TicTacToeEnv()
-    agent = QAgent()
-    
-    # 2. Carrega o cérebro treinado
-    if os.path.exists("brain.pkl"):
-        agent.load_model("brain.pkl")
-    else:
-        print("❌ Erro: brain.pkl não encontrado. Rode o train.py primeiro!")
-        return
 
-    # 3. Configura para modo "Sério" (Sem exploração aleatória)
-    agent.epsilon = 0.0 
+    # 2. Pega o cérebro treinado no registro de modelos (somente leitura, sem exploração;
+    #    recarregado sozinho se o treino gravar uma versão nova durante a demonstração),
+    #    ou pede as jogadas ao servidor de jogadas (move_server.py), que já tem o modelo carregado
+    client = MoveClient(server) if server else None
+    if client:
+        print(f"🛰️ Jogadas pedidas ao servidor em {server}")
+    else:
+        try:
+            agent = get_model(model)
+        except FileNotFoundError:
+            print(f"❌ Erro: {model} não encontrado. Rode o train.py primeiro!")
+            return
     
     # Loop de partidas (Jogar 5 vezes para demonstrar)
     for game in range(1, 6):
@@ -61,7 +65,10 @@ def play_demonstration():
                 print("Empate! Tabuleiro cheio.")
                 break
                 
-            action = agent.choose_action(state_matrix, valid_moves)
+            if client:
+                action = client.move(model, state_matrix, AGENT_ID)
+            else:
+                action = agent.act(state_matrix, AGENT_ID)
             
             # Ambiente executa (Agente + 3 Oponentes)
             next_state_flat, reward, done, info = env.step(action)
@@ -83,4 +90,10 @@ def play_demonstration():
         time.sleep(3)
 
 if __name__ == "__main__":
-    play_demonstration()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Demonstração do agente treinado no terminal.")
+    parser.add_argument("--server", default=os.environ.get(SERVER_ENV),
+                        help=f"Endereço do move_server.py ('unix:/caminho.sock' ou 'host:porta'; padrão: ${SERVER_ENV}).")
+    parser.add_argument("--model", default="brain.pkl",
+                        help="Modelo do agente (.pkl, .qmap, .qz ou rede .npz; padrão: brain.pkl).")
+    args = parser.parse_args()
+    play_demonstration(server=args.server, model=args.model)
\ No newline at end of file
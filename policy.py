@@ -0,0 +1,110 @@
+# policy.py
+import random
+import numpy as np
+from agent import canonicalize, POW3, SYM_PERMS, SYM_WEIGHTS, NUM_CELLS
+from settings import *
+
+class CompiledPolicy:
+    """
+    Política gulosa compilada a partir de um QAgent congelado.
+    Para cada estado canônico guarda as jogadas livres ordenadas por valor e
+    quantas empatam no topo; jogar é uma busca no dicionário e uma indexação.
+    É somente leitura: compilar não altera a Tabela Q de origem.
+    """
+
+    epsilon = 0.0  # Sem exploração (compatível com quem salva/restaura o epsilon dos cérebros)
+
+    def __init__(self, keys, ranked, n_best):
+        self.keys = np.asarray(keys, dtype=np.int64)      # ordenadas
+        self.ranked = np.asarray(ranked, dtype=np.int8)   # (K, NUM_CELLS) ações canônicas, -1 = ocupada
+        self.n_best = np.asarray(n_best, dtype=np.int8)   # (K,) empatadas no melhor valor
+        self.index = dict(zip(self.keys.tolist(), range(len(self.keys))))
+        self.best = self.ranked[:, 0].tolist()            # atalho para o caso sem empate
+        self.n_best_list = self.n_best.tolist()
+
+    @classmethod
+    def compile(cls, source):
+        """source: QAgent ou qualquer tabela com export() (QTable, MappedQTable)."""
+        table = getattr(source, "q_table", source)
+        keys, values = table.export()
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order].astype(np.float64)
+
+        # As casas ocupadas de cada estado saem da própria chave (dígitos base 3 != 0)
+        digits = (keys[:, None] // POW3) % 3
+        values[digits != EMPTY] = -np.inf
+
+        ranked = np.argsort(-values, axis=1, kind="stable")
+        sorted_values = np.take_along_axis(values, ranked, axis=1)
+        ranked[np.isneginf(sorted_values)] = -1
+        n_best = ((sorted_values == sorted_values[:, :1]) & ~np.isneginf(sorted_values)).sum(axis=1)
+        return cls(keys, ranked, n_best)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _find(self, key):
+        """Linha do estado canônico, ou None se ele não está na política."""
+        return self.index.get(key)
+
+    def _pick(self, row):
+        n = self.n_best_list[row]
+        if n == 1:
+            return self.best[row]
+        # Quebra de empate aleatória, igual ao choose_action
+        return int(self.ranked[row, random.randrange(n)])
+
+    def act(self, board, seat=AGENT_ID):
+        """Jogada (casa real) para 'seat' no tabuleiro bruto (ids 0..NUM_PLAYERS), sem cópias extras."""
+        b = np.asarray(board).ravel()
+        view = np.where(b == seat, 1, (b != EMPTY) * 2)
+        key, transform = canonicalize(view)
+        row = self._find(key)
+        if row is None:
+            return int(random.choice(np.flatnonzero(b == EMPTY)))
+        return int(SYM_PERMS[transform, self._pick(row)])
+
+    def choose_action_from_key(self, state_key, transform, valid_moves):
+        """Jogada a partir da chave canônica já pronta (ex.: env.canonical_key)."""
+        row = self._find(state_key)
+        if row is None:
+            return random.choice(valid_moves)
+        return int(SYM_PERMS[transform, self._pick(row)])
+
+    def choose_action(self, board, valid_moves):
+        """Compatível com QAgent: 'board' já na visão do jogador (ele = 1)."""
+        return self.act(board, AGENT_ID)
+
+    def act_batch(self, boards, seat=AGENT_ID, rng=None):
+        """Jogadas para vários tabuleiros (N, NUM_CELLS) de uma vez, do ponto de vista de 'seat'."""
+        rng = rng if rng is not None else np.random.default_rng()
+        boards = np.asarray(boards).reshape(len(boards), NUM_CELLS)
+        views = np.where(boards == seat, 1, (boards != EMPTY) * 2).astype(np.int64)
+        codes = views @ SYM_WEIGHTS.T
+        transforms = codes.argmin(axis=1)
+        keys = codes[np.arange(len(boards)), transforms]
+
+        rows = np.searchsorted(self.keys, keys).clip(max=max(len(self.keys) - 1, 0))
+        found = (self.keys[rows] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+
+        actions = np.empty(len(boards), dtype=np.int64)
+        # Estados conhecidos: uma das melhores jogadas (sorteada entre as empatadas)
+        r = rows[found]
+        pick = (rng.random(len(r)) * self.n_best[r]).astype(np.int64)
+        canon = self.ranked[r, pick].astype(np.int64)
+        actions[found] = SYM_PERMS[transforms[found], canon]
+        # Estados nunca vistos: casa livre aleatória
+        unknown = ~found
+        if unknown.any():
+            noise = rng.random((int(unknown.sum()), NUM_CELLS))
+            noise[boards[unknown] != EMPTY] = -1.0
+            actions[unknown] = noise.argmax(axis=1)
+        return actions
+
+    def save(self, filename):
+        np.savez(filename, keys=self.keys, ranked=self.ranked, n_best=self.n_best)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            return cls(data["keys"], data["ranked"], data["n_best"])
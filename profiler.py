@@ -0,0 +1,87 @@
+# profiler.py
+import time
+from collections import defaultdict
+
+class PhaseProfiler:
+    """
+    Acumula tempo de parede e número de chamadas por fase do treino.
+    Só custa algo quando instalado com instrument_env / instrument_agent:
+    sem isso, nenhum método é embrulhado e o caminho quente fica intacto.
+    Os tempos são inclusivos (a jogada de um cérebro inclui a sua canonicalização).
+    """
+
+    def __init__(self, callback=None):
+        """callback: função chamada com o dicionário de cada report()."""
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def add(self, phase, elapsed):
+        self.totals[phase] += elapsed
+        self.counts[phase] += 1
+
+    def snapshot(self):
+        """{fase: {'seconds', 'calls', 'share'}} desde o último reset."""
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        return {phase: {'seconds': total, 'calls': self.counts[phase], 'share': total / wall}
+                for phase, total in sorted(self.totals.items(), key=lambda kv: -kv[1])}
+
+    def report(self, reset=True):
+        """Monta a linha de relatório, chama o callback e (por padrão) zera os contadores."""
+        stats = self.snapshot()
+        if self.callback:
+            self.callback(stats)
+        if reset:
+            self.reset()
+        return " | ".join(f"{phase}: {s['share']:4.0%} ({s['seconds'] / s['calls'] * 1e6:.1f}µs x{s['calls']})"
+                          for phase, s in stats.items())
+
+def timed(profiler, phase, func):
+    """Embrulha 'func' somando o seu tempo na fase 'phase'."""
+    perf_counter = time.perf_counter
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.add(phase, perf_counter() - start)
+    return wrapper
+
+def instrument_env(env, profiler):
+    """Mede env.step, a inferência de cada assento adversário, get_opponent_view e canonical_key."""
+    env.step = timed(profiler, "env.step", env.step)
+    env.get_opponent_view = timed(profiler, "opponent_view", env.get_opponent_view)
+    env.canonical_key = timed(profiler, "canonical_key", env.canonical_key)
+
+    opponent_action = env.opponent_action
+    perf_counter = time.perf_counter
+    def seat_timed(opp_id, valid_moves):
+        start = perf_counter()
+        try:
+            return opponent_action(opp_id, valid_moves)
+        finally:
+            kind = "brain" if env.opponent_brains.get(opp_id) else "random"
+            profiler.add(f"opponent[{opp_id}:{kind}]", perf_counter() - start)
+    env.opponent_action = seat_timed
+    return env
+
+def instrument_agent(agent, profiler, prefix=""):
+    """
+    Mede escolha de ação, canonicalização, atualização Q e crescimento da tabela.
+    Só embrulha o que o objeto tem (uma CompiledPolicy, por exemplo, só tem choose_action/act).
+    A atualização é medida em observe, por onde passam os três modos de aprendizado.
+    """
+    phases = {"choose_action": "choose_action", "choose_action_from_key": "choose_action", "act": "act",
+              "get_symmetry_info": "canonicalization", "observe": "q_update",
+              "learn_batch": "replay_update"}
+    for method, phase in phases.items():
+        if hasattr(agent, method):
+            setattr(agent, method, timed(profiler, f"{prefix}{phase}", getattr(agent, method)))
+    q_table = getattr(agent, "q_table", None)
+    if hasattr(q_table, "_grow"):
+        q_table._grow = timed(profiler, f"{prefix}q_table_grow", q_table._grow)
+    return agent
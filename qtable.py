@@ -0,0 +1,141 @@
+# qtable.py
+import numpy as np
+from settings import *
+
+class QTable:
+    """
+    Tabela Q compacta com interface de dicionário.
+    Cada chave inteira aponta para uma linha de uma única matriz contígua
+    (dtype configurável), que dobra de tamanho quando enche.
+    """
+
+    def __init__(self, n_actions=BOARD_SIZE * BOARD_SIZE, dtype=Q_DTYPE, capacity=1024):
+        self.n_actions = n_actions
+        self.dtype = np.dtype(dtype)
+        self.index = {}  # chave -> linha
+        self._keys = np.empty(capacity, dtype=np.int64)
+        self.data = np.zeros((capacity, n_actions), dtype=self.dtype)
+        # Quantas atualizações cada linha recebeu (linhas só consultadas ficam em 0)
+        self.visits = np.zeros(capacity, dtype=np.uint32)
+        # Linhas alteradas desde o último checkpoint (1 byte por linha)
+        self.dirty = bytearray(capacity)
+
+    # --- Interface de dicionário ---
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, key):
+        return self.data[self.index[key]]
+
+    def __setitem__(self, key, row):
+        idx = self.row_index(key)
+        self.data[idx] = row
+        self.dirty[idx] = 1
+
+    def get(self, key, default=None):
+        idx = self.index.get(key)
+        return default if idx is None else self.data[idx]
+
+    def keys(self):
+        return self.index.keys()
+
+    def values(self):
+        return (self.data[idx] for idx in self.index.values())
+
+    def items(self):
+        return ((key, self.data[idx]) for key, idx in self.index.items())
+
+    # --- Acesso por linha (caminho quente) ---
+    def row_index(self, key):
+        """Linha da chave na matriz 'data', criando uma linha zerada se for nova."""
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.index)
+            if idx == len(self._keys):
+                self._grow()
+            self.index[key] = idx
+            self._keys[idx] = key
+            self.dirty[idx] = 1
+        return idx
+
+    def row_indices(self, keys):
+        """Linhas de várias chaves de uma vez (cria as novas); uma consulta por chave distinta."""
+        unique, inverse = np.unique(np.asarray(keys, dtype=np.int64), return_inverse=True)
+        rows = np.fromiter((self.row_index(key) for key in unique.tolist()), dtype=np.int64, count=len(unique))
+        return rows[inverse]
+
+    def mark_dirty(self, rows):
+        """Marca várias linhas como alteradas (para o próximo checkpoint incremental)."""
+        np.frombuffer(self.dirty, dtype=np.uint8)[rows] = 1
+
+    def count_visits(self, rows):
+        """Soma uma visita por ocorrência (linhas repetidas contam várias vezes)."""
+        np.add.at(self.visits, rows, 1)
+
+    def _grow(self):
+        # Crescimento amortizado: dobra a capacidade (as linhas novas já vêm zeradas)
+        capacity = max(1, 2 * len(self._keys))
+        keys = np.empty(capacity, dtype=np.int64)
+        keys[:len(self._keys)] = self._keys
+        data = np.zeros((capacity, self.n_actions), dtype=self.dtype)
+        data[:len(self.data)] = self.data
+        visits = np.zeros(capacity, dtype=np.uint32)
+        visits[:len(self.visits)] = self.visits
+        self._keys, self.data, self.visits = keys, data, visits
+        self.dirty.extend(bytes(capacity - len(self.dirty)))
+
+    def take_dirty(self):
+        """Índices das linhas alteradas desde a última chamada (e limpa as marcas)."""
+        n = len(self.index)
+        rows = np.flatnonzero(np.frombuffer(bytes(self.dirty[:n]), dtype=np.uint8))
+        self.dirty[:] = bytes(len(self.dirty))
+        return rows
+
+    # --- Exportação em bloco ---
+    def export(self):
+        """Retorna (chaves, valores) como arrays, na ordem de inserção."""
+        n = len(self.index)
+        return self._keys[:n].copy(), self.data[:n].copy()
+
+    def export_rows(self, rows):
+        """Chaves e valores apenas das linhas pedidas (usado nos checkpoints incrementais)."""
+        return self._keys[rows], self.data[rows]
+
+    def export_visits(self, rows=None):
+        """Contagem de visitas, na ordem de export() (ou só das linhas pedidas)."""
+        return self.visits[:len(self.index)].copy() if rows is None else self.visits[rows]
+
+    @classmethod
+    def from_arrays(cls, keys, values, dtype=None, visits=None):
+        values = np.asarray(values)
+        table = cls(values.shape[1], dtype or values.dtype, capacity=max(1, len(keys)))
+        n = len(keys)
+        table._keys[:n] = keys
+        table.data[:n] = values
+        if visits is not None:
+            table.visits[:n] = visits
+        table.index = {int(key): i for i, key in enumerate(keys)}
+        return table
+
+    @classmethod
+    def from_dict(cls, q_dict, n_actions=BOARD_SIZE * BOARD_SIZE, dtype=Q_DTYPE):
+        """Converte a tabela antiga ({chave: np.array}) para o formato compacto."""
+        keys = np.fromiter(q_dict.keys(), dtype=np.int64, count=len(q_dict))
+        values = np.array(list(q_dict.values()), dtype=dtype).reshape(len(q_dict), n_actions)
+        return cls.from_arrays(keys, values, dtype)
+
+    # --- Pickle compacto: só os dois arrays, sem a capacidade sobrando ---
+    def __getstate__(self):
+        keys, values = self.export()
+        return {'keys': keys, 'values': values, 'visits': self.export_visits()}
+
+    def __setstate__(self, state):
+        # Modelos salvos antes da contagem de visitas carregam com tudo em 0
+        table = QTable.from_arrays(state['keys'], state['values'], visits=state.get('visits'))
+        self.__dict__.update(table.__dict__)
@@ -0,0 +1,50 @@
+# replay.py
+import numpy as np
+
+REPLAY_CAPACITY = 200_000  # transições guardadas (as mais antigas são sobrescritas)
+REPLAY_BATCH = 64          # transições reaprendidas ao fim de cada episódio
+
+class ReplayBuffer:
+    """
+    Memória de experiências em arrays NumPy pré-alocados (buffer circular).
+    Guarda as transições já no espaço canônico: chave do estado, ação canônica,
+    recompensa, chave do próximo estado e se a partida acabou.
+    """
+
+    def __init__(self, capacity=REPLAY_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_keys = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.pos = 0    # próxima posição a escrever
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key, action, reward, next_key, done):
+        i = self.pos
+        self.keys[i] = key
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_keys[i] = next_key
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size=REPLAY_BATCH):
+        """Lote uniforme (com reposição): (chaves, ações, recompensas, próximas chaves, dones)."""
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self.keys[idx], self.actions[idx], self.rewards[idx], self.next_keys[idx], self.dones[idx]
+
+def add_replay_args(parser):
+    """Argumentos de linha de comando do modo replay, comuns aos scripts de treino."""
+    parser.add_argument("--replay", action="store_true",
+                        help="Aprende por lotes sorteados de uma memória de experiências.")
+    parser.add_argument("--replay-capacity", type=int, default=REPLAY_CAPACITY,
+                        help=f"Transições guardadas na memória (padrão: {REPLAY_CAPACITY}).")
+    parser.add_argument("--replay-batch", type=int, default=REPLAY_BATCH,
+                        help=f"Transições reaprendidas ao fim de cada episódio (padrão: {REPLAY_BATCH}).")
@@ -0,0 +1,290 @@
+# search_agent.py
+import time
+import numpy as np
+from environment import NUM_CELLS, WIN_MASKS, CELL_WIN_MASKS, FULL_MASK
+from agent import ACTION_MAP, SYM_PERMS
+from settings import *
+
+SEARCH_MODES = ('maxn', 'paranoid')
+SEARCH_PREFIX = 'search'  # Prefixo das especificações de jogador (tournament.py)
+
+# Código das simetrias com os assentos preservados (base NUM_PLAYERS + 1, não dobra 3, 4, ... em 2).
+# O código da transformação t é a soma de valor_da_casa * SYM_POWERS[t][casa].
+BASE = NUM_PLAYERS + 1
+SYM_POWERS = [[BASE ** (NUM_CELLS - 1 - int(ACTION_MAP[t, c])) for c in range(NUM_CELLS)]
+              for t in range(len(SYM_PERMS))]
+
+# Avaliação estática: linhas "vivas" (só com peças de um jogador) valem mais quanto mais cheias
+LINE_WEIGHTS = [0] + [10 ** (k - 1) for k in range(1, WIN_LENGTH)]
+WIN_SCORE = 1_000_000
+# Ordem estática das casas: as que cruzam mais linhas primeiro (centro antes das bordas)
+STATIC_ORDER = sorted(range(NUM_CELLS), key=lambda c: -len(CELL_WIN_MASKS[c]))
+
+# Cópias em listas Python: indexar arrays NumPy nó a nó custaria mais que a própria busca
+REAL_CELL = SYM_PERMS.tolist()     # [t][casa canônica] -> casa real
+CANON_CELL = ACTION_MAP.tolist()   # [t][casa real] -> casa canônica
+
+TT_LIMIT = 1 << 20  # entradas da tabela de transposição antes de esvaziá-la
+EXACT, LOWER, UPPER = 0, 1, 2
+CHECK_EVERY = 1024  # nós entre consultas ao relógio
+
+class SearchTimeout(Exception):
+    """Estouro do orçamento de tempo no meio de uma iteração."""
+
+class SearchAgent:
+    """
+    Jogador por busca, sem treino: aprofundamento iterativo a NUM_PLAYERS jogadores.
+      'maxn'     -> cada jogador maximiza o próprio componente de um vetor de utilidades;
+      'paranoid' -> todos os outros minimizam a utilidade de quem busca (permite poda alfa-beta).
+    A tabela de transposição usa a chave canônica (8 simetrias) com os assentos preservados
+    e é mantida entre jogadas, então uma partida reaproveita a busca das anteriores.
+    """
+
+    def __init__(self, seat=AGENT_ID, mode='paranoid', max_depth=3, time_budget=None):
+        """
+        seat: assento usado por choose_action (act recebe o assento explicitamente).
+        max_depth: profundidade máxima em meias-jogadas (uma jogada de um assento cada).
+        time_budget: segundos por jogada (None = só o limite de profundidade).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Modo de busca desconhecido: {mode!r} (use {', '.join(SEARCH_MODES)})")
+        self.seat = seat
+        self.mode = mode
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.epsilon = 0.0  # Compatível com quem salva/restaura epsilon dos cérebros
+        self.tt = {}
+        self.history = [0] * NUM_CELLS
+        self.nodes = 0
+        self.last_depth = 0
+
+    @classmethod
+    def from_spec(cls, spec, seat=AGENT_ID):
+        """Cria a partir de 'search[:modo[:profundidade[:segundos]]]', ex.: 'search:maxn:2'."""
+        parts = spec.split(":")
+        if parts[0] != SEARCH_PREFIX:
+            raise ValueError(f"Especificação de busca inválida: {spec!r}")
+        mode = parts[1] if len(parts) > 1 else 'paranoid'
+        max_depth = int(parts[2]) if len(parts) > 2 else 3
+        time_budget = float(parts[3]) if len(parts) > 3 else None
+        return cls(seat, mode, max_depth, time_budget)
+
+    # --- Interface de jogador ---
+    def choose_action(self, board, valid_moves):
+        """Compatível com QAgent: joga pelo assento 'self.seat' no tabuleiro bruto."""
+        return self.act(board, self.seat)
+
+    def act(self, board, seat):
+        """Melhor jogada (casa real) para 'seat' no tabuleiro bruto (ids 0..NUM_PLAYERS)."""
+        cells = np.asarray(board).ravel().tolist()
+        self._setup(cells)
+        free = [c for c in range(NUM_CELLS) if not cells[c]]
+        if len(free) == 1:
+            return free[0]
+
+        self.root = seat
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        if len(self.tt) >= TT_LIMIT:
+            self.tt.clear()
+
+        best_move = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                move, value = self._search_root(depth, seat)
+            except SearchTimeout:
+                self._setup(cells)  # Desfaz as jogadas que ficaram no meio da árvore
+                break
+            if value <= -WIN_SCORE and best_move is not None:
+                break  # Derrota "forçada" pela coalizão: fica com a jogada da iteração anterior
+            best_move, self.last_depth = move, depth
+            if value >= WIN_SCORE:
+                break  # Vitória forçada: aprofundar não muda a escolha
+        if best_move is None:
+            best_move = self._ordered_moves(seat, None)[0]
+        return best_move
+
+    # --- Estado interno (bitboards + códigos das 8 simetrias) ---
+    def _setup(self, cells):
+        self.bits = [0] * (NUM_PLAYERS + 1)
+        self.occupied = 0
+        self.codes = [0] * len(SYM_POWERS)
+        for c, v in enumerate(cells):
+            if v:
+                self._place(c, v)
+
+    def _place(self, cell, seat):
+        self.bits[seat] |= 1 << cell
+        self.occupied |= 1 << cell
+        codes = self.codes
+        for t, powers in enumerate(SYM_POWERS):
+            codes[t] += seat * powers[cell]
+        bits = self.bits[seat]
+        for m in CELL_WIN_MASKS[cell]:
+            if bits & m == m:
+                return True
+        return False
+
+    def _remove(self, cell, seat):
+        self.bits[seat] ^= 1 << cell
+        self.occupied ^= 1 << cell
+        codes = self.codes
+        for t, powers in enumerate(SYM_POWERS):
+            codes[t] -= seat * powers[cell]
+
+    def _key(self, mover):
+        """(chave da transposição, transformação canônica) do nó atual."""
+        code = min(self.codes)
+        transform = self.codes.index(code)
+        root = self.root if self.mode == 'paranoid' else 0  # O valor paranoico depende de quem busca
+        return (code * BASE + mover) * BASE + root, transform
+
+    def _tick(self):
+        self.nodes += 1
+        if self.deadline and not self.nodes % CHECK_EVERY and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+    # --- Ordenação de jogadas ---
+    def _ordered_moves(self, mover, tt_move):
+        """Jogada da transposição, vitórias imediatas, bloqueios e depois histórico/ordem estática."""
+        occupied = self.occupied
+        free = [c for c in STATIC_ORDER if not occupied >> c & 1]
+        own = self.bits[mover]
+        wins, blocks, rest = [], [], []
+        for c in free:
+            bit = 1 << c
+            masks = CELL_WIN_MASKS[c]
+            if any((own | bit) & m == m for m in masks):
+                wins.append(c)
+            elif any((self.bits[p] | bit) & m == m for p in range(1, NUM_PLAYERS + 1) if p != mover for m in masks):
+                blocks.append(c)
+            else:
+                rest.append(c)
+        history = self.history
+        rest.sort(key=lambda c: -history[c])
+        moves = wins + blocks + rest
+        if tt_move is not None and tt_move in moves[1:]:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    # --- Avaliação ---
+    def _scores(self):
+        """Pontuação de linhas vivas de cada assento."""
+        scores = [0] * (NUM_PLAYERS + 1)
+        occupied, bits = self.occupied, self.bits
+        for mask in WIN_MASKS:
+            taken = occupied & mask
+            if not taken:
+                continue
+            for p in range(1, NUM_PLAYERS + 1):
+                own = bits[p] & mask
+                if own:
+                    if own == taken:
+                        scores[p] += LINE_WEIGHTS[own.bit_count()]
+                    break
+        return scores
+
+    def _evaluate_vector(self):
+        scores = self._scores()
+        total = sum(scores)
+        # Utilidade relativa: o próprio placar contra a média dos outros (escala inteira)
+        return [(NUM_PLAYERS - 1) * s - (total - s) for s in scores]
+
+    def _evaluate(self):
+        scores = self._scores()
+        s = scores[self.root]
+        return (NUM_PLAYERS - 1) * s - (sum(scores) - s)
+
+    # --- Busca ---
+    def _search_root(self, depth, seat):
+        if self.mode == 'maxn':
+            value, move = self._maxn(depth, seat)
+            return move, value[seat]
+        value, move = self._paranoid(depth, seat, -float('inf'), float('inf'))
+        return move, value
+
+    def _maxn(self, depth, mover):
+        """Retorna (vetor de utilidades indexado por assento, melhor jogada)."""
+        self._tick()
+        key, transform = self._key(mover)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry:
+            stored_depth, value, _, canon_move = entry
+            tt_move = REAL_CELL[transform][canon_move]
+            if stored_depth >= depth:
+                return value, tt_move
+
+        next_seat = mover % NUM_PLAYERS + 1
+        best, best_move = None, None
+        for cell in self._ordered_moves(mover, tt_move):
+            if self._place(cell, mover):
+                value = [-(WIN_SCORE + depth)] * (NUM_PLAYERS + 1)
+                value[mover] = WIN_SCORE + depth  # Vitória mais cedo vale mais
+            elif self.occupied == FULL_MASK:
+                value = [0] * (NUM_PLAYERS + 1)
+            elif depth == 1:
+                value = self._evaluate_vector()
+            else:
+                value = self._maxn(depth - 1, next_seat)[0]
+            self._remove(cell, mover)
+
+            if best is None or value[mover] > best[mover]:
+                best, best_move = value, cell
+                if value[mover] >= WIN_SCORE:
+                    break
+
+        self.history[best_move] += depth * depth
+        self.tt[key] = (depth, best, EXACT, CANON_CELL[transform][best_move])
+        return best, best_move
+
+    def _paranoid(self, depth, mover, alpha, beta):
+        """Minimax com poda alfa-beta: só quem busca maximiza. Retorna (valor, melhor jogada)."""
+        self._tick()
+        key, transform = self._key(mover)
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry:
+            stored_depth, value, flag, canon_move = entry
+            tt_move = REAL_CELL[transform][canon_move]
+            if stored_depth >= depth:
+                if flag == EXACT:
+                    return value, tt_move
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, tt_move
+
+        alpha0, beta0 = alpha, beta
+        maximizing = mover == self.root
+        next_seat = mover % NUM_PLAYERS + 1
+        best = -float('inf') if maximizing else float('inf')
+        best_move = None
+        for cell in self._ordered_moves(mover, tt_move):
+            if self._place(cell, mover):
+                value = WIN_SCORE + depth if maximizing else -(WIN_SCORE + depth)
+            elif self.occupied == FULL_MASK:
+                value = 0
+            elif depth == 1:
+                value = self._evaluate()
+            else:
+                value = self._paranoid(depth - 1, next_seat, alpha, beta)[0]
+            self._remove(cell, mover)
+
+            if maximizing:
+                if value > best:
+                    best, best_move = value, cell
+                    alpha = max(alpha, value)
+            elif value < best:
+                best, best_move = value, cell
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        self.history[best_move] += depth * depth
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta0 else EXACT
+        self.tt[key] = (depth, best, flag, CANON_CELL[transform][best_move])
+        return best, best_move
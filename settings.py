@@ -5,18 +5,30 @@ BOARD_SIZE = 4
 WIN_LENGTH = 3
 NUM_PLAYERS = 4
 
+# Motor do ambiente: 'numpy' (referência) ou 'bitboard' (rápido, para treino)
+ENGINE = 'bitboard'
+
 EMPTY = 0
 AGENT_ID = 1
-OPPONENTS = [2, 3, 4]
+OPPONENTS = list(range(AGENT_ID + 1, NUM_PLAYERS + 1))  # Com 4 jogadores: [2, 3, 4]
 
 SYMBOLS = {
     EMPTY: '.',
     AGENT_ID: 'X',
     2: 'O',
     3: '<',
-    4: '^'
+    4: '^',
+    5: '#',
+    6: '%',
+    7: '&',
+    8: '@'
 }
 
+if not 2 <= NUM_PLAYERS < len(SYMBOLS):
+    raise ValueError(f"NUM_PLAYERS deve estar entre 2 e {len(SYMBOLS) - 1}")
+if not 2 <= WIN_LENGTH <= BOARD_SIZE:
+    raise ValueError("WIN_LENGTH deve estar entre 2 e BOARD_SIZE")
+
 REWARDS = {
     'WIN': 500,        # Ganhar
     'LOSS': -300,      # Perder
@@ -28,6 +40,9 @@ REWARDS = {
     'IGNORE_DEFENSE': -100 # Inimigo tinha chance de ganhar e o agente ignorou
 }
 
+# Tipo numérico da Tabela Q (float32 ocupa metade da memória de float64)
+Q_DTYPE = np.float32
+
 # Parâmetros de Treinamento
 EPISODES = 600_000 #numero de repeticoes
 DISCOUNT_FACTOR = 0.99 #importancia à vitórias futuras
@@ -0,0 +1,209 @@
+# solver.py
+import argparse
+import time
+import numpy as np
+from environment import NUM_CELLS, WIN_LINES
+from agent import QAgent, SYM_WEIGHTS, SYM_PERMS, ACTION_MAP
+from qtable import QTable
+from model_store import resolve_model_path
+from settings import *
+
+LINES = np.array(WIN_LINES)
+# Limite de linhas na fronteira de expansão por bloco (controla a memória)
+FRONTIER_LIMIT = 1_000_000
+
+def _wins(boards, seat):
+    return (boards[:, LINES] == seat).all(axis=2).any(axis=1)
+
+def _full(boards):
+    return (boards != EMPTY).all(axis=1)
+
+def _canonical(boards, seat=AGENT_ID):
+    """Código canônico e transformação de cada tabuleiro, do ponto de vista de 'seat'."""
+    views = np.where(boards == seat, 1, np.where(boards != EMPTY, 2, EMPTY)).astype(np.int64)
+    codes = views @ SYM_WEIGHTS.T
+    transforms = codes.argmin(axis=1)
+    return codes[np.arange(len(boards)), transforms], transforms
+
+def _expand_random(boards, sa, prob, seat):
+    """Cada tabuleiro vira um ramo por casa livre, com probabilidade uniforme."""
+    empty = boards == EMPTY
+    rows, cells = np.nonzero(empty)
+    new_boards = boards[rows]
+    new_boards[np.arange(len(rows)), cells] = seat
+    return new_boards, sa[rows], prob[rows] / empty.sum(axis=1)[rows]
+
+def _expand_brain(boards, sa, prob, seat, brain):
+    """Ramos da jogada gulosa do cérebro (empates divididos igualmente, como no choose_action)."""
+    keys, transforms = _canonical(boards, seat)
+    rows, cells, weights = [], [], []
+    for i, (key, transform) in enumerate(zip(keys.tolist(), transforms.tolist())):
+        valid = np.flatnonzero(boards[i] == EMPTY)
+        q_row = brain.q_table.get(key)
+        if q_row is not None:
+            q_values = q_row[ACTION_MAP[transform, valid]]
+            valid = valid[q_values == q_values.max()]
+        rows.extend([i] * len(valid))
+        cells.extend(valid.tolist())
+        weights.extend([1.0 / len(valid)] * len(valid))
+    rows = np.array(rows, dtype=np.int64)
+    new_boards = boards[rows]
+    new_boards[np.arange(len(rows)), cells] = seat
+    return new_boards, sa[rows], prob[rows] * np.array(weights)
+
+def solve(opponent_brains=None, gamma=DISCOUNT_FACTOR, tol=1e-6, max_sweeps=1000, verbose=True):
+    """
+    Enumera os estados canônicos alcançáveis (mesma redução de simetria do QAgent),
+    monta o modelo de transição contra os oponentes dados (None/ausente = aleatório,
+    como em TicTacToeEnv.play_opponents) e roda varreduras de Bellman vetorizadas.
+
+    Observação: a chave canônica dobra os assentos 3, 4, ... em 2, então cada estado
+    é expandido a partir de um tabuleiro representante (o primeiro encontrado).
+    Retorna uma QTable compatível com brain.pkl (ações no espaço canônico).
+    """
+    opponent_brains = opponent_brains or {}
+    start_time = time.time()
+
+    # Estados: chave canônica + tabuleiro representante já na orientação canônica
+    state_keys = [np.zeros(1, dtype=np.int64)]
+    layer_boards = np.zeros((1, NUM_CELLS), dtype=np.int8)
+    n_states = 1
+
+    sa_state, sa_action, sa_reward = [], [], []   # um item por (estado, ação)
+    trans_sa, trans_next, trans_prob = [], [], []  # transições não terminais
+    n_sa = 0
+
+    layer = 0
+    while len(layer_boards):
+        next_index = {}      # chave -> id global (estados da próxima camada)
+        next_boards = []
+        layer_offset = n_states - len(layer_boards)
+
+        actions_per_state = max(1, int((layer_boards[0] == EMPTY).sum()))
+        branching = actions_per_state
+        for k in range(len(OPPONENTS)):
+            branching *= max(1, actions_per_state - 1 - k)
+        chunk = max(1, FRONTIER_LIMIT // branching)
+
+        for begin in range(0, len(layer_boards), chunk):
+            boards = layer_boards[begin:begin + chunk]
+
+            # 1. Jogada do agente: uma linha por (estado, ação canônica)
+            rows, cells = np.nonzero(boards == EMPTY)
+            sa_ids = n_sa + np.arange(len(rows))
+            n_sa += len(rows)
+            sa_state.append(layer_offset + begin + rows)
+            sa_action.append(cells)
+            reward = np.zeros(len(rows))
+
+            after = boards[rows]
+            after[np.arange(len(rows)), cells] = AGENT_ID
+            won = _wins(after, AGENT_ID)
+            full = ~won & _full(after)
+            reward[won] = REWARDS['WIN']
+            reward[full] = REWARDS['DRAW']
+            alive = ~(won | full)
+            frontier, f_sa, f_prob = after[alive], sa_ids[alive], np.ones(int(alive.sum()))
+
+            # 2. Oponentes, na ordem dos assentos
+            for seat in OPPONENTS:
+                if not len(frontier): break
+                brain = opponent_brains.get(seat)
+                if brain:
+                    frontier, f_sa, f_prob = _expand_brain(frontier, f_sa, f_prob, seat, brain)
+                else:
+                    frontier, f_sa, f_prob = _expand_random(frontier, f_sa, f_prob, seat)
+
+                lost = _wins(frontier, seat)
+                drawn = ~lost & _full(frontier)
+                np.add.at(reward, f_sa[lost] - sa_ids[0], f_prob[lost] * REWARDS['LOSS'])
+                np.add.at(reward, f_sa[drawn] - sa_ids[0], f_prob[drawn] * REWARDS['DRAW'])
+                keep = ~(lost | drawn)
+                frontier, f_sa, f_prob = frontier[keep], f_sa[keep], f_prob[keep]
+
+            # 3. Quem sobrou continua o jogo: penalidade de passo + próximo estado canônico
+            np.add.at(reward, f_sa - sa_ids[0], f_prob * REWARDS['STEP'])
+            sa_reward.append(reward)
+            if len(frontier):
+                keys, transforms = _canonical(frontier)
+                unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+                ids = np.empty(len(unique_keys), dtype=np.int64)
+                for j, key in enumerate(unique_keys.tolist()):
+                    idx = next_index.get(key)
+                    if idx is None:
+                        idx = next_index[key] = n_states + len(next_index)
+                        src = frontier[first[j]]
+                        next_boards.append(src[SYM_PERMS[transforms[first[j]]]])
+                    ids[j] = idx
+                # Junta ramos repetidos (mesmo par estado-ação -> mesmo próximo estado)
+                base = n_states + len(next_index)
+                pair = f_sa * base + ids[inverse]
+                unique_pair, pair_inverse = np.unique(pair, return_inverse=True)
+                trans_sa.append((unique_pair // base).astype(np.int32))
+                trans_next.append((unique_pair % base).astype(np.int32))
+                trans_prob.append(np.bincount(pair_inverse, weights=f_prob).astype(np.float32))
+
+        if verbose:
+            print(f"🧮 Camada {layer}: {len(layer_boards)} estados canônicos")
+        layer += 1
+        if next_boards:
+            state_keys.append(np.fromiter(next_index.keys(), dtype=np.int64, count=len(next_index)))
+            layer_boards = np.array(next_boards, dtype=np.int8)
+            n_states += len(next_boards)
+        else:
+            layer_boards = np.zeros((0, NUM_CELLS), dtype=np.int8)
+
+    keys = np.concatenate(state_keys)
+    sa_state = np.concatenate(sa_state)
+    sa_action = np.concatenate(sa_action)
+    sa_reward = np.concatenate(sa_reward)
+    t_sa = np.concatenate(trans_sa) if trans_sa else np.zeros(0, np.int32)
+    t_next = np.concatenate(trans_next) if trans_next else np.zeros(0, np.int32)
+    t_prob = np.concatenate(trans_prob) if trans_prob else np.zeros(0, np.float32)
+    if verbose:
+        print(f"🧮 Modelo: {len(keys)} estados, {len(sa_state)} pares estado-ação, "
+              f"{len(t_sa)} transições ({time.time() - start_time:.1f}s)")
+
+    # 4. Varreduras de Bellman vetorizadas até convergir
+    first_sa = np.searchsorted(sa_state, np.arange(len(keys)))
+    has_actions = first_sa < len(sa_state)
+    values = np.zeros(len(keys))
+    q = sa_reward.copy()
+    for sweep in range(1, max_sweeps + 1):
+        q = sa_reward + gamma * np.bincount(t_sa, weights=t_prob * values[t_next], minlength=len(sa_state))
+        new_values = np.zeros(len(keys))
+        new_values[has_actions] = np.maximum.reduceat(q, first_sa[has_actions])
+        delta = np.abs(new_values - values).max()
+        values = new_values
+        if delta < tol:
+            break
+    if verbose:
+        print(f"✅ Convergiu em {sweep} varreduras (Δ={delta:.2e}) | {time.time() - start_time:.1f}s")
+
+    table_values = np.zeros((len(keys), NUM_CELLS), dtype=Q_DTYPE)
+    table_values[sa_state, sa_action] = q
+    return QTable.from_arrays(keys, table_values)
+
+def load_opponents(specs):
+    """'random' ou caminho de modelo para cada assento adversário, na ordem de OPPONENTS."""
+    brains = {}
+    for seat, spec in zip(OPPONENTS, specs):
+        if spec != "random":
+            brain = QAgent()
+            brain.load_model(resolve_model_path(spec))
+            brains[seat] = brain
+    return brains
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve o jogo por iteração de valor sobre os estados canônicos.")
+    parser.add_argument("--opponents", nargs="*", default=[],
+                        help="Um item por assento adversário (2, 3, 4...): 'random' ou arquivo de modelo. "
+                             "Assentos omitidos jogam aleatório.")
+    parser.add_argument("--gamma", type=float, default=DISCOUNT_FACTOR)
+    parser.add_argument("--tol", type=float, default=1e-6)
+    parser.add_argument("--out", default="brain.pkl")
+    args = parser.parse_args()
+
+    agent = QAgent()
+    agent.q_table = solve(load_opponents(args.opponents), gamma=args.gamma, tol=args.tol)
+    agent.save_model(args.out)
@@ -1,6 +1,8 @@
 import random
 import time
+import numpy as np
 from environment import TicTacToeEnv
+from vec_environment import VecTicTacToeEnv, RESULT_NAMES, RESULT_NONE
 from settings import BOARD_SIZE
 
 def run_random_games(num_games=100):
@@ -41,5 +43,35 @@ def run_random_games(num_games=100):
     else:
         print("\n❌ ERRO: Algumas partidas não tiveram desfecho claro.")
 
+def run_vec_random_games(num_games=100_000, num_envs=4096):
+    env = VecTicTacToeEnv(num_envs)
+    counts = np.zeros(len(RESULT_NAMES), dtype=np.int64)
+    rows = np.arange(num_envs)
+    transitions = 0
+
+    print(f"\n--- Teste Vetorizado: {num_games} Partidas em lotes de {num_envs} ---")
+    start_time = time.time()
+    env.reset()
+
+    while counts.sum() < num_games:
+        # Agente "Burro" também aqui, inclusive com jogadas inválidas
+        actions = np.random.randint(0, BOARD_SIZE * BOARD_SIZE, size=num_envs)
+        _, _, dones, info = env.step(actions)
+        transitions += num_envs
+        finished = info['result'][dones]
+        counts += np.bincount(finished, minlength=len(RESULT_NAMES))
+
+    elapsed = time.time() - start_time
+    print(f"Tempo total: {elapsed:.4f} segundos ({transitions / elapsed:,.0f} transições/s)")
+    for code, name in enumerate(RESULT_NAMES):
+        if code != RESULT_NONE:
+            print(f"{name}: {counts[code]}")
+
+    if counts[RESULT_NONE] == 0:
+        print("\n✅ SUCESSO: Todas as partidas vetorizadas terminaram com desfecho.")
+    else:
+        print("\n❌ ERRO: Partidas encerradas sem desfecho claro.")
+
 if __name__ == "__main__":
-    run_random_games()
\ No newline at end of file
+    run_random_games()
+    run_vec_random_games()
\ No newline at end of file
@@ -0,0 +1,178 @@
+# tournament.py
+import argparse
+import itertools
+import json
+import math
+import multiprocessing as mp
+import random
+import time
+import numpy as np
+from environment import BitboardTicTacToeEnv
+from agent import QAgent
+from policy import CompiledPolicy
+from nn_agent import NNAgent
+from search_agent import SearchAgent, SEARCH_PREFIX
+from model_store import resolve_model_path
+from settings import *
+
+RANDOM_PLAYER = "random"
+SEATS = [AGENT_ID] + OPPONENTS
+OUTCOMES = ('win', 'draw', 'loss')
+
+# Cérebros carregados uma única vez por processo do pool
+_BRAINS = {}
+
+def load_player(spec):
+    """
+    'random' -> None (joga aleatório); 'search[:modo[:profundidade[:segundos]]]' -> SearchAgent;
+    rede '.npz' (nn_agent) -> NNAgent; caminho de modelo -> política gulosa compilada.
+    """
+    if spec == RANDOM_PLAYER:
+        return None
+    if spec.split(":")[0] == SEARCH_PREFIX:
+        if spec not in _BRAINS:
+            _BRAINS[spec] = SearchAgent.from_spec(spec)
+        return _BRAINS[spec]
+    if spec.endswith(".npz") and spec not in _BRAINS:
+        brain = NNAgent()
+        brain.load_model(spec)  # Só entra no cache depois de carregar
+        _BRAINS[spec] = brain
+    if spec not in _BRAINS:
+        brain = QAgent()
+        brain.load_model(resolve_model_path(spec))
+        _BRAINS[spec] = CompiledPolicy.compile(brain)
+    return _BRAINS[spec]
+
+def play_game(env, players):
+    """
+    Joga uma partida completa; players[i] ocupa o assento SEATS[i].
+    Retorna o assento vencedor (ou None em empate).
+    """
+    env.reset()
+    while True:
+        for seat, brain in zip(SEATS, players):
+            valid_moves = env.valid_moves()
+            if brain is None:
+                action = random.choice(valid_moves)
+            else:
+                action = brain.act(env.board, seat)
+            if env.place(action, seat):
+                return seat
+            if env.is_draw():
+                return None
+
+def play_match(task):
+    """Tarefa do pool: joga 'n_games' com uma distribuição de assentos fixa."""
+    seating, n_games, seed = task
+    random.seed(seed)
+    env = BitboardTicTacToeEnv()
+    players = [load_player(spec) for spec in seating]
+
+    # counts[i] = [vitórias, empates, derrotas] do jogador sentado em SEATS[i]
+    counts = np.zeros((len(SEATS), len(OUTCOMES)), dtype=np.int64)
+    for _ in range(n_games):
+        winner = play_game(env, players)
+        if winner is None:
+            counts[:, 1] += 1
+        else:
+            counts[:, 2] += 1
+            idx = SEATS.index(winner)
+            counts[idx, 2] -= 1
+            counts[idx, 0] += 1
+    return seating, counts
+
+def wilson_interval(successes, total, z=1.96):
+    """Intervalo de confiança de Wilson (95% por padrão) para uma proporção."""
+    if total == 0:
+        return (0.0, 0.0)
+    p = successes / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+def summarize(counts):
+    """Converte [vitórias, empates, derrotas] em taxas com intervalo de confiança."""
+    total = int(counts.sum())
+    summary = {'games': total}
+    for outcome, n in zip(OUTCOMES, counts.tolist()):
+        low, high = wilson_interval(n, total)
+        summary[outcome] = {'count': n, 'rate': n / total if total else 0.0, 'ci95': [low, high]}
+    return summary
+
+def seatings_for(players):
+    """
+    Todas as distribuições de assentos (sem repetir jogador, se houver jogadores suficientes).
+    Com menos jogadores que assentos, só as mesas em que todos aparecem: uma mesa
+    (A, A, A, A) creditaria a A todos os resultados da partida.
+    """
+    if len(players) >= len(SEATS):
+        return list(itertools.permutations(players, len(SEATS)))
+    return [seating for seating in itertools.product(players, repeat=len(SEATS))
+            if len(set(seating)) == len(players)]
+
+def run_tournament(players, games_per_seating=1000, processes=None, chunk_size=500, seed=None):
+    """
+    Round-robin entre 'players' (caminhos de modelo ou 'random') em todas as
+    distribuições de assentos, espalhado num pool de processos.
+    Retorna o relatório (dicionário serializável em JSON).
+    """
+    if len(set(players)) != len(players):
+        raise ValueError(f"Jogadores repetidos: {sorted(p for p in set(players) if players.count(p) > 1)}")
+    if len(players) < 2:
+        raise ValueError("O torneio precisa de pelo menos 2 jogadores diferentes")
+    rng = random.Random(seed)
+    tasks = []
+    for seating in seatings_for(players):
+        remaining = games_per_seating
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            tasks.append((seating, n, rng.randrange(2**31)))
+            remaining -= n
+
+    # per_seat[jogador][assento] = [vitórias, empates, derrotas]
+    per_seat = {p: {seat: np.zeros(len(OUTCOMES), dtype=np.int64) for seat in SEATS} for p in players}
+    start_time = time.time()
+    with mp.get_context("spawn").Pool(processes) as pool:
+        for seating, counts in pool.imap_unordered(play_match, tasks):
+            for seat, spec, row in zip(SEATS, seating, counts):
+                per_seat[spec][seat] += row
+    elapsed = time.time() - start_time
+
+    report = {'players': {}, 'games_per_seating': games_per_seating,
+              'seatings': len(seatings_for(players)), 'seconds': elapsed}
+    for spec in players:
+        overall = sum(per_seat[spec].values())
+        report['players'][spec] = {
+            'overall': summarize(overall),
+            'seats': {str(seat): summarize(per_seat[spec][seat]) for seat in SEATS},
+        }
+    total_games = sum(n for _, n, _ in tasks)
+    report['total_games'] = total_games
+    report['games_per_second'] = total_games / elapsed if elapsed > 0 else 0.0
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Torneio round-robin entre cérebros salvos.")
+    parser.add_argument("players", nargs="+",
+                        help="Arquivos de modelo (.pkl/.qmap/.npz), 'random' para jogador aleatório "
+                             "ou 'search[:modo[:profundidade[:segundos]]]' para busca.")
+    parser.add_argument("--games", type=int, default=1000, help="Partidas por distribuição de assentos.")
+    parser.add_argument("--processes", type=int, default=None, help="Processos no pool (padrão: nº de CPUs).")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Grava o relatório JSON neste arquivo.")
+    args = parser.parse_args()
+    if len(set(args.players)) != len(args.players):
+        parser.error("cada jogador só pode aparecer uma vez na lista.")
+    if len(args.players) < 2:
+        parser.error("o torneio precisa de pelo menos 2 jogadores.")
+
+    report = run_tournament(args.players, args.games, args.processes, seed=args.seed)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+        print(f"🏆 Relatório salvo em {args.out} ({report['total_games']} partidas, "
+              f"{report['games_per_second']:,.0f} partidas/s)")
+    else:
+        print(text)
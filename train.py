@@ -1,59 +1,89 @@
 # train.py
+import argparse
 import numpy as np
 import time
-from environment import TicTacToeEnv
-from agent import QAgent
+from environment import make_env
+from agent import QAgent, add_learning_args, N_STEPS, TRACE_LAMBDA
+from replay import ReplayBuffer, add_replay_args, REPLAY_CAPACITY, REPLAY_BATCH
+from checkpoint import Checkpointer, add_checkpoint_args, resume_or_start, CHECKPOINT_EVERY
+from metrics import make_metrics, add_metrics_args
+from game_log import GameRecorder, add_game_log_args
+from profiler import PhaseProfiler, instrument_env, instrument_agent
 from settings import *
 
-def train():
-    env = TicTacToeEnv()
-    agent = QAgent()
+def train(profile=False, resume=False, checkpoint_dir="checkpoints/brain", checkpoint_every=CHECKPOINT_EVERY,
+          replay=False, replay_capacity=REPLAY_CAPACITY, replay_batch=REPLAY_BATCH,
+          shaped_rewards=False, metrics_path=None, run_name=None, game_log=None,
+          learning='q', n_steps=N_STEPS, lam=TRACE_LAMBDA):
+    # Log binário de todas as partidas (--game-log), para análise de aberturas com game_log.py
+    recorder = GameRecorder(game_log) if game_log else None
+    env = make_env(shaped_rewards=shaped_rewards, recorder=recorder)
+    agent = QAgent(learning, n_steps, lam)
+
+    # Checkpoints periódicos: uma queda não perde mais que 'checkpoint_every' episódios
+    # Com --checkpoint-every 0 não há checkpointer (nada é gravado nem apagado); --resume só lê
+    checkpointer = Checkpointer(checkpoint_dir, fresh=not resume) if checkpoint_every > 0 or resume else None
+    # Médias móveis em buffers circulares; o sink (--metrics) grava numa thread à parte
+    metrics = make_metrics(metrics_path, run_name)
+    start_episode = resume_or_start(checkpointer, agent, resume, metrics, recorder)
+
+    # Modo replay: as transições vão para a memória e o aprendizado é feito em lotes
+    replay_buffer = ReplayBuffer(replay_capacity) if replay else None
+
+    # Instrumentação opcional por fase (sem custo quando desligada)
+    profiler = PhaseProfiler() if profile else None
+    if profiler:
+        instrument_env(env, profiler)
+        instrument_agent(agent, profiler)
     
     print(f"🚀 Iniciando Treinamento: {EPISODES} episódios.")
     print(f"Campo: {BOARD_SIZE}x{BOARD_SIZE} | Vitória: {WIN_LENGTH} em linha")
     print("-" * 50)
     
     start_time = time.time()
-    recent_wins = [] 
     
-    for episode in range(1, EPISODES + 1):
+    for episode in range(start_episode, EPISODES + 1):
         # MODO DE TESTE FINAL: Desliga aleatoriedade nos últimos 5% dos jogos
         if episode > EPISODES * 0.95:
             agent.epsilon = 0.0
 
         state = env.reset()
-        state_matrix = env.board
+        state_key, transform = env.canonical_key()
         done = False
+        steps = 0
         
         while not done:
-            valid_moves = [i for i in range(BOARD_SIZE * BOARD_SIZE) if env.is_valid_move(i)]
+            valid_moves = env.valid_moves()
             if not valid_moves: break
+            steps += 1
 
-            action = agent.choose_action(state_matrix, valid_moves)
+            action = agent.choose_action_from_key(state_key, transform, valid_moves)
             next_state_flat, reward, done, info = env.step(action)
-            next_state_matrix = env.board
+            next_key, next_transform = env.canonical_key()
 
-            agent.learn(state_matrix, action, reward, next_state_matrix)
-            state_matrix = next_state_matrix.copy()
+            if replay_buffer is not None:
+                replay_buffer.add(state_key, agent.map_action_to_canonical(action, transform), reward, next_key, done)
+            else:
+                agent.learn_from_keys(state_key, transform, action, reward, next_key, done)
+            state_key, transform = next_key, next_transform
+        # Partida cortada sem done=True (sem jogadas válidas): a trajetória não passa para a próxima
+        agent.end_episode()
 
         # Estatísticas
-        if info.get('result') == 'Win':
-            recent_wins.append(1)
-        else:
-            recent_wins.append(0)
-            
-        if len(recent_wins) > 1000:
-            recent_wins.pop(0)
+        metrics.record(info.get('result'), steps)
 
         # Decaimento padrão (só acontece se não estivermos no modo de teste final)
         if episode <= EPISODES * 0.95:
             if agent.epsilon > EPSILON_MIN:
                 agent.epsilon *= EPSILON_DECAY
         
+        if replay_buffer is not None and len(replay_buffer) >= replay_batch:
+            agent.learn_batch(*replay_buffer.sample(replay_batch))
+
         agent.decay_alpha()
 
         if episode % 1000 == 0:
-            win_rate = sum(recent_wins) / len(recent_wins) * 100
+            stats = metrics.report(episode, epsilon=agent.epsilon, alpha=agent.alpha, states=len(agent.q_table))
             
             # Marcador visual para saber se está no modo "Validação Pura"
             mode = "TESTE" if agent.epsilon == 0.0 else "TREINO"
@@ -61,13 +91,56 @@ def train():
             print(f"Episódio {episode:6d} [{mode}] | "
                   f"Epsilon: {agent.epsilon:.3f} | "
                   f"Alpha: {agent.alpha:.3f} | "
-                  f"Vitórias: {win_rate:4.1f}% | "
-                  f"Estados: {len(agent.q_table)}")
+                  f"Vitórias: {stats['win_rate'] * 100:4.1f}% | "
+                  f"Estados: {stats['states']} | "
+                  f"{stats['episodes_per_second']:,.0f} ep/s")
+            if profiler:
+                print(f"   ⏱️ {profiler.report()}")
+
+        if checkpoint_every > 0 and episode % checkpoint_every == 0:
+            extra = {'metrics': metrics.state()}
+            if recorder:
+                recorder.flush()  # O log em disco acompanha o checkpoint
+                extra['game_log'] = recorder.games
+            checkpointer.save(agent, episode, extra=extra)
 
+    metrics.close()
+    if recorder:
+        recorder.close()
     total_time = time.time() - start_time
     print("-" * 50)
     print(f"✅ Treinamento concluído em {total_time:.1f} segundos!")
     agent.save_model("brain.pkl")
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Treino do agente contra oponentes aleatórios.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Número de processos atores (0 = treino num único processo).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mostra o tempo gasto em cada fase junto do log a cada 1000 episódios.")
+    parser.add_argument("--shaped-rewards", action="store_true",
+                        help="Soma as recompensas THREAT, BLOCK e IGNORE_DEFENSE de settings.REWARDS.")
+    add_replay_args(parser)
+    add_checkpoint_args(parser, "checkpoints/brain")
+    add_metrics_args(parser)
+    add_game_log_args(parser)
+    add_learning_args(parser)
+    args = parser.parse_args()
+    if args.replay and args.learning != 'q':
+        parser.error("--replay só funciona com --learning q (o lote perde a ordem das jogadas).")
+    if args.workers > 0:
+        # O treino paralelo só aceita --metrics/--run-name: qualquer outra opção mudada seria ignorada
+        for option in ("resume", "game_log", "profile", "shaped_rewards", "replay", "replay_capacity",
+                       "replay_batch", "checkpoint_dir", "checkpoint_every", "learning", "n_steps", "lam"):
+            if getattr(args, option) != parser.get_default(option):
+                parser.error(f"--{option.replace('_', '-')} ainda não é suportado junto com --workers.")
+
+    if args.workers > 0:
+        from parallel_train import train_parallel
+        train_parallel(args.workers, metrics_path=args.metrics, run_name=args.run_name)
+    else:
+        train(profile=args.profile, resume=args.resume,
+              checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+              replay=args.replay, replay_capacity=args.replay_capacity, replay_batch=args.replay_batch,
+              shaped_rewards=args.shaped_rewards, metrics_path=args.metrics, run_name=args.run_name,
+              game_log=args.game_log, learning=args.learning, n_steps=args.n_steps, lam=args.lam)
\ No newline at end of file
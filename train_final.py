@@ -1,12 +1,26 @@
 # train_final.py
+import argparse
 import numpy as np
 import time
 import os
-from environment import TicTacToeEnv
-from agent import QAgent
+from environment import make_env
+from agent import QAgent, add_learning_args, N_STEPS, TRACE_LAMBDA
+from policy import CompiledPolicy
+from search_agent import SearchAgent, SEARCH_MODES
+from model_store import resolve_model_path
+from replay import ReplayBuffer, add_replay_args, REPLAY_CAPACITY, REPLAY_BATCH
+from checkpoint import Checkpointer, add_checkpoint_args, resume_or_start, CHECKPOINT_EVERY
+from metrics import make_metrics, add_metrics_args
+from game_log import GameRecorder, add_game_log_args
+from profiler import PhaseProfiler, instrument_env, instrument_agent
 from settings import *
 
-def train_grandmaster():
+def train_grandmaster(profile=False, resume=False, checkpoint_dir="checkpoints/brain_final_boss",
+                      checkpoint_every=CHECKPOINT_EVERY, search_seats=(), search_mode='paranoid',
+                      search_depth=3, search_budget=None,
+                      replay=False, replay_capacity=REPLAY_CAPACITY, replay_batch=REPLAY_BATCH,
+                      shaped_rewards=False, metrics_path=None, run_name=None, game_log=None,
+                      learning='q', n_steps=N_STEPS, lam=TRACE_LAMBDA):
     print("👑 INICIANDO O TREINO SUPREMO (BATTLE ROYALE) 👑")
     print("Cenário: [2: Elite] | [3: Veterano] | [4: Louco]")
     
@@ -17,8 +31,8 @@ def train_grandmaster():
     if os.path.exists("brain_v2_elite.pkl"):
         print("💀 [Assento 2] Mestre Elite: CARREGADO")
         bot_elite = QAgent()
-        bot_elite.load_model("brain_v2_elite.pkl")
-        brains_map[2] = bot_elite
+        bot_elite.load_model(resolve_model_path("brain_v2_elite.pkl"))
+        brains_map[2] = CompiledPolicy.compile(bot_elite)  # Congelado: política compilada
     else:
         print("⚠️ [Assento 2] Elite não encontrado -> Usando Aleatório.")
 
@@ -26,16 +40,22 @@ def train_grandmaster():
     if os.path.exists("brain.pkl"):
         print("🤖 [Assento 3] Veterano: CARREGADO")
         bot_veteran = QAgent()
-        bot_veteran.load_model("brain.pkl")
-        brains_map[3] = bot_veteran
+        bot_veteran.load_model(resolve_model_path("brain.pkl"))
+        brains_map[3] = CompiledPolicy.compile(bot_veteran)
     else:
         print("⚠️ [Assento 3] Veterano não encontrado -> Usando Aleatório.")
         
-    # Oponente 4: Sempre Aleatório (O fator Caos)
-    brains_map[4] = None 
+    # Demais oponentes (4, 5, ...): Sempre Aleatórios (O fator Caos)
+    for seat in OPPONENTS[2:]:
+        brains_map[seat] = None
+
+    # Assentos com busca (--search-seats): professor forte que não precisa de treino
+    for seat in search_seats:
+        print(f"🔎 [Assento {seat}] Busca {search_mode} (profundidade {search_depth}): ATIVADA")
+        brains_map[seat] = SearchAgent(seat, search_mode, search_depth, search_budget)
 
     # --- 2. PREPARAR O NOSSO CAMPEÃO ---
-    champion = QAgent()
+    champion = QAgent(learning, n_steps, lam)
     
     # Ele deve continuar evoluindo do ponto mais forte que você tiver
     if os.path.exists("brain_v2_elite.pkl"):
@@ -51,48 +71,86 @@ def train_grandmaster():
     champion.epsilon = 0.2  
     champion.alpha = 0.05   
 
+    # Checkpoints periódicos: com --resume o campeão volta de onde parou
+    # Com --checkpoint-every 0 não há checkpointer (nada é gravado nem apagado); --resume só lê
+    checkpointer = Checkpointer(checkpoint_dir, fresh=not resume) if checkpoint_every > 0 or resume else None
+    metrics = make_metrics(metrics_path, run_name)
+    # Log binário de todas as partidas (--game-log), para análise de aberturas com game_log.py;
+    # com --resume volta ao tamanho do checkpoint
+    recorder = GameRecorder(game_log) if game_log else None
+    start_episode = resume_or_start(checkpointer, champion, resume, metrics, recorder)
+
+    # Modo replay: as transições vão para a memória e o aprendizado é feito em lotes
+    replay_buffer = ReplayBuffer(replay_capacity) if replay else None
+
     # INICIALIZA O AMBIENTE COM A MESA MISTA
-    env = TicTacToeEnv(opponent_brains=brains_map)
+    env = make_env(opponent_brains=brains_map, shaped_rewards=shaped_rewards, recorder=recorder)
+
+    # Instrumentação opcional por fase (sem custo quando desligada)
+    profiler = PhaseProfiler() if profile else None
+    if profiler:
+        instrument_env(env, profiler)
+        instrument_agent(champion, profiler)
+        for seat, brain in brains_map.items():
+            if brain:
+                instrument_agent(brain, profiler, prefix=f"seat{seat}.")
     
     print("-" * 50)
     start_time = time.time()
-    recent_wins = [] 
     
     # Loop de Treino
-    for episode in range(1, EPISODES + 1):
+    for episode in range(start_episode, EPISODES + 1):
         state = env.reset()
-        state_matrix = env.board.copy()
+        state_key, transform = env.canonical_key()
         done = False
+        steps = 0
         
         while not done:
-            valid_moves = [i for i in range(BOARD_SIZE * BOARD_SIZE) if env.is_valid_move(i)]
+            valid_moves = env.valid_moves()
             if not valid_moves: break
+            steps += 1
 
-            action = champion.choose_action(state_matrix, valid_moves)
+            action = champion.choose_action_from_key(state_key, transform, valid_moves)
             
             # Environment escolhe quem joga contra (Elite, Veterano ou Random)
             next_state_flat, reward, done, info = env.step(action)
-            next_state_matrix = env.board.copy()
+            next_key, next_transform = env.canonical_key()
 
-            champion.learn(state_matrix, action, reward, next_state_matrix)
-            state_matrix = next_state_matrix
+            if replay_buffer is not None:
+                replay_buffer.add(state_key, champion.map_action_to_canonical(action, transform), reward, next_key, done)
+            else:
+                champion.learn_from_keys(state_key, transform, action, reward, next_key, done)
+            state_key, transform = next_key, next_transform
+        # Partida cortada sem done=True (sem jogadas válidas): a trajetória não passa para a próxima
+        champion.end_episode()
 
         # Estatísticas
-        if info.get('result') == 'Win':
-            recent_wins.append(1)
-        else:
-            recent_wins.append(0) # Derrota ou Empate = 0
-            
-        if len(recent_wins) > 1000: recent_wins.pop(0)
+        metrics.record(info.get('result'), steps)
+
+        if replay_buffer is not None and len(replay_buffer) >= replay_batch:
+            champion.learn_batch(*replay_buffer.sample(replay_batch))
 
         champion.decay_alpha()
         if champion.epsilon > 0.001:
             champion.epsilon *= 0.99995
 
         if episode % 1000 == 0:
-            win_rate = sum(recent_wins) / len(recent_wins) * 100
-            print(f"Episódio {episode:6d} | Win Rate: {win_rate:5.1f}% | Eps: {champion.epsilon:.3f} | Q-Table: {len(champion.q_table)}")
+            stats = metrics.report(episode, epsilon=champion.epsilon, alpha=champion.alpha, states=len(champion.q_table))
+            print(f"Episódio {episode:6d} | Win Rate: {stats['win_rate'] * 100:5.1f}% | Eps: {champion.epsilon:.3f} | "
+                  f"Q-Table: {stats['states']} | {stats['episodes_per_second']:,.0f} ep/s")
+            if profiler:
+                print(f"   ⏱️ {profiler.report()}")
+
+        if checkpoint_every > 0 and episode % checkpoint_every == 0:
+            extra = {'metrics': metrics.state()}
+            if recorder:
+                recorder.flush()  # O log em disco acompanha o checkpoint
+                extra['game_log'] = recorder.games
+            checkpointer.save(champion, episode, extra=extra)
 
+    metrics.close()
+    if recorder:
+        recorder.close()
     total_time = time.time() - start_time
     print("-" * 50)
     print(f"✅ TREINO SUPREMO CONCLUÍDO ({total_time:.1f}s)")
@@ -102,4 +160,28 @@ def train_grandmaster():
     print("💾 CÉREBRO FINAL SALVO: 'brain_final_boss.pkl'")
 
 if __name__ == "__main__":
-    train_grandmaster()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Treino final contra a mesa mista (Elite, Veterano, Aleatório).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mostra o tempo gasto em cada fase junto do log a cada 1000 episódios.")
+    parser.add_argument("--search-seats", type=int, nargs="*", default=[], choices=OPPONENTS,
+                        help="Assentos adversários que passam a jogar por busca (ex.: --search-seats 4).")
+    parser.add_argument("--search-mode", choices=SEARCH_MODES, default="paranoid")
+    parser.add_argument("--search-depth", type=int, default=3, help="Profundidade máxima em meias-jogadas.")
+    parser.add_argument("--search-budget", type=float, default=None, help="Segundos por jogada da busca.")
+    parser.add_argument("--shaped-rewards", action="store_true",
+                        help="Soma as recompensas THREAT, BLOCK e IGNORE_DEFENSE de settings.REWARDS.")
+    add_replay_args(parser)
+    add_checkpoint_args(parser, "checkpoints/brain_final_boss")
+    add_metrics_args(parser)
+    add_game_log_args(parser)
+    add_learning_args(parser)
+    args = parser.parse_args()
+    if args.replay and args.learning != 'q':
+        parser.error("--replay só funciona com --learning q (o lote perde a ordem das jogadas).")
+    train_grandmaster(profile=args.profile, resume=args.resume,
+                      checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+                      search_seats=args.search_seats, search_mode=args.search_mode,
+                      search_depth=args.search_depth, search_budget=args.search_budget,
+                      replay=args.replay, replay_capacity=args.replay_capacity, replay_batch=args.replay_batch,
+                      shaped_rewards=args.shaped_rewards, metrics_path=args.metrics, run_name=args.run_name,
+                      game_log=args.game_log, learning=args.learning, n_steps=args.n_steps, lam=args.lam)
\ No newline at end of file
@@ -1,13 +1,25 @@
 # train_selfplay.py
+import argparse
 import numpy as np
 import time
 import os
 import pickle
-from environment import TicTacToeEnv
-from agent import QAgent
+from environment import make_env
+from agent import QAgent, add_learning_args, N_STEPS, TRACE_LAMBDA
+from policy import CompiledPolicy
+from replay import ReplayBuffer, add_replay_args, REPLAY_CAPACITY, REPLAY_BATCH
+from checkpoint import Checkpointer, add_checkpoint_args, resume_or_start, CHECKPOINT_EVERY
+from metrics import make_metrics, add_metrics_args
+from game_log import GameRecorder, add_game_log_args
+from profiler import PhaseProfiler, instrument_env, instrument_agent
+from model_store import resolve_model_path
 from settings import *
 
-def train_self_play():
+def train_self_play(profile=False, resume=False, checkpoint_dir="checkpoints/brain_v2_elite",
+                    checkpoint_every=CHECKPOINT_EVERY,
+                    replay=False, replay_capacity=REPLAY_CAPACITY, replay_batch=REPLAY_BATCH,
+                    shaped_rewards=False, metrics_path=None, run_name=None, game_log=None,
+                    learning='q', n_steps=N_STEPS, lam=TRACE_LAMBDA):
     print("⚔️ PREPARANDO ARENA DE AUTO-APERFEIÇOAMENTO ⚔️")
     
     # 1. CARREGAR O MESTRE (OPONENTES)
@@ -15,7 +27,7 @@ def train_self_play():
     teacher_agent = QAgent()
     if os.path.exists("brain.pkl"):
         print("✅ Conhecimento anterior carregado para os oponentes.")
-        teacher_agent.load_model("brain.pkl")
+        teacher_agent.load_model(resolve_model_path("brain.pkl"))
         teacher_agent.epsilon = 0.0  # Joga 100% sério
         teacher_agent.alpha = 0.0    # Não aprende mais nada
     else:
@@ -24,48 +36,75 @@ def train_self_play():
 
     # 2. CARREGAR O ALUNO (HERÓI)
     # Este é o agente que vai evoluir. Começa com o mesmo conhecimento.
-    student_agent = QAgent()
+    student_agent = QAgent(learning, n_steps, lam)
     student_agent.load_model("brain.pkl")
     student_agent.epsilon = 0.3  # Reinicia um pouco de curiosidade para tentar novas táticas
     student_agent.alpha = 0.1    # Taxa de aprendizado refinada
 
+    # Checkpoints periódicos: com --resume o aluno volta de onde parou
+    # Com --checkpoint-every 0 não há checkpointer (nada é gravado nem apagado); --resume só lê
+    checkpointer = Checkpointer(checkpoint_dir, fresh=not resume) if checkpoint_every > 0 or resume else None
+    metrics = make_metrics(metrics_path, run_name)
+    # Log binário de todas as partidas (--game-log), para análise de aberturas com game_log.py;
+    # com --resume volta ao tamanho do checkpoint
+    recorder = GameRecorder(game_log) if game_log else None
+    start_episode = resume_or_start(checkpointer, student_agent, resume, metrics, recorder)
+
+    # Modo replay: as transições vão para a memória e o aprendizado é feito em lotes
+    replay_buffer = ReplayBuffer(replay_capacity) if replay else None
+
+    # O Mestre está congelado: compila a política gulosa uma vez (somente leitura)
+    teacher_agent = CompiledPolicy.compile(teacher_agent)
+
     # Inicializa o ambiente passando o Mestre como cérebro dos inimigos
-    env = TicTacToeEnv(opponent_brain=teacher_agent)
+    env = make_env(opponent_brains={opp_id: teacher_agent for opp_id in OPPONENTS}, shaped_rewards=shaped_rewards,
+                   recorder=recorder)
+
+    # Instrumentação opcional por fase (sem custo quando desligada)
+    profiler = PhaseProfiler() if profile else None
+    if profiler:
+        instrument_env(env, profiler)
+        instrument_agent(student_agent, profiler)
+        instrument_agent(teacher_agent, profiler, prefix="teacher.")
     
     print(f"🎯 Meta: {EPISODES} episódios contra 3 cópias do Agente Anterior.")
     print("-" * 50)
     
     start_time = time.time()
-    recent_wins = [] 
     
-    for episode in range(1, EPISODES + 1):
+    for episode in range(start_episode, EPISODES + 1):
         state = env.reset()
-        state_matrix = env.board.copy()
+        state_key, transform = env.canonical_key()
         done = False
+        steps = 0
         
         while not done:
-            valid_moves = [i for i in range(BOARD_SIZE * BOARD_SIZE) if env.is_valid_move(i)]
+            valid_moves = env.valid_moves()
             if not valid_moves: break
+            steps += 1
 
             # O Aluno escolhe a jogada
-            action = student_agent.choose_action(state_matrix, valid_moves)
+            action = student_agent.choose_action_from_key(state_key, transform, valid_moves)
             
             # O ambiente executa. Quando for a vez dos oponentes, 
             # o env vai usar o 'teacher_agent' para decidir.
             next_state_flat, reward, done, info = env.step(action)
-            next_state_matrix = env.board.copy()
+            next_key, next_transform = env.canonical_key()
 
             # SÓ O ALUNO APRENDE
-            student_agent.learn(state_matrix, action, reward, next_state_matrix)
-            state_matrix = next_state_matrix
+            if replay_buffer is not None:
+                replay_buffer.add(state_key, student_agent.map_action_to_canonical(action, transform), reward, next_key, done)
+            else:
+                student_agent.learn_from_keys(state_key, transform, action, reward, next_key, done)
+            state_key, transform = next_key, next_transform
+        # Partida cortada sem done=True (sem jogadas válidas): a trajetória não passa para a próxima
+        student_agent.end_episode()
 
         # Coleta estatísticas
-        if info.get('result') == 'Win':
-            recent_wins.append(1)
-        else:
-            recent_wins.append(0) # Derrota ou Empate conta como 0 aqui
-            
-        if len(recent_wins) > 1000: recent_wins.pop(0)
+        metrics.record(info.get('result'), steps)
+
+        if replay_buffer is not None and len(replay_buffer) >= replay_batch:
+            student_agent.learn_batch(*replay_buffer.sample(replay_batch))
 
         # Decaimento do Aluno
         student_agent.decay_alpha()
@@ -74,9 +113,23 @@ def train_self_play():
 
         # Log
         if episode % 1000 == 0:
-            win_rate = sum(recent_wins) / len(recent_wins) * 100
-            print(f"Episódio {episode:6d} | Win Rate: {win_rate:5.1f}% | Epsilon: {student_agent.epsilon:.3f} | Q-Size: {len(student_agent.q_table)}")
+            stats = metrics.report(episode, epsilon=student_agent.epsilon, alpha=student_agent.alpha,
+                                   states=len(student_agent.q_table))
+            print(f"Episódio {episode:6d} | Win Rate: {stats['win_rate'] * 100:5.1f}% | Epsilon: {student_agent.epsilon:.3f} | "
+                  f"Q-Size: {stats['states']} | {stats['episodes_per_second']:,.0f} ep/s")
+            if profiler:
+                print(f"   ⏱️ {profiler.report()}")
+
+        if checkpoint_every > 0 and episode % checkpoint_every == 0:
+            extra = {'metrics': metrics.state()}
+            if recorder:
+                recorder.flush()  # O log em disco acompanha o checkpoint
+                extra['game_log'] = recorder.games
+            checkpointer.save(student_agent, episode, extra=extra)
 
+    metrics.close()
+    if recorder:
+        recorder.close()
     total_time = time.time() - start_time
     print("-" * 50)
     print(f"✅ Treino Self-Play finalizado em {total_time:.1f}s")
@@ -86,4 +139,21 @@ def train_self_play():
     print("💾 Novo modelo salvo como 'brain_v2_elite.pkl'")
 
 if __name__ == "__main__":
-    train_self_play()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Treino do aluno contra cópias do cérebro anterior.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mostra o tempo gasto em cada fase junto do log a cada 1000 episódios.")
+    parser.add_argument("--shaped-rewards", action="store_true",
+                        help="Soma as recompensas THREAT, BLOCK e IGNORE_DEFENSE de settings.REWARDS.")
+    add_replay_args(parser)
+    add_checkpoint_args(parser, "checkpoints/brain_v2_elite")
+    add_metrics_args(parser)
+    add_game_log_args(parser)
+    add_learning_args(parser)
+    args = parser.parse_args()
+    if args.replay and args.learning != 'q':
+        parser.error("--replay só funciona com --learning q (o lote perde a ordem das jogadas).")
+    train_self_play(profile=args.profile, resume=args.resume,
+                    checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+                    replay=args.replay, replay_capacity=args.replay_capacity, replay_batch=args.replay_batch,
+                    shaped_rewards=args.shaped_rewards, metrics_path=args.metrics, run_name=args.run_name,
+                    game_log=args.game_log, learning=args.learning, n_steps=args.n_steps, lam=args.lam)
\ No newline at end of file
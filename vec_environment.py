@@ -0,0 +1,158 @@
+# vec_environment.py
+import numpy as np
+from settings import *
+from environment import NUM_CELLS, WIN_LINES
+from policy import CompiledPolicy
+
+# Códigos de resultado devolvidos em info['result'] (um por tabuleiro)
+RESULT_NONE, RESULT_WIN, RESULT_LOSS, RESULT_DRAW = 0, 1, 2, 3
+RESULT_NAMES = ('', 'Win', 'Loss', 'Draw')
+
+LINES = np.array(WIN_LINES)  # (n_linhas, WIN_LENGTH)
+
+class VecTicTacToeEnv:
+    """
+    N partidas simultâneas num único array (N, NUM_CELLS).
+    Jogadas do agente, dos oponentes, checagem de vitória/empate e o
+    reinício automático são feitos em lote com operações NumPy.
+    """
+
+    def __init__(self, num_envs, opponent_brains=None, seed=None):
+        """
+        num_envs: quantidade de tabuleiros jogados em paralelo.
+        opponent_brains: mesmo formato do TicTacToeEnv ({player_id: brain}). Cérebros tabulares
+        (QAgent) são compilados aqui para CompiledPolicy e jogam em lote: valem as
+        Tabelas Q do momento da criação do ambiente.
+        """
+        self.num_envs = num_envs
+        self.opponent_brains = {opp_id: self._batched(brain)
+                                for opp_id, brain in (opponent_brains or {}).items()}
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((num_envs, NUM_CELLS), dtype=np.int8)
+
+    def reset(self):
+        self.boards[:] = EMPTY
+        return self.boards.copy()
+
+    def valid_mask(self):
+        """Matriz booleana (N, NUM_CELLS) com as casas livres de cada tabuleiro."""
+        return self.boards == EMPTY
+
+    def check_winner(self, player_id, rows=None):
+        boards = self.boards if rows is None else self.boards[rows]
+        return (boards[:, LINES] == player_id).all(axis=2).any(axis=1)
+
+    def get_opponent_view(self, player_id, rows=None):
+        """Visão de 'player_id' para cada tabuleiro: ele vira 1, os outros viram 2."""
+        boards = self.boards if rows is None else self.boards[rows]
+        return np.where(boards == player_id, 1, np.where(boards != EMPTY, 2, EMPTY))
+
+    def random_actions(self, rows):
+        """Sorteia uma casa livre (uniforme) para cada tabuleiro em 'rows'."""
+        keys = self.rng.random((len(rows), NUM_CELLS))
+        keys[self.boards[rows] != EMPTY] = -1.0
+        return keys.argmax(axis=1)
+
+    @staticmethod
+    def _batched(brain):
+        """Troca um cérebro com Tabela Q pela política compilada equivalente (que tem act_batch)."""
+        if brain and not hasattr(brain, 'act_batch') and hasattr(getattr(brain, 'q_table', None), 'export'):
+            return CompiledPolicy.compile(brain)
+        return brain
+
+    def brain_actions(self, brain, opp_id, rows):
+        """Jogadas de um cérebro para os tabuleiros em 'rows' (sem exploração)."""
+        if hasattr(brain, 'act_batch'):
+            # Política compilada ou rede: todos os tabuleiros numa só passada vetorizada
+            return brain.act_batch(self.boards[rows], opp_id, rng=self.rng)
+
+        # Só cérebros que não dá para compilar chegam aqui, um tabuleiro por vez
+        actions = np.empty(len(rows), dtype=np.int64)
+        if hasattr(brain, 'act'):
+            # Jogadores que precisam dos assentos reais (ex.: SearchAgent) leem o tabuleiro bruto
+            for i, board in enumerate(self.boards[rows]):
+                actions[i] = brain.act(board, opp_id)
+            return actions
+
+        views = self.get_opponent_view(opp_id, rows)
+
+        old_eps = brain.epsilon
+        brain.epsilon = 0.0
+        for i, view in enumerate(views):
+            valid_moves = np.flatnonzero(view == EMPTY).tolist()
+            actions[i] = brain.choose_action(view.reshape(BOARD_SIZE, BOARD_SIZE), valid_moves)
+        brain.epsilon = old_eps
+        return actions
+
+    def play_opponents(self, rows, rewards, dones, results):
+        """Oponentes jogam nos tabuleiros em 'rows' (partidas ainda em andamento)."""
+        for opp_id in OPPONENTS:
+            if len(rows) == 0: return rows
+
+            brain = self.opponent_brains.get(opp_id)
+            if brain:
+                actions = self.brain_actions(brain, opp_id, rows)
+            else:
+                actions = self.random_actions(rows)
+            self.boards[rows, actions] = opp_id
+
+            won = self.check_winner(opp_id, rows)
+            lost_rows = rows[won]
+            rewards[lost_rows] = REWARDS['LOSS']
+            results[lost_rows] = RESULT_LOSS
+
+            full = ~won & (self.boards[rows] != EMPTY).all(axis=1)
+            draw_rows = rows[full]
+            rewards[draw_rows] = REWARDS['DRAW']
+            results[draw_rows] = RESULT_DRAW
+
+            dones[lost_rows] = True
+            dones[draw_rows] = True
+            rows = rows[~(won | full)]
+        return rows
+
+    def step(self, actions):
+        """
+        actions: array (N,) com a jogada do agente em cada tabuleiro.
+        Retorna (observações, recompensas, dones, info) como arrays.
+        Tabuleiros que terminaram são reiniciados automaticamente; o estado
+        final de cada um fica em info['terminal_observation'].
+        """
+        actions = np.asarray(actions)
+        n = self.num_envs
+        all_rows = np.arange(n)
+        rewards = np.zeros(n, dtype=np.float32)
+        dones = np.zeros(n, dtype=bool)
+        results = np.full(n, RESULT_NONE, dtype=np.int8)
+
+        # 1. Validade (jogada inválida não encerra a partida, como no TicTacToeEnv)
+        in_range = (actions >= 0) & (actions < NUM_CELLS)
+        valid = in_range.copy()
+        valid[in_range] = self.boards[all_rows[in_range], actions[in_range]] == EMPTY
+        rewards[~valid] = REWARDS['INVALID']
+        rows = all_rows[valid]
+
+        # 2. Jogada do agente principal
+        self.boards[rows, actions[rows]] = AGENT_ID
+        won = self.check_winner(AGENT_ID, rows)
+        win_rows = rows[won]
+        rewards[win_rows] = REWARDS['WIN']
+        results[win_rows] = RESULT_WIN
+
+        full = ~won & (self.boards[rows] != EMPTY).all(axis=1)
+        draw_rows = rows[full]
+        rewards[draw_rows] = REWARDS['DRAW']
+        results[draw_rows] = RESULT_DRAW
+
+        dones[win_rows] = True
+        dones[draw_rows] = True
+        rows = rows[~(won | full)]
+
+        # 3. Oponentes jogam
+        rows = self.play_opponents(rows, rewards, dones, results)
+        rewards[rows] = REWARDS['STEP']
+
+        # 4. Reinício automático
+        info = {'result': results, 'terminal_observation': self.boards[dones].copy()}
+        self.boards[dones] = EMPTY
+        return self.boards.copy(), rewards, dones, info